@@ -0,0 +1,68 @@
+"""Benchmark per-request auth overhead in ``verify_token``.
+
+Generates an HS256 secret plus RS256 and ES256 key pairs locally, serves the
+public keys from a stub JWKS endpoint, and times ``verify_token`` for each
+algorithm with the verified-token cache disabled (every request pays the
+full signature check) and enabled.
+
+    python -m api.benchmarks.bench_auth --iterations 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+from starlette.requests import Request
+
+from api.tests.stub_jwks import ADMIN, SECRET, JwksServer, SigningKey, claims, hs256
+
+
+def _request(token: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    })
+
+
+async def _bench(iterations: int) -> None:
+    rsa_key, ec_key = SigningKey("rsa-1", "RS256"), SigningKey("ec-1", "ES256")
+    server = JwksServer([rsa_key, ec_key])
+
+    # auth reads its configuration at import time
+    os.environ["SUPABASE_JWT_SECRET"] = SECRET
+    os.environ["SUPABASE_JWKS_URL"] = server.url
+    os.environ["ADMIN_USER_ID"] = ADMIN
+    from api.middleware import auth
+
+    payload = claims()
+    tokens = {"HS256": hs256(payload), "RS256": rsa_key.sign(payload), "ES256": ec_key.sign(payload)}
+    for alg, token in tokens.items():
+        request = _request(token)
+        assert (await auth.verify_token(request))["sub"] == ADMIN  # also warms the JWKS cache
+        results = {}
+        for label, size in (("uncached", 0), ("cached", auth.TOKEN_CACHE_SIZE)):
+            auth.token_cache.max_entries = size
+            auth.token_cache.clear()
+            started = time.perf_counter()
+            for _ in range(iterations):
+                await auth.verify_token(request)
+            results[label] = (time.perf_counter() - started) / iterations * 1e6
+        print(f"{alg}: uncached {results['uncached']:.1f}us  cached {results['cached']:.1f}us  "
+              f"({results['uncached'] / results['cached']:.0f}x)")
+    server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(_bench(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
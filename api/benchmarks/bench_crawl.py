@@ -0,0 +1,176 @@
+"""Benchmark design-DNA extraction on large pages: buffered vs streamed.
+
+Generates a multi-MB HTML page with inline styles plus several large
+stylesheets, serves them from a local HTTP server, and compares:
+
+- buffered: read every body fully, then parse (the previous approach);
+- streamed: ``FireCrawlService`` parsing chunks as they arrive, with the
+  per-document byte cap but convergence disabled;
+- streamed+converge: the default, which stops once the DNA settles.
+
+Reports wall time per crawl, peak traced memory and bytes read.
+
+    python -m api.benchmarks.bench_crawl --page-mb 8 --sheets 6 --sheet-mb 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+# Fixtures are served from loopback
+os.environ["CRAWL_ALLOW_PRIVATE"] = "1"
+os.environ["CRAWL_HOST_INTERVAL"] = "0"
+
+import httpx  # noqa: E402
+
+from api.services import fire_crawl  # noqa: E402
+from api.services.fire_crawl import FireCrawlService, StyleCollector, _PageParser  # noqa: E402
+
+# Skewed palette so the leading colors are stable, as on real sites
+PALETTE = ["#0F1115", "#FFFFFF", "#5E6AD2", "#F3F4FB", "#EFFF00", "#333333", "#999999", "#E11D48"]
+WEIGHTS = [40, 25, 15, 8, 5, 3, 2, 2]
+FONTS = ["'Inter Display', sans-serif", "Inter, sans-serif", "ui-monospace, monospace"]
+
+
+def _rule(rng: random.Random, i: int) -> str:
+    color = rng.choices(PALETTE, WEIGHTS)[0]
+    background = rng.choices(PALETTE, WEIGHTS)[0]
+    font = rng.choices(FONTS, [6, 3, 1])[0]
+    display = rng.choice(["grid", "grid", "flex", "block"])
+    return f".c{i}{{color:{color};background:{background};font-family:{font};display:{display};padding:{i % 32}px}}\n"
+
+
+def make_fixtures(page_mb: float, sheets: int, sheet_mb: float, seed: int = 0) -> dict[str, bytes]:
+    rng = random.Random(seed)
+    links = "".join(f'<link rel="stylesheet" href="/s{n}.css">' for n in range(sheets))
+    head = f"<!doctype html><html><head>{links}<style>{''.join(_rule(rng, i) for i in range(50))}</style></head><body>"
+    parts = [head]
+    size, i = len(head), 0
+    while size < page_mb * 1024 * 1024:
+        color = rng.choices(PALETTE, WEIGHTS)[0]
+        block = f'<div class="c{i % 50}" style="color:{color}"><p>Section {i} of the landing page copy.</p></div>\n'
+        parts.append(block)
+        size += len(block)
+        i += 1
+    parts.append("</body></html>")
+    files = {"/": "".join(parts).encode()}
+    for n in range(sheets):
+        rules, size, i = [], 0, 0
+        while size < sheet_mb * 1024 * 1024:
+            rule = _rule(rng, i)
+            rules.append(rule)
+            size += len(rule)
+            i += 1
+        files[f"/s{n}.css"] = "".join(rules).encode()
+    return files
+
+
+def serve(files: dict[str, bytes]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            body = files.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/css" if self.path.endswith(".css") else "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            view = memoryview(body)
+            try:
+                for offset in range(0, len(body), 64 * 1024):
+                    self.wfile.write(view[offset:offset + 64 * 1024])
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the streamed crawl hung up early
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def crawl_buffered(url: str) -> tuple[Any, int]:
+    """The previous approach: whole bodies in memory, parsed afterwards."""
+    async with httpx.AsyncClient(timeout=60) as client:
+        response = await client.get(url)
+        collector = StyleCollector()
+        parser = _PageParser(collector)
+        parser.feed(response.text)
+        parser.close()
+        read = len(response.content)
+        sheet_urls = [httpx.URL(url).join(h) for h in parser.stylesheets[:fire_crawl.MAX_STYLESHEETS]]
+        sheets = await asyncio.gather(*(client.get(u) for u in sheet_urls))
+        for sheet in sheets:
+            collector.feed_css(sheet.text)
+            read += len(sheet.content)
+        return collector.dna(), read
+
+
+async def crawl_streamed(url: str, converge: bool) -> tuple[Any, int]:
+    fire_crawl.CRAWL_CONVERGE_SCORE = 9.0 if converge else 11.0
+    service = FireCrawlService()
+    try:
+        result = await service.analyze_url(url)
+        return result.dna, service.stats["bytes_read"]
+    finally:
+        await service.close()
+
+
+def run(mode: str, url: str, repeat: int) -> dict[str, Any]:
+    async def once() -> tuple[Any, int]:
+        if mode == "buffered":
+            return await crawl_buffered(url)
+        return await crawl_streamed(url, converge=mode == "streamed+converge")
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        dna, read = asyncio.run(once())
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    asyncio.run(once())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"mode": mode, "ms": statistics.median(timings) * 1000, "peak_mb": peak / 2**20, "read_mb": read / 2**20, "dna": dna}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-mb", type=float, default=8)
+    parser.add_argument("--sheets", type=int, default=6)
+    parser.add_argument("--sheet-mb", type=float, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    files = make_fixtures(args.page_mb, args.sheets, args.sheet_mb)
+    total = sum(len(b) for b in files.values()) / 2**20
+    server = serve(files)
+    url = f"http://127.0.0.1:{server.server_port}/"
+    print(f"fixtures: page {len(files['/']) / 2**20:.1f}MB + {args.sheets} sheets, {total:.1f}MB total; "
+          f"cap {fire_crawl.CRAWL_MAX_BYTES / 2**20:.1f}MB per document")
+    fire_crawl.print = lambda *a, **k: None  # silence per-crawl logging
+    for mode in ("buffered", "streamed", "streamed+converge"):
+        r = run(mode, url, args.repeat)
+        dna = r["dna"]
+        print(f"{mode:>18}: {r['ms']:7.0f}ms  peak {r['peak_mb']:6.1f}MB  read {r['read_mb']:5.1f}MB  "
+              f"-> {dna.palette[:3]} {dna.typography!r} {dna.layout!r} score {dna.score}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Benchmark the in-process git reader against spawning ``git``.
+
+Builds a synthetic repository with ``git fast-import`` (one commit per minute,
+packed, with a few loose commits on top), then times the reads the routers
+do: the full 7-day window and the incremental ``old..new`` read for /signals,
+and ``log --oneline -5`` for /health.
+
+    python -m api.benchmarks.bench_git_reader --commits 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from api.services.commit_index import WINDOW_SECONDS
+from api.services.git_reader import GitRepo, read_head
+
+
+def build_repo(path: Path, commits: int, loose: int = 20) -> str:
+    """Create ``commits`` packed commits followed by ``loose`` loose ones.
+
+    Returns the sha of the last packed commit.
+    """
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    now = int(time.time())
+    start = now - commits * 60
+    proc = subprocess.Popen(
+        ["git", "-C", str(path), "fast-import", "--quiet"],
+        stdin=subprocess.PIPE,
+    )
+    assert proc.stdin is not None
+    for n in range(commits):
+        ts = start + n * 60
+        message = f"synthetic commit {n}\n".encode()
+        content = f"line {n}\n".encode()
+        proc.stdin.write(
+            b"commit refs/heads/main\n"
+            + f"author Bench <bench@example.com> {ts} +0000\n".encode()
+            + f"committer Bench <bench@example.com> {ts} +0000\n".encode()
+            + f"data {len(message)}\n".encode() + message
+            + f"M 644 inline file-{n % 100}.txt\n".encode()
+            + f"data {len(content)}\n".encode() + content
+            + b"\n"
+        )
+    proc.stdin.close()
+    if proc.wait() != 0:
+        raise RuntimeError("git fast-import failed")
+    subprocess.run(["git", "-C", str(path), "repack", "-adq"], check=True)
+    subprocess.run(["git", "-C", str(path), "checkout", "-q", "main"], check=True)
+    packed_head = read_head(path / ".git")
+    assert packed_head is not None
+    for n in range(loose):
+        subprocess.run(
+            [
+                "git", "-C", str(path),
+                "-c", "user.name=Bench", "-c", "user.email=bench@example.com",
+                "commit", "-q", "--allow-empty", "-m", f"loose commit {n}",
+            ],
+            check=True,
+        )
+    return packed_head
+
+
+def _time(fn: Callable[[], object], repeat: int) -> tuple[float, object]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def run(commits: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / "synthetic"
+        started = time.perf_counter()
+        packed_head = build_repo(repo, commits)
+        print(f"built {commits} commits in {time.perf_counter() - started:.1f}s")
+
+        git_dir = repo / ".git"
+        cutoff = int(time.time()) - WINDOW_SECONDS
+
+        def reader_window() -> list[str]:
+            reader = GitRepo(git_dir)
+            try:
+                head = read_head(git_dir)
+                assert head is not None
+                return [c.sha for c in reader.iter_commits(head, since=cutoff)]
+            finally:
+                reader.close()
+
+        def subprocess_window() -> list[str]:
+            out = subprocess.run(
+                ["git", "-C", str(repo), "log", f"--since=@{cutoff}", "--format=%H"],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            return out.split()
+
+        def reader_incremental() -> list[str]:
+            reader = GitRepo(git_dir)
+            try:
+                head = read_head(git_dir)
+                assert head is not None
+                stop = {packed_head}
+                return [c.sha for c in reader.iter_commits(head, since=cutoff, stop=stop)]
+            finally:
+                reader.close()
+
+        def subprocess_incremental() -> list[str]:
+            out = subprocess.run(
+                ["git", "-C", str(repo), "log", "--format=%H", f"{packed_head}..HEAD"],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            return out.split()
+
+        def reader_oneline() -> list[str]:
+            reader = GitRepo(git_dir)
+            try:
+                return reader.log_oneline(5)
+            finally:
+                reader.close()
+
+        def subprocess_oneline() -> list[str]:
+            out = subprocess.run(
+                ["git", "-C", str(repo), "log", "--oneline", "-5"],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            return out.splitlines()
+
+        rows = [
+            ("signals window", reader_window, subprocess_window),
+            ("signals new commits", reader_incremental, subprocess_incremental),
+            ("health oneline -5", reader_oneline, subprocess_oneline),
+        ]
+        print(f"{'read':<20}{'in-process ms':>15}{'git ms':>10}{'results':>10}")
+        for name, in_process, spawned in rows:
+            reader_ms, reader_result = _time(in_process, repeat)
+            git_ms, git_result = _time(spawned, repeat)
+            if [str(r)[:7] for r in reader_result] != [str(r)[:7] for r in git_result]:
+                raise AssertionError(f"{name}: in-process result differs from git")
+            print(f"{name:<20}{reader_ms:>15.2f}{git_ms:>10.2f}{len(reader_result):>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commits", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.commits, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
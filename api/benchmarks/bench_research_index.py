@@ -0,0 +1,104 @@
+"""Benchmark the research brief index on a synthetic overnight directory.
+
+Generates N markdown briefs (Zipf-distributed vocabulary, a handful of
+headings each) under a throwaway HOME, then reports full build time, the cost
+of a no-op and a small incremental refresh (the per-poll cost), and list and
+search latency between polls.
+
+    python -m api.benchmarks.bench_research_index --briefs 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+VOCABULARY_SIZE = 20_000
+
+
+def _words(rng: random.Random, vocabulary: list[str], cum_weights: list[float], n: int) -> str:
+    return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=n))
+
+
+def generate(directory: Path, briefs: int, seed: int = 7) -> list[str]:
+    """Write ``briefs`` markdown files; returns the vocabulary used."""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(VOCABULARY_SIZE)]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(VOCABULARY_SIZE)))
+    directory.mkdir(parents=True, exist_ok=True)
+    for n in range(briefs):
+        sections = [f"# Brief {n}: {_words(rng, vocabulary, weights, 4)}\n"]
+        for s in range(rng.randint(3, 8)):
+            sections.append(f"\n## Section {s} {_words(rng, vocabulary, weights, 3)}\n\n")
+            sections.append(_words(rng, vocabulary, weights, rng.randint(60, 250)) + "\n")
+        (directory / f"brief-{n:05d}.md").write_text("".join(sections), encoding="utf-8")
+    return vocabulary
+
+
+def _percentiles(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+    return f"p50={p(0.50):.2f}ms p95={p(0.95):.2f}ms p99={p(0.99):.2f}ms"
+
+
+def run(briefs: int, queries: int) -> None:
+    from api.services.file_reader import OVERNIGHT_DIR
+    from api.services.research_index import ResearchIndex
+
+    started = time.perf_counter()
+    vocabulary = generate(OVERNIGHT_DIR, briefs)
+    print(f"generated {briefs} briefs in {time.perf_counter() - started:.1f}s")
+
+    index = ResearchIndex(OVERNIGHT_DIR, poll_interval=0)
+    started = time.perf_counter()
+    index.refresh(force=True)
+    print(f"full build: {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    started = time.perf_counter()
+    index.refresh(force=True)
+    print(f"no-op refresh: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    for n in range(10):
+        path = OVERNIGHT_DIR / f"brief-{n:05d}.md"
+        path.write_text(path.read_text(encoding="utf-8") + "\nappendix term42\n", encoding="utf-8")
+    started = time.perf_counter()
+    index.refresh(force=True)
+    print(f"refresh after 10 edits: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    # Reads below are served between polls, as they are in the API.
+    index.poll_interval = 3600
+    started = time.perf_counter()
+    index.list_briefs()
+    print(f"list: {(time.perf_counter() - started) * 1000:.2f}ms")
+
+    rng = random.Random(11)
+    samples = []
+    for _ in range(queries):
+        # Mix common and rare terms, one to three per query
+        query = " ".join(rng.choice(vocabulary[: rng.choice([50, 2000, VOCABULARY_SIZE])])
+                         for _ in range(rng.randint(1, 3)))
+        started = time.perf_counter()
+        index.search(query, limit=10)
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"search x{queries}: mean={statistics.mean(samples):.2f}ms {_percentiles(samples)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--briefs", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as home:
+        # file_reader derives its allowed paths from HOME at import time
+        os.environ["HOME"] = home
+        run(args.briefs, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark SSE emission for agent streams: per-delta frames vs coalesced.
+
+Feeds synthetic token streams (short text deltas at a fixed pace, then usage
+and done) through the old one-``json.dumps``-frame-per-delta path and through
+``api.services.sse.coalesce``, with many streams running concurrently. Every
+frame is written to a socket (drained by a reader thread) so per-frame
+syscalls are counted. Reports frames and bytes per response, frames/sec, and
+emission CPU per response: process CPU minus a run that only drains the
+source, so the synthetic token generator itself is not counted.
+
+    python -m api.benchmarks.bench_sse --streams 50 --deltas 2000 --pace-ms 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from api.services.sse import FLUSH_BYTES, FLUSH_INTERVAL, coalesce, encode_event
+
+
+async def _source(deltas: int, pace: float) -> AsyncIterator[dict[str, Any]]:
+    """Token-sized deltas, ``pace`` seconds apart (yielding to the loop every one)."""
+    started = time.perf_counter()
+    for i in range(deltas):
+        due = started + i * pace
+        delay = due - time.perf_counter()
+        await asyncio.sleep(delay if delay > 0 else 0)
+        yield {"type": "text", "content": f" tok{i % 97}"}
+    yield {"type": "usage", "input_tokens": 1200, "output_tokens": deltas}
+    yield {"type": "done"}
+
+
+async def _per_delta(events: AsyncIterator[dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for event in events:
+        yield f"data: {json.dumps(event)}\n\n".encode()
+
+
+async def _drain(events: AsyncIterator[dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for _event in events:
+        pass
+    return
+    yield b""
+
+
+async def _consume(frames: AsyncIterator[bytes], sink: socket.socket) -> tuple[int, int]:
+    count = size = 0
+    async for frame in frames:
+        sink.sendall(frame)
+        count += 1
+        size += len(frame)
+    return count, size
+
+
+def _reader(sock: socket.socket) -> None:
+    while sock.recv(1 << 16):
+        pass
+
+
+async def _run(mode: str, streams: int, deltas: int, pace: float, sink: socket.socket) -> dict[str, float]:
+    def frames_for() -> AsyncIterator[bytes]:
+        events = _source(deltas, pace)
+        if mode == "source-only":
+            return _drain(events)
+        return _per_delta(events) if mode == "per-delta" else coalesce(events)
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    results = await asyncio.gather(*(_consume(frames_for(), sink) for _ in range(streams)))
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    frames = sum(r[0] for r in results)
+    return {
+        "frames_per_response": frames / streams,
+        "bytes_per_response": sum(r[1] for r in results) / streams,
+        "frames_per_sec": frames / wall,
+        "cpu_ms_per_response": cpu * 1000 / streams,
+        "wall_s": wall,
+    }
+
+
+def _encode_micro(n: int) -> None:
+    event = {"type": "text", "content": ' a "quoted" token\n'}
+    started = time.perf_counter()
+    for _ in range(n):
+        f"data: {json.dumps(event)}\n\n".encode()
+    baseline = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(n):
+        encode_event(event)
+    fast = time.perf_counter() - started
+    assert encode_event(event) == f"data: {json.dumps(event)}\n\n".encode()
+    print(f"encode text delta: json.dumps {baseline / n * 1e9:.0f}ns  "
+          f"encode_event {fast / n * 1e9:.0f}ns  ({baseline / fast:.1f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=50, help="concurrent responses")
+    parser.add_argument("--deltas", type=int, default=2000, help="text deltas per response")
+    parser.add_argument("--pace-ms", type=float, default=0.5, help="gap between deltas")
+    args = parser.parse_args()
+
+    _encode_micro(200_000)
+    print(f"coalesce window: {FLUSH_INTERVAL * 1000:g}ms / {FLUSH_BYTES} bytes")
+    sink, drain = socket.socketpair()
+    threading.Thread(target=_reader, args=(drain,), daemon=True).start()
+    pace = args.pace_ms / 1000
+    base = asyncio.run(_run("source-only", args.streams, args.deltas, pace, sink))
+    for mode in ("per-delta", "coalesced"):
+        r = asyncio.run(_run(mode, args.streams, args.deltas, pace, sink))
+        emit_cpu = r["cpu_ms_per_response"] - base["cpu_ms_per_response"]
+        print(f"{mode:>10}: frames/response={r['frames_per_response']:,.0f} "
+              f"bytes/response={r['bytes_per_response']:,.0f} "
+              f"frames/s={r['frames_per_sec']:,.0f} "
+              f"emit cpu/response={emit_cpu:.1f}ms wall={r['wall_s']:.2f}s")
+    sink.close()
+
+
+if __name__ == "__main__":
+    main()
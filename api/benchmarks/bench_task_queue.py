@@ -0,0 +1,68 @@
+"""Benchmark concurrent enqueues into the overnight task queue store.
+
+Spawns several writer processes that append to one queue as fast as they can
+(compaction included), then checks that every task made it to disk exactly
+once. Runs against a throwaway HOME so the real ClawdBot data is untouched.
+
+    python -m api.benchmarks.bench_task_queue --writers 8 --tasks 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+
+def _writer(writer_id: int, tasks: int, barrier: multiprocessing.synchronize.Barrier) -> None:
+    from api.services.file_reader import TASK_QUEUE_PATH
+    from api.services.task_queue import TaskQueueStore
+
+    store = TaskQueueStore(TASK_QUEUE_PATH)
+    barrier.wait()
+    for n in range(tasks):
+        store.append({"description": f"w{writer_id}-{n}", "priority": "normal", "status": "queued"})
+
+
+def run(writers: int, tasks: int) -> None:
+    ctx = multiprocessing.get_context("fork")
+    barrier = ctx.Barrier(writers + 1)
+    procs = [ctx.Process(target=_writer, args=(w, tasks, barrier)) for w in range(writers)]
+    for proc in procs:
+        proc.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for proc in procs:
+        proc.join()
+    elapsed = time.perf_counter() - started
+
+    from api.services.file_reader import TASK_QUEUE_PATH
+    from api.services.task_queue import TaskQueueStore
+
+    queue = TaskQueueStore(TASK_QUEUE_PATH).list_tasks()
+    expected = {f"w{w}-{n}" for w in range(writers) for n in range(tasks)}
+    seen = [t["description"] for t in queue]
+    lost = len(expected - set(seen))
+    duplicated = len(seen) - len(set(seen))
+    total = writers * tasks
+    print(f"writers={writers} tasks={total} elapsed={elapsed:.2f}s "
+          f"rate={total / elapsed:,.0f}/s lost={lost} duplicated={duplicated}")
+    if lost or duplicated:
+        raise SystemExit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=2000, help="tasks per writer")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as home:
+        # file_reader derives its allowed paths from HOME at import time
+        os.environ["HOME"] = home
+        run(args.writers, args.tasks)
+
+
+if __name__ == "__main__":
+    main()
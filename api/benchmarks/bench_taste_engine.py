@@ -0,0 +1,68 @@
+"""Benchmark taste-engine rounds over a large candidate pool.
+
+Builds an engine with synthetic archetypes (random descriptor phrases drawn
+from a design vocabulary), then times preference updates and full rounds —
+score every candidate, Gumbel-top-k sample 4 distinct archetypes — against a
+warmed-up preference vector.
+
+    python -m api.benchmarks.bench_taste_engine --archetypes 500 --per-archetype 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from api.services.taste_engine import TasteEngine
+
+VOCABULARY = (
+    "swiss typography, minimal grids, monochrome, neon accents, high contrast, bold sans-serif, "
+    "serif dominance, antique palettes, cream backgrounds, editorial focus, monospace, data-dense, "
+    "dark background, technical blueprints, backdrop blur, soft gradients, translucent layers, "
+    "brutalist blocks, pastel tones, hand-drawn icons, isometric illustration, glassmorphism, "
+    "retro pixels, generous whitespace, kinetic type, duotone photos, muted earth tones"
+).split(", ")
+
+
+def _timed(fn, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archetypes", type=int, default=500)
+    parser.add_argument("--per-archetype", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    archetypes = {
+        f"Archetype {i}": ", ".join(rng.sample(VOCABULARY, 4)) for i in range(args.archetypes)
+    }
+    started = time.perf_counter()
+    engine = TasteEngine(archetypes, per_archetype=args.per_archetype)
+    build_ms = (time.perf_counter() - started) * 1000
+    names = list(archetypes)
+
+    preference = engine.zero()
+    for _ in range(10):
+        preference = engine.update(preference, rng.choice(names))
+
+    updates = _timed(lambda: engine.update(preference, rng.choice(names)), args.rounds)
+    rounds = _timed(lambda: engine.sample(preference, 4, chaos=0.3), args.rounds)
+    print(f"archetypes={args.archetypes} candidates={len(engine.candidates):,} "
+          f"dim={engine.dim} build={build_ms:.0f}ms")
+    print(f"update: p50={statistics.median(updates) * 1000:.1f}us")
+    print(f"round:  p50={statistics.median(rounds):.2f}ms "
+          f"p95={sorted(rounds)[int(0.95 * (len(rounds) - 1))]:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
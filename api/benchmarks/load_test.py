@@ -0,0 +1,383 @@
+"""Load-test the API against generated fixtures; per-route throughput and tail latency.
+
+Builds a throwaway HOME holding ``clawdbot/overnight`` briefs, a large
+``task-queue.json``, and a multi-MB ``token-usage.json`` plus token event
+log. It also builds a ``DEV_DIR`` of synthetic git repos and starts the
+stub Anthropic server. ``api.main:app`` is then run under uvicorn in a
+subprocess, with auth in dev mode.
+
+Each route is driven by ``concurrency`` closed-loop clients for
+``--duration`` seconds after a short warm-up, at every requested
+concurrency level. Results go to a JSON file, together with the server's
+own ``/api/metrics`` snapshot and the git commit. ``--compare`` diffs
+against an earlier file, so regressions show up across commits.
+
+    python -m api.benchmarks.load_test --concurrency 1,8,32 --duration 10
+    python -m api.benchmarks.load_test --routes signals,research_brief --compare results/old.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from api.benchmarks.bench_git_reader import build_repo
+from api.benchmarks.stub_anthropic import StubServer, StubState
+
+ROOT = Path(__file__).resolve().parents[2]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+WARMUP_SECONDS = 1.0
+SEARCH_TERMS = ["latency", "cache", "index", "queue", "stream", "taste", "agent", "budget"]
+WORDS = (
+    "latency cache index queue stream taste agent budget design memory cursor "
+    "snapshot commit branch research brief token model prompt signal overnight"
+).split()
+
+
+@dataclass
+class Fixtures:
+    home: Path
+    dev_dir: Path
+    slugs: list[str]
+    sizes: dict[str, Any]
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + ".\n\n"
+
+
+def build_fixtures(root: Path, args: argparse.Namespace) -> Fixtures:
+    rng = random.Random(args.seed)
+    home = root / "home"
+    overnight = home / "clawdbot" / "overnight"
+    data = home / "clawdbot" / "data"
+    ops = home / "Desktop" / "Manny" / "ops"
+    for d in (overnight, data, ops):
+        d.mkdir(parents=True)
+
+    slugs = []
+    for n in range(args.briefs):
+        slug = f"brief-{n:05d}"
+        sections = "".join(f"## Section {s}\n\n{_paragraph(rng, 120)}" for s in range(6))
+        (overnight / f"{slug}.md").write_text(f"# Brief {n}\n\n{_paragraph(rng, 60)}{sections}", encoding="utf-8")
+        slugs.append(slug)
+
+    statuses, priorities = ["queued", "running", "done", "failed"], ["low", "normal", "high"]
+    tasks = [
+        {
+            "id": f"{n:032x}",
+            "description": _paragraph(rng, 12).strip(),
+            "priority": rng.choice(priorities),
+            "status": rng.choice(statuses),
+        }
+        for n in range(args.tasks)
+    ]
+    (data / "task-queue.json").write_text(json.dumps(tasks), encoding="utf-8")
+
+    def period() -> dict[str, Any]:
+        return {"input_tokens": rng.randrange(10**7), "output_tokens": rng.randrange(10**6), "cost_usd": round(rng.random() * 100, 2)}
+
+    usage = {"today": period(), "this_week": period(), "this_month": period(), "by_source": {}, "last_updated": "now"}
+    # Grow by_source until the file reaches the requested size
+    target = args.token_mb * 1024 * 1024
+    n = 0
+    while n * 110 < target:
+        usage["by_source"][f"source-{n:06d}"] = period()
+        n += 1
+    (ops / "token-usage.json").write_text(json.dumps(usage), encoding="utf-8")
+
+    now = time.time()
+    with (ops / "token-events.jsonl").open("w", encoding="utf-8") as f:
+        for i in range(args.token_events):
+            f.write(json.dumps({
+                "ts": now - rng.random() * 30 * 86400,
+                "model": rng.choice(["claude-sonnet", "claude-haiku"]),
+                "source": "agent",
+                "input_tokens": rng.randrange(5000),
+                "output_tokens": rng.randrange(2000),
+                "cache_read_input_tokens": rng.randrange(5000),
+                "cache_creation_input_tokens": 0,
+            }) + "\n")
+
+    dev_dir = root / "dev"
+    dev_dir.mkdir()
+    for n in range(args.repos):
+        build_repo(dev_dir / f"repo-{n:03d}", args.commits, loose=0)
+
+    sizes = {
+        "briefs": args.briefs,
+        "tasks": args.tasks,
+        "task_queue_mb": round((data / "task-queue.json").stat().st_size / 2**20, 2),
+        "token_usage_mb": round((ops / "token-usage.json").stat().st_size / 2**20, 2),
+        "token_events": args.token_events,
+        "repos": args.repos,
+        "commits_per_repo": args.commits,
+    }
+    return Fixtures(home, dev_dir, slugs, sizes)
+
+
+# A route: (name, builder) where builder(rng) -> (method, path, json body, streaming)
+RequestSpec = tuple[str, str, Any, bool]
+
+
+def route_table(fixtures: Fixtures, session_id: str | None) -> dict[str, Callable[[random.Random], RequestSpec]]:
+    slugs = fixtures.slugs
+    table: dict[str, Callable[[random.Random], RequestSpec]] = {
+        "health": lambda r: ("GET", "/api/health", None, False),
+        "tokens": lambda r: ("GET", "/api/tokens", None, False),
+        "tokens_summary": lambda r: ("GET", "/api/tokens/summary?granularity=hour", None, False),
+        "overnight": lambda r: ("GET", "/api/overnight", None, False),
+        "overnight_page": lambda r: ("GET", f"/api/overnight?status=queued&limit=50&cursor={r.randrange(200)}", None, False),
+        "research": lambda r: ("GET", "/api/research", None, False),
+        "research_brief": lambda r: ("GET", f"/api/research/{r.choice(slugs)}", None, False),
+        "research_search": lambda r: ("GET", f"/api/research/search?q={r.choice(SEARCH_TERMS)}", None, False),
+        "signals": lambda r: ("GET", "/api/signals", None, False),
+        "agent_run": lambda r: (
+            "POST",
+            "/api/agent/run",
+            {"messages": [{"role": "user", "content": f"status report {r.randrange(10**9)}"}], "cache": False},
+            True,
+        ),
+    }
+    if session_id is not None:
+        table["taste_round"] = lambda r: (
+            "POST",
+            "/api/taste/round",
+            {"session_id": session_id, "prompt": f"landing page {r.randrange(50)}", "round_number": 1},
+            False,
+        )
+    return table
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(fixtures: Fixtures, stub_url: str) -> tuple[subprocess.Popen[bytes], str]:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "HOME": str(fixtures.home),
+        "DEV_DIR": str(fixtures.dev_dir),
+        "ANTHROPIC_API_KEY": "stub",
+        "ANTHROPIC_BASE_URL": stub_url,
+        "PYTHONPATH": str(ROOT),
+    }
+    # Dev-mode auth, so requests need no token
+    for name in ("SUPABASE_JWT_SECRET", "SUPABASE_JWKS_URL"):
+        env.pop(name, None)
+    # The app logs to stdout per request; keep that out of the report
+    with (fixtures.home.parent / "server.log").open("wb") as log:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            tail = (fixtures.home.parent / "server.log").read_text(errors="replace")[-2000:]
+            raise RuntimeError(f"API server exited with {proc.returncode}:\n{tail}")
+        try:
+            httpx.get(f"{base_url}/api/metrics", timeout=1).raise_for_status()
+            return proc, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("API server did not start")
+
+
+def _quantiles(samples: list[float]) -> dict[str, float | None]:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "max": None, "mean": None}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": round(ordered[-1], 3), "mean": round(statistics.fmean(ordered), 3)}
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    build: Callable[[random.Random], RequestSpec],
+    concurrency: int,
+    duration: float,
+    seed: int,
+) -> dict[str, Any]:
+    """Closed loop: each worker sends its next request as soon as the last finishes."""
+    latencies: list[float] = []
+    ttfbs: list[float] = []
+    errors: dict[str, int] = {}
+    recording = False
+
+    async def one(rng: random.Random) -> None:
+        method, path, body, streaming = build(rng)
+        started = time.perf_counter()
+        first: float | None = None
+        try:
+            async with client.stream(method, path, json=body) as response:
+                async for _ in response.aiter_raw():
+                    if first is None:
+                        first = time.perf_counter()
+                status = response.status_code
+        except httpx.HTTPError as e:
+            if recording:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            return
+        if not recording:
+            return
+        if status >= 400:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+            return
+        latencies.append((time.perf_counter() - started) * 1000)
+        if streaming and first is not None:
+            ttfbs.append((first - started) * 1000)
+
+    async def worker(n: int, until: float) -> None:
+        rng = random.Random(seed * 1000 + n)
+        while time.perf_counter() < until:
+            await one(rng)
+
+    warm_until = time.perf_counter() + WARMUP_SECONDS
+    await asyncio.gather(*(worker(n, warm_until) for n in range(concurrency)))
+    recording = True
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n, started + duration) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": _quantiles(latencies),
+    }
+    if ttfbs:
+        result["ttfb_ms"] = _quantiles(ttfbs)
+    return result
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "-C", str(ROOT), "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict[str, Any], baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    before = {(r["route"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline_path.name} (commit {baseline['meta'].get('commit')}):")
+    matched = 0
+    for r in current["results"]:
+        old = before.get((r["route"], r["concurrency"]))
+        if old is None or not old["rps"] or old["latency_ms"]["p99"] is None or r["latency_ms"]["p99"] is None:
+            continue
+        matched += 1
+        rps = (r["rps"] - old["rps"]) / old["rps"] * 100
+        p99 = (r["latency_ms"]["p99"] - old["latency_ms"]["p99"]) / old["latency_ms"]["p99"] * 100
+        print(f"  {r['route']:>16} c={r['concurrency']:<3}  rps {rps:+6.1f}%  p99 {p99:+6.1f}%")
+    if not matched:
+        print("  no route/concurrency pairs in common")
+
+
+async def run(args: argparse.Namespace, fixtures: Fixtures, base_url: str) -> dict[str, Any]:
+    levels = [int(c) for c in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        session = await client.post("/api/taste/start", json={})
+        session_id = session.json().get("session_id") if session.status_code == 200 else None
+        table = route_table(fixtures, session_id)
+        names = args.routes.split(",") if args.routes else list(table)
+        unknown = [n for n in names if n not in table]
+        if unknown:
+            raise SystemExit(f"Unknown routes: {', '.join(unknown)} (have: {', '.join(table)})")
+
+        results = []
+        for name in names:
+            for concurrency in levels:
+                result = await drive(client, table[name], concurrency, args.duration, args.seed)
+                results.append({"route": name, "concurrency": concurrency, **result})
+                lat = result["latency_ms"]
+                ttfb = f"  ttfb p50 {result['ttfb_ms']['p50']}ms" if "ttfb_ms" in result else ""
+                print(f"{name:>16} c={concurrency:<3} {result['rps']:8.1f} rps  "
+                      f"p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']} ms  "
+                      f"errors {sum(result['errors'].values())}{ttfb}")
+        server_metrics = (await client.get("/api/metrics")).json()
+    return {"results": results, "server_metrics": server_metrics}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="measured seconds per route and level")
+    parser.add_argument("--routes", default="", help="comma-separated subset of route names")
+    parser.add_argument("--briefs", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--token-mb", type=float, default=4.0)
+    parser.add_argument("--token-events", type=int, default=50000)
+    parser.add_argument("--repos", type=int, default=20)
+    parser.add_argument("--commits", type=int, default=2000, help="commits per repo")
+    parser.add_argument("--stub-words", type=int, default=120)
+    parser.add_argument("--stub-delay", type=float, default=0.002, help="stub seconds between words")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None, help="result file (default: results/load-<commit>-<time>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        fixtures = build_fixtures(Path(tmp), args)
+        print(f"fixtures built in {time.perf_counter() - started:.1f}s: {fixtures.sizes}")
+        with StubServer(StubState(args.stub_words, args.stub_delay)) as stub:
+            proc, base_url = start_server(fixtures, stub.base_url)
+            try:
+                report = asyncio.run(run(args, fixtures, base_url))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "fixtures": fixtures.sizes,
+        },
+        **report,
+    }
+    out = args.out or RESULTS_DIR / f"load-{commit or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nwrote {out}")
+    if args.compare is not None:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Local stub of the Anthropic Messages streaming API.
+
+Streams a canned reply word by word with a configurable delay and reports
+usage the way the real API does, including prompt-cache accounting: a
+``cache_control`` breakpoint whose prefix was seen before counts as a cache
+read, otherwise as a cache write. Point the agent runner at it with
+``ANTHROPIC_BASE_URL``.
+
+    python -m api.benchmarks.stub_anthropic --port 8765 --words 200 --delay 0.005
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+DEFAULT_REPLY_WORDS = 120
+
+
+def _tokens(text: str) -> int:
+    """Rough token estimate (~4 chars per token)."""
+    return max(1, len(text) // 4)
+
+
+def _blocks(body: dict[str, Any]) -> list[tuple[str, bool]]:
+    """Flatten system + messages into (text, has_breakpoint) in prompt order."""
+    out: list[tuple[str, bool]] = []
+    system = body.get("system") or []
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}]
+    for block in system:
+        out.append((block.get("text", ""), "cache_control" in block))
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            out.append((content, False))
+            continue
+        for block in content or []:
+            out.append((json.dumps(block, sort_keys=True), "cache_control" in block))
+    return out
+
+
+class StubState:
+    """Mutable knobs and counters shared by the stub's handlers."""
+
+    def __init__(self, words: int = DEFAULT_REPLY_WORDS, delay: float = 0.0) -> None:
+        self.words = words
+        self.delay = delay
+        self.requests: list[dict[str, Any]] = []
+        self.cached_prefixes: set[str] = set()
+        # Optional per-request override: body -> list of content blocks to emit
+        self.script: Any = None
+        self.cancelled = 0
+
+    def usage_for(self, body: dict[str, Any]) -> dict[str, int]:
+        cache_read = cache_write = uncached = 0
+        digest = hashlib.sha256()
+        pending = 0
+        for text, breakpoint_here in _blocks(body):
+            digest.update(text.encode())
+            pending += _tokens(text)
+            if breakpoint_here:
+                key = digest.hexdigest()
+                if key in self.cached_prefixes:
+                    cache_read += pending
+                else:
+                    self.cached_prefixes.add(key)
+                    cache_write += pending
+                pending = 0
+        uncached += pending
+        return {
+            "input_tokens": uncached,
+            "output_tokens": 1,
+            "cache_read_input_tokens": cache_read,
+            "cache_creation_input_tokens": cache_write,
+        }
+
+
+def _event(name: str, data: dict[str, Any]) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def create_app(state: StubState) -> Starlette:
+    async def messages(request: Request) -> StreamingResponse | JSONResponse:
+        body = await request.json()
+        state.requests.append(body)
+        usage = state.usage_for(body)
+        blocks = state.script(body) if state.script else [
+            {"type": "text", "text": " ".join(f"word{i}" for i in range(state.words))}
+        ]
+
+        async def stream() -> AsyncIterator[bytes]:
+            output_tokens = 0
+            try:
+                yield _event("message_start", {
+                    "type": "message_start",
+                    "message": {
+                        "id": f"msg_stub_{len(state.requests)}",
+                        "type": "message",
+                        "role": "assistant",
+                        "model": body.get("model", "stub"),
+                        "content": [],
+                        "stop_reason": None,
+                        "stop_sequence": None,
+                        "usage": usage,
+                    },
+                })
+                stop_reason = "end_turn"
+                for index, block in enumerate(blocks):
+                    if block["type"] == "tool_use":
+                        stop_reason = "tool_use"
+                        yield _event("content_block_start", {
+                            "type": "content_block_start",
+                            "index": index,
+                            "content_block": {**block, "input": {}},
+                        })
+                        yield _event("content_block_delta", {
+                            "type": "content_block_delta",
+                            "index": index,
+                            "delta": {"type": "input_json_delta", "partial_json": json.dumps(block["input"])},
+                        })
+                    else:
+                        yield _event("content_block_start", {
+                            "type": "content_block_start",
+                            "index": index,
+                            "content_block": {"type": "text", "text": ""},
+                        })
+                        words = block["text"].split(" ")
+                        for i, word in enumerate(words):
+                            if state.delay:
+                                await asyncio.sleep(state.delay)
+                            output_tokens += 1
+                            yield _event("content_block_delta", {
+                                "type": "content_block_delta",
+                                "index": index,
+                                "delta": {"type": "text_delta", "text": word if i == 0 else f" {word}"},
+                            })
+                    yield _event("content_block_stop", {"type": "content_block_stop", "index": index})
+                yield _event("message_delta", {
+                    "type": "message_delta",
+                    "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                    "usage": {"output_tokens": output_tokens},
+                })
+                yield _event("message_stop", {"type": "message_stop"})
+            except asyncio.CancelledError:
+                state.cancelled += 1
+                raise
+
+        if not body.get("stream"):
+            return JSONResponse({"error": "stub only supports streaming"}, status_code=400)
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/v1/messages", messages, methods=["POST"])])
+
+
+class StubServer:
+    """Run the stub in a background thread (for benchmarks and local checks)."""
+
+    def __init__(self, state: StubState | None = None, port: int = 0) -> None:
+        self.state = state or StubState()
+        config = uvicorn.Config(create_app(self.state), host="127.0.0.1", port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        sock = self._server.servers[0].sockets[0]
+        host, port = sock.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> StubServer:
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--words", type=int, default=DEFAULT_REPLY_WORDS)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds between words")
+    args = parser.parse_args()
+    uvicorn.run(create_app(StubState(args.words, args.delay)), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
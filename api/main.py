@@ -1,11 +1,56 @@
 """FastAPI sidecar — serves ClawdBot data to the emanuelteklu frontend."""
 
-from fastapi import FastAPI
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from api.middleware.auth import jwks_cache
+from api.middleware.timing import RequestMetricsMiddleware, route_timing
+from api.routers import health, tokens, overnight, research, agent, signals, taste, metrics, events
+from api.services import agent_runner
+from api.services.change_feed import change_feed
+from api.services.executors import ExecutorSaturated, ExecutorTimeout, io_pool, run_io
+from api.services.health_probes import health_probes
+from api.services.request_metrics import request_metrics
+from api.services.research_index import research_index
+from api.services.task_queue import task_queue
+
 
-from api.routers import health, tokens, overnight, research, agent, signals, taste
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Own process-wide clients for the lifetime of the app."""
+    await agent_runner.open_client()
+    await request_metrics.loop_lag.start()
+    await health_probes.start()
+    if jwks_cache is not None:
+        await jwks_cache.start()
+    # Cold-build the brief index in the background, free of the request deadline
+    warm_index = asyncio.create_task(run_io(research_index.refresh, True, timeout=None))
+    yield
+    warm_index.cancel()
+    await asyncio.gather(warm_index, return_exceptions=True)
+    if jwks_cache is not None:
+        await jwks_cache.stop()
+    await change_feed.stop()
+    await health_probes.stop()
+    await request_metrics.loop_lag.stop()
+    await taste.fire_crawl.close()
+    await agent_runner.close_client()
+    # Leave task-queue.json complete for ClawdBot
+    await run_io(task_queue.flush, timeout=None)
+    io_pool.shutdown()
 
-app = FastAPI(title="emanuelteklu-api", version="0.1.0")
+
+app = FastAPI(
+    title="emanuelteklu-api",
+    version="0.1.0",
+    lifespan=lifespan,
+    dependencies=[Depends(route_timing)],
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,12 +62,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+
+@app.exception_handler(ExecutorTimeout)
+async def executor_timeout(_request: Request, exc: ExecutorTimeout) -> JSONResponse:
+    return JSONResponse({"detail": str(exc)}, status_code=504)
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated(_request: Request, exc: ExecutorSaturated) -> JSONResponse:
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+
+
+# Outermost, so timings include everything below it
+app.add_middleware(RequestMetricsMiddleware)
+
 app.include_router(health.router, prefix="/api")
 app.include_router(tokens.router, prefix="/api")
 app.include_router(overnight.router, prefix="/api")
 app.include_router(research.router, prefix="/api")
 app.include_router(agent.router, prefix="/api")
 app.include_router(signals.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
 app.include_router(taste.router)  # Taste API (prefix included in router)
@@ -1,21 +1,175 @@
-"""JWT auth middleware — validates Supabase access tokens."""
+"""JWT auth middleware — validates Supabase access tokens.
+
+HS256 tokens are checked against ``SUPABASE_JWT_SECRET``. When
+``SUPABASE_JWKS_URL`` is set, RS256/ES256 tokens are checked against the
+project's published key set, looked up by ``kid``. Keys are cached and
+refreshed in the background, and an unknown ``kid`` triggers an immediate
+(rate-limited) refetch to pick up rotations.
+
+Successful verifications are cached by token hash until the token's ``exp``,
+so repeat requests skip signature checks entirely. ``verify_token`` is an
+async dependency: a cache hit costs a hash and a dict lookup on the loop, and
+a rotation's refetch awaits the network rather than holding a threadpool slot
+per waiting request.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Any
 
 import httpx
 import jwt
 from fastapi import HTTPException, Request
 
+logger = logging.getLogger(__name__)
+
 # Supabase project URL and expected admin user ID
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
 SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET", "")
+SUPABASE_JWKS_URL = os.environ.get("SUPABASE_JWKS_URL", "")
 ADMIN_USER_ID = os.environ.get("ADMIN_USER_ID", "")
 
-# Cache the JWKS (Supabase public keys)
-_jwks_cache: dict[str, Any] = {}
+TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "1024"))
+JWKS_REFRESH_INTERVAL = float(os.environ.get("AUTH_JWKS_REFRESH_INTERVAL", "600"))
+# Minimum gap between refetches triggered by an unknown kid
+JWKS_MIN_REFETCH = 30.0
+JWKS_TIMEOUT = 5.0
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class TokenCache:
+    """Bounded LRU of verified payloads, keyed by token hash, expiring at ``exp``."""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> dict[str, Any] | None:
+        """A copy of the cached payload, so callers can't alter the cache."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry[1])
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: bytes, payload: dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if self.max_entries <= 0 or not isinstance(exp, (int, float)):
+            return
+        # Our own copy: the caller keeps using (and may change) ``payload``
+        payload = copy.deepcopy(payload)
+        with self._lock:
+            self._entries[key] = (float(exp), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class JwksCache:
+    """Signing keys from a JWKS endpoint, indexed by ``kid``."""
+
+    def __init__(self, url: str, refresh_interval: float = JWKS_REFRESH_INTERVAL) -> None:
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        # Serialises unknown-kid refetches; rebuilt if the event loop changes
+        self._lock: asyncio.Lock | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task[None] | None = None
+        self.fetches = 0
+
+    def _load(self, data: dict[str, Any]) -> None:
+        keys = {}
+        for jwk in data.get("keys", []):
+            if jwk.get("use", "sig") != "sig" or "kid" not in jwk:
+                continue
+            try:
+                keys[jwk["kid"]] = jwt.PyJWK(jwk)
+            except jwt.PyJWTError as e:
+                logger.warning("Skipping JWKS key %s: %s", jwk.get("kid"), e)
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        """Fetch the key set now."""
+        self.fetches += 1
+        async with httpx.AsyncClient(timeout=JWKS_TIMEOUT) as client:
+            response = await client.get(self.url)
+        response.raise_for_status()
+        self._load(response.json())
+
+    def _refetch_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def get_key(self, kid: str) -> jwt.PyJWK:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        async with self._refetch_lock():
+            key = self._keys.get(kid)
+            if key is None and time.monotonic() - self._fetched_at >= JWKS_MIN_REFETCH:
+                try:
+                    await self.refresh()
+                except (httpx.HTTPError, ValueError) as e:
+                    logger.warning("JWKS fetch failed: %s", e)
+                    self._fetched_at = time.monotonic()
+                key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key: {kid}")
+        return key
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning("JWKS refresh failed: %s", e)
+            await asyncio.sleep(self.refresh_interval)
+
+    async def start(self) -> None:
+        """Lifespan startup: load keys now and keep them fresh in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(), name="jwks-refresh")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+token_cache = TokenCache()
+jwks_cache = JwksCache(SUPABASE_JWKS_URL) if SUPABASE_JWKS_URL else None
 
 
 def _extract_token(request: Request) -> str:
@@ -26,28 +180,40 @@ def _extract_token(request: Request) -> str:
     return auth[7:]
 
 
-def verify_token(request: Request) -> dict[str, Any]:
+async def _decode(token: str) -> dict[str, Any]:
+    """Verify a token's signature and claims with the key its header calls for."""
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm == "HS256" and SUPABASE_JWT_SECRET:
+        key: Any = SUPABASE_JWT_SECRET
+    elif algorithm in ASYMMETRIC_ALGORITHMS and jwks_cache is not None:
+        key = await jwks_cache.get_key(header.get("kid", ""))
+    else:
+        raise jwt.InvalidTokenError(f"Unsupported algorithm: {algorithm}")
+    return jwt.decode(token, key, algorithms=[algorithm], audience="authenticated")
+
+
+async def verify_token(request: Request) -> dict[str, Any]:
     """Verify JWT and check it belongs to the admin user.
 
     For local development without Supabase, accepts all requests
-    when SUPABASE_JWT_SECRET is not set.
+    when neither SUPABASE_JWT_SECRET nor SUPABASE_JWKS_URL is set.
     """
-    if not SUPABASE_JWT_SECRET:
+    if not SUPABASE_JWT_SECRET and jwks_cache is None:
         # Dev mode — no auth enforcement
         return {"sub": "dev-user", "dev_mode": True}
 
     token = _extract_token(request)
-    try:
-        payload = jwt.decode(
-            token,
-            SUPABASE_JWT_SECRET,
-            algorithms=["HS256"],
-            audience="authenticated",
-        )
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+    cache_key = token_cache.key(token)
+    payload = token_cache.get(cache_key)
+    if payload is None:
+        try:
+            payload = await _decode(token)
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token expired")
+        except jwt.InvalidTokenError as e:
+            raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+        token_cache.put(cache_key, payload)
 
     # Enforce admin-only access
     if ADMIN_USER_ID and payload.get("sub") != ADMIN_USER_ID:
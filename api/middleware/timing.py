@@ -0,0 +1,79 @@
+"""Request timing — feeds ``api.services.request_metrics``.
+
+``RequestMetricsMiddleware`` is a plain ASGI middleware rather than
+``BaseHTTPMiddleware``, so streaming responses pass through untouched and
+the endpoint runs in the request's own context (which carries the I/O
+attribution target). The route template is only known after routing, so
+the app-wide ``route_timing`` dependency reports it from inside the route.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+
+from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.services.request_metrics import RequestMetrics, request_metrics
+
+
+def route_template(scope: Scope) -> str | None:
+    """``METHOD /template`` of the route handling this request, prefixes included."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return None
+    regex = getattr(route, "path_regex", None)
+    if regex is not None and not regex.match(scope["path"]):
+        # Router prefix not folded into the route's own path: recover it
+        # from the part of the request path in front of the route's match.
+        found = re.search(regex.pattern.lstrip("^"), scope["path"])
+        if found is not None:
+            path = scope["path"][:found.start()] + path
+    return f"{scope['method']} {path}"
+
+
+async def route_timing(request: Request) -> None:
+    """App-wide dependency: tell the metrics which route this request hit."""
+    route = route_template(request.scope)
+    if route is not None:
+        request_metrics.routed(route)
+
+
+class RequestMetricsMiddleware:
+    """Times every HTTP request; see ``route_timing`` for route naming."""
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        times = self.metrics.begin()
+        started = time.perf_counter()
+        status = 500
+        event_stream = False
+        first_byte: float | None = None
+
+        async def send_timed(message: Message) -> None:
+            nonlocal status, event_stream, first_byte
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                event_stream = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            elif first_byte is None and message["type"] == "http.response.body" and message.get("body"):
+                first_byte = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            finished = time.perf_counter()
+            ttfb = (first_byte - started) * 1000 if event_stream and first_byte is not None else None
+            self.metrics.end(times, status, (finished - started) * 1000, ttfb)
@@ -9,7 +9,9 @@ from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
 from api.middleware.auth import verify_token
-from api.services.agent_runner import stream_agent
+from api.services.agent_runner import metrics, stream_agent
+from api.services.response_cache import response_cache
+from api.services.sse import PING_INTERVAL
 
 router = APIRouter(tags=["agent"])
 
@@ -18,6 +20,10 @@ class ChatRequest(BaseModel):
     """Incoming chat request."""
     messages: list[dict[str, Any]]
     extra_context: str = ""
+    # Serve repeated prompts from the response cache
+    cache: bool = True
+    # Replay cache hits at the original chunk timing instead of all at once
+    timed_replay: bool = False
 
 
 @router.post("/agent/run")
@@ -30,6 +36,15 @@ async def run_agent(
         stream_agent(
             messages=request.messages,
             extra_context=request.extra_context,
+            use_cache=request.cache,
+            timed_replay=request.timed_replay,
         ),
         media_type="text/event-stream",
+        ping=PING_INTERVAL,
     )
+
+
+@router.get("/agent/metrics")
+def get_agent_metrics(_user: dict = Depends(verify_token)) -> dict[str, Any]:
+    """Time-to-first-token, prompt-cache token totals and response-cache hit rate."""
+    return {**metrics.snapshot(), "response_cache": response_cache.stats()}
@@ -0,0 +1,26 @@
+"""Change events — SSE push of diffs to tokens, tasks, briefs and commits."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Request
+from sse_starlette.sse import EventSourceResponse
+
+from api.middleware.auth import verify_token
+from api.services.change_feed import change_feed
+from api.services.sse import PING_INTERVAL
+
+router = APIRouter(tags=["events"])
+
+
+@router.get("/events")
+async def stream_events(request: Request, _user: dict = Depends(verify_token)) -> EventSourceResponse:
+    """Stream ``tokens``, ``tasks``, ``briefs`` and ``commits`` diffs as they happen.
+
+    Clients fetch the REST endpoints once after ``ready`` and then apply
+    diffs. Reconnects send ``Last-Event-ID`` to replay missed events; on
+    ``resync`` the client should refetch everything.
+    """
+    return EventSourceResponse(
+        change_feed.stream(request.headers.get("last-event-id")),
+        ping=PING_INTERVAL,
+    )
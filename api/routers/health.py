@@ -2,39 +2,29 @@
 
 from __future__ import annotations
 
-import subprocess
+from typing import Any
 
 from fastapi import APIRouter, Depends
 
 from api.middleware.auth import verify_token
+from api.services.health_probes import health_probes
 
 router = APIRouter(tags=["health"])
 
 
-def _run_cmd(cmd: list[str]) -> str:
-    """Run a command and return stdout, or error string."""
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        return result.stdout.strip()
-    except (subprocess.TimeoutExpired, FileNotFoundError) as e:
-        return f"error: {e}"
-
-
 @router.get("/health")
-def get_health(_user: dict = Depends(verify_token)) -> dict:
-    """Return system health: PM2 processes and project git status."""
-    pm2_output = _run_cmd(["pm2", "jlist"])
-    git_status = _run_cmd(
-        ["git", "-C", "/Users/manny/dev/emanuelteklu", "log", "--oneline", "-5"]
-    )
-
+async def get_health(_user: dict = Depends(verify_token)) -> dict[str, Any]:
+    """Return system health from the background probes' latest results.
+
+    Never runs a check itself: ``pm2`` is a parsed process summary and
+    ``git_recent`` the project's last commits, as of each probe's
+    ``checked_at`` (see ``probes``).
+    """
+    snapshot = health_probes.snapshot()
+    probes = snapshot["probes"]
     return {
-        "status": "ok",
-        "pm2": pm2_output,
-        "git_recent": git_status,
+        "status": snapshot["status"],
+        "pm2": probes.get("pm2", {}).get("value"),
+        "git_recent": probes.get("git", {}).get("value"),
+        "probes": probes,
     }
@@ -0,0 +1,76 @@
+"""Request metrics endpoints — latency histograms and the opt-in profiler."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from api.middleware.auth import verify_token
+from api.services.change_feed import change_feed
+from api.services.executors import executor_stats
+from api.services.file_reader import json_cache_stats
+from api.services.http_cache import http_cache
+from api.services.request_metrics import MAX_PROFILE_SECONDS, PROFILER_ENABLED, request_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+class ProfileRequest(BaseModel):
+    """Which route to profile, and for how long."""
+    route: str = Field(..., description="Route key as listed by /metrics, e.g. 'GET /api/signals'")
+    seconds: float = Field(30, gt=0, le=MAX_PROFILE_SECONDS)
+    interval_ms: float = Field(5, ge=1, le=1000)
+
+
+def _require_profiler() -> None:
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiler disabled (set METRICS_PROFILER=1)")
+
+
+@router.get("/metrics")
+def get_metrics(_user: dict = Depends(verify_token)) -> dict[str, Any]:
+    """Per-route latency (p50/p95/p99), in-flight counts, attributed I/O time,
+    SSE time-to-first-byte, event-loop lag and executor queues, all in milliseconds,
+    plus parsed-JSON cache, change feed and HTTP cache counters."""
+    return {
+        **request_metrics.snapshot(),
+        "executors": executor_stats(),
+        "json_cache": json_cache_stats(),
+        "change_feed": change_feed.stats(),
+        "http_cache": http_cache.stats(),
+    }
+
+
+@router.get("/metrics/profile", response_model=None)
+def get_profile(folded: bool = False, _user: dict = Depends(verify_token)) -> dict[str, Any] | PlainTextResponse:
+    """Profiler status; ``folded=true`` returns the last dump's folded stacks."""
+    profiler = request_metrics.profiler
+    if not folded:
+        return profiler.status()
+    if profiler.path is None:
+        raise HTTPException(status_code=404, detail="No profile written yet")
+    return PlainTextResponse(profiler.path.read_text(encoding="utf-8"))
+
+
+@router.post("/metrics/profile")
+def start_profile(body: ProfileRequest, _user: dict = Depends(verify_token)) -> dict[str, Any]:
+    """Sample stacks while ``route`` has requests in flight, for ``seconds``."""
+    _require_profiler()
+    if body.route not in request_metrics.routes:
+        raise HTTPException(status_code=404, detail=f"No requests seen for route {body.route!r}")
+    try:
+        request_metrics.profiler.start(body.route, body.seconds, body.interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return request_metrics.profiler.status()
+
+
+@router.delete("/metrics/profile")
+def stop_profile(_user: dict = Depends(verify_token)) -> dict[str, Any]:
+    """Stop profiling early and write the profile."""
+    _require_profiler()
+    request_metrics.profiler.stop()
+    return request_metrics.profiler.status()
@@ -2,16 +2,20 @@
 
 from __future__ import annotations
 
-from typing import Any
+import functools
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
 from api.middleware.auth import verify_token
-from api.services.file_reader import TASK_QUEUE_PATH, read_json, write_json
+from api.services.executors import run_io
+from api.services.http_cache import Payload, http_cache
+from api.services.task_queue import TaskQueueError, task_queue
 
 router = APIRouter(tags=["overnight"])
 
+MAX_PAGE_SIZE = 500
+
 
 class TaskItem(BaseModel):
     """Schema for adding a task to the overnight queue."""
@@ -20,29 +24,50 @@ class TaskItem(BaseModel):
 
 
 @router.get("/overnight")
-def get_overnight_queue(_user: dict = Depends(verify_token)) -> list[Any]:
-    """Return the current task queue."""
-    data = read_json(TASK_QUEUE_PATH)
-    if data is None:
-        return []
-    return data
+async def get_overnight_queue(
+    request: Request,
+    status: str | None = None,
+    priority: str | None = None,
+    cursor: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    _user: dict = Depends(verify_token),
+) -> Response:
+    """Return the task queue, optionally filtered and paginated.
+
+    Without ``limit`` the whole (filtered) queue is returned. With it, the
+    position to resume from is sent in ``X-Next-Cursor``. Polls carrying a
+    matching ``If-None-Match`` get a bodiless 304.
+    """
+    params = (status, priority, cursor, limit)
+    # Only decides 304s and cache hits; the body is tagged with the version it was read at
+    version = await run_io(task_queue.version)
+
+    async def produce() -> Payload:
+        try:
+            page = await run_io(
+                functools.partial(task_queue.query, status=status, priority=priority, cursor=cursor, limit=limit)
+            )
+        except TaskQueueError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        headers = {} if page.next_cursor is None else {"X-Next-Cursor": str(page.next_cursor)}
+        return Payload(page.tasks, headers, version=page.version)
+
+    return await http_cache.respond(request, f"overnight{params!r}", version, produce)
 
 
 @router.post("/overnight")
-def add_overnight_task(
+async def add_overnight_task(
     task: TaskItem,
     _user: dict = Depends(verify_token),
 ) -> dict:
     """Append a task to the overnight queue."""
-    queue = read_json(TASK_QUEUE_PATH) or []
-    if not isinstance(queue, list):
-        raise HTTPException(status_code=500, detail="Task queue is malformed")
-
     new_task = {
         "description": task.description,
         "priority": task.priority,
         "status": "queued",
     }
-    updated_queue = [*queue, new_task]
-    write_json(TASK_QUEUE_PATH, updated_queue)
-    return {"ok": True, "task": new_task, "queue_length": len(updated_queue)}
+    try:
+        stored, queue_length = await run_io(task_queue.append, new_task)
+    except TaskQueueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"ok": True, "task": stored, "queue_length": queue_length}
@@ -2,35 +2,122 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+import functools
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 
 from api.middleware.auth import verify_token
-from api.services.file_reader import OVERNIGHT_DIR, list_markdown_files, read_text
+from api.services.executors import run_io
+from api.services.http_cache import file_validator, http_cache
+from api.services.file_reader import (
+    OVERNIGHT_DIR,
+    aiter_file_range,
+    read_bytes_range,
+    read_text,
+)
+from api.services.research_index import Brief, research_index
 
 router = APIRouter(tags=["research"])
 
+MARKDOWN_MEDIA_TYPE = "text/markdown; charset=utf-8"
 
-@router.get("/research")
-def list_research(_user: dict = Depends(verify_token)) -> list[dict]:
-    """List all overnight research briefs."""
-    return list_markdown_files(OVERNIGHT_DIR)
 
-
-@router.get("/research/{slug}")
-def get_research(slug: str, _user: dict = Depends(verify_token)) -> dict:
-    """Read a specific research brief by slug."""
+def _safe_slug(slug: str) -> str:
     # Sanitize slug — only allow alphanumeric, hyphens, underscores
     safe_slug = "".join(c for c in slug if c.isalnum() or c in "-_")
     if safe_slug != slug:
         raise HTTPException(status_code=400, detail="Invalid slug")
+    return safe_slug
+
+
+async def _current_brief(slug: str) -> Brief:
+    brief = await run_io(research_index.current, _safe_slug(slug))
+    if brief is None:
+        raise HTTPException(status_code=404, detail="Research brief not found")
+    return brief
+
+
+@router.get("/research")
+async def list_research(request: Request, _user: dict = Depends(verify_token)) -> Response:
+    """List all overnight research briefs."""
+    version = await run_io(research_index.version)
+    return await http_cache.respond(request, "research", version, functools.partial(run_io, research_index.list_briefs))
+
+
+@router.get("/research/search")
+async def search_research(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    _user: dict = Depends(verify_token),
+) -> list[dict]:
+    """Full-text search over research briefs, BM25-ranked with snippets."""
+    return await run_io(functools.partial(research_index.search, q, limit=limit))
+
+
+@router.get("/research/{slug}/outline")
+async def get_research_outline(slug: str, _user: dict = Depends(verify_token)) -> list[dict]:
+    """Heading outline of a brief, with the byte span of each section."""
+    return (await _current_brief(slug)).outline
+
+
+@router.get("/research/{slug}", response_model=None)
+async def get_research(
+    request: Request,
+    slug: str,
+    section: str | None = Query(None, description="Heading anchor or outline index"),
+    raw: bool = Query(False, description="Stream raw markdown instead of JSON"),
+    _user: dict = Depends(verify_token),
+) -> Response:
+    """Read a specific research brief by slug.
+
+    ``raw=true`` streams the markdown from disk (honouring ``Range``) rather
+    than embedding it in JSON; ``section`` narrows either form to a single
+    heading's span from the outline. JSON forms are served through the
+    HTTP cache, keyed on the file's stat.
+    """
+    safe_slug = _safe_slug(slug)
+    if raw:
+        brief = await _current_brief(safe_slug)
+        if section is None:
+            return FileResponse(brief.path, media_type=MARKDOWN_MEDIA_TYPE)
+        heading = brief.find_section(section)
+        if heading is None:
+            raise HTTPException(status_code=404, detail="Section not found")
+        return StreamingResponse(
+            aiter_file_range(brief.path, heading["offset"], heading["end"]),
+            media_type=MARKDOWN_MEDIA_TYPE,
+        )
 
     path = OVERNIGHT_DIR / f"{safe_slug}.md"
-    content = read_text(path)
-    if content is None:
+    validator = await run_io(file_validator, path)
+    if validator is None:
         raise HTTPException(status_code=404, detail="Research brief not found")
+    version, modified = validator
+
+    async def produce() -> dict[str, Any]:
+        if section is None:
+            content = await run_io(read_text, path)
+            if content is None:
+                raise HTTPException(status_code=404, detail="Research brief not found")
+            return {
+                "slug": safe_slug,
+                "name": safe_slug.replace("-", " ").title(),
+                "content": content,
+            }
+
+        brief = await _current_brief(safe_slug)
+        heading = brief.find_section(section)
+        if heading is None:
+            raise HTTPException(status_code=404, detail="Section not found")
+        content = await run_io(read_bytes_range, brief.path, heading["offset"], heading["end"])
+        return {
+            "slug": brief.slug,
+            "name": brief.slug.replace("-", " ").title(),
+            "section": heading,
+            "content": content.decode("utf-8", errors="replace"),
+        }
 
-    return {
-        "slug": safe_slug,
-        "name": safe_slug.replace("-", " ").title(),
-        "content": content,
-    }
+    key = f"research/{safe_slug}" if section is None else f"research/{safe_slug}#{section}"
+    return await http_cache.respond(request, key, version, produce, last_modified=modified)
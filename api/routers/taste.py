@@ -2,10 +2,14 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 import uuid
+from dataclasses import asdict
 
 # Import our services
-from api.services.fire_crawl import FireCrawlService, ScrapeResult
-from api.services.imagen_service import ImagenService, DesignOption, TasteProfile
+from api.services.fire_crawl import CrawlBlocked, FireCrawlService, ScrapeResult, normalize_url
+from api.services.imagen_service import ImagenService, DesignOption
+from api.services.executors import run_io
+from api.services.taste_engine import Pick
+from api.services.taste_sessions import TasteSession, taste_sessions
 
 router = APIRouter(prefix="/api/taste", tags=["Taste Tuner"])
 
@@ -32,7 +36,9 @@ class SelectionRequest(BaseModel):
     session_id: str
     selected_option_id: str
     round_number: int
-    history: List[str]  # Added history for vector refinement
+    # Deprecated: the session keeps its own weights. Only the last entry is
+    # used, and only when the selected option isn't from the session's last round.
+    history: List[str] = []
 
 # --- Endpoints ---
 
@@ -43,6 +49,7 @@ async def start_session(req: StartSessionRequest):
     """
     session_id = str(uuid.uuid4())
     print(f"🚀 API: Starting session {session_id} for user {req.user_id}")
+    await run_io(taste_sessions.create, session_id, req.user_id or "anon")
     return SessionResponse(
         session_id=session_id,
         message="Session initialized. Agent loop engaged."
@@ -55,12 +62,17 @@ async def generate_round(req: GenerateRoundRequest):
     """
     print(f"🎨 API: Generating round {req.round_number} for session {req.session_id}")
     
-    # In a real app, retrieve taste_profile weights from DB using session_id
-    # For now, we'll start fresh or simulate based on round advancement
-    current_taste = TasteProfile() 
-    
+    def take_plan(session: TasteSession):
+        # Use the round planned (and prefetched) at the last selection, if it fits
+        planned = [Pick(**p) for p in session.planned] if req.prompt == session.last_prompt else None
+        session.planned = []
+        return session.profile(), planned
+
+    current_taste, planned = await run_io(taste_sessions.update, req.session_id, take_plan)
+
     try:
-        options = await imagen.generate_round(req.prompt, current_taste)
+        options = await imagen.generate_round(req.prompt, current_taste, picks=planned or None)
+        await run_io(taste_sessions.update, req.session_id, lambda s: s.record_options(req.prompt, options))
         return {"options": options, "round": req.round_number}
     except Exception as e:
         print(f"Error in round generation: {e}")
@@ -71,11 +83,26 @@ async def select_option(req: SelectionRequest):
     """
     Records the user's selection and updates the taste profile.
     """
-    print(f"✅ API: User selected {req.selected_option_id}. Total history: {len(req.history)} items.")
-    
-    # Refine the taste profile based on the historical selections
-    new_profile = await imagen.refine_taste(req.selected_option_id, req.history)
-    
+    def apply(session: TasteSession):
+        style = session.last_options.get(req.selected_option_id)
+        if style is None and req.history:
+            style = req.history[-1]
+        if style is None:
+            raise HTTPException(status_code=400, detail=f"Unknown option: {req.selected_option_id}")
+        # O(1) update of the session's style-weight vector
+        session.select(style)
+        profile = session.profile()
+        # Plan the next round now so it can be generated while the client catches up
+        picks = imagen.plan_round(profile) if session.last_prompt else []
+        if picks:
+            session.planned = [asdict(p) for p in picks]
+        return style, session.selections, profile, session.last_prompt, picks
+
+    style, selections, new_profile, prompt, picks = await run_io(taste_sessions.update, req.session_id, apply)
+    print(f"✅ API: User selected {req.selected_option_id} ({style}). Total selections: {selections}.")
+    if picks:
+        imagen.prefetch_round(prompt, picks)
+
     return {
         "message": "Aesthetic DNA refined",
         "next_round": req.round_number + 1,
@@ -88,8 +115,14 @@ async def crawl_url(url: str):
     """
     Analyze a URL's design DNA.
     """
+    try:
+        normalize_url(url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         result = await fire_crawl.analyze_url(url)
         return result
+    except CrawlBlocked as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
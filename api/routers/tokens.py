@@ -2,18 +2,63 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+import functools
+from datetime import datetime, timezone
+from typing import Any, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
 from api.middleware.auth import verify_token
+from api.services.executors import run_io
 from api.services.file_reader import TOKEN_USAGE_PATH, read_json
+from api.services.http_cache import file_validator, http_cache
+from api.services.token_rollups import token_rollups
 
 router = APIRouter(tags=["tokens"])
 
+# Default window per granularity when ``from`` is omitted
+DEFAULT_SPAN = {"hour": 48 * 3600, "day": 30 * 86400}
+
+
+def _epoch(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
 
 @router.get("/tokens")
-def get_tokens(_user: dict = Depends(verify_token)) -> dict:
+async def get_tokens(request: Request, _user: dict = Depends(verify_token)) -> Response:
     """Return current token usage data."""
-    data = read_json(TOKEN_USAGE_PATH)
-    if data is None:
+    validator = await run_io(file_validator, TOKEN_USAGE_PATH)
+    if validator is None:
         raise HTTPException(status_code=404, detail="Token usage file not found")
-    return data
+    version, modified = validator
+
+    async def produce() -> Any:
+        data = await run_io(read_json, TOKEN_USAGE_PATH)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Token usage file not found")
+        return data
+
+    return await http_cache.respond(request, "tokens", version, produce, last_modified=modified)
+
+
+@router.get("/tokens/summary")
+async def get_token_summary(
+    granularity: Literal["hour", "day"] = "day",
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    model: str | None = None,
+    _user: dict = Depends(verify_token),
+) -> dict[str, Any]:
+    """Token usage per model, bucketed by hour or day (UTC), from pre-aggregated rollups.
+
+    ``from``/``to`` take ISO 8601 datetimes (naive means UTC); ``to`` is
+    exclusive and defaults to now. Each model's series is columnar: bucket
+    start times (epoch seconds) plus one list per metric.
+    """
+    to_ts = _epoch(end) if end is not None else int(datetime.now(timezone.utc).timestamp()) + 1
+    from_ts = _epoch(start) if start is not None else to_ts - DEFAULT_SPAN[granularity]
+    if from_ts >= to_ts:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    return await run_io(functools.partial(token_rollups.summary, granularity, from_ts, to_ts, model=model))
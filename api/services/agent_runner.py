@@ -8,19 +8,41 @@ and streams events back to the frontend.
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 import os
+import statistics
+import time
+from collections import deque
 from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
 from typing import Any
 
 import anthropic
+import httpx
+
+from api.services.agent_tools import run_tools_concurrently, tool_definitions
+from api.services.executors import ExecutorSaturated, run_io
+from api.services.response_cache import cache_key, response_cache
+from api.services.sse import coalesce
+from api.services.token_rollups import token_rollups
 
 logger = logging.getLogger(__name__)
 
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
+# Unset means the SDK default (it also honours ANTHROPIC_BASE_URL itself)
+ANTHROPIC_BASE_URL = os.environ.get("ANTHROPIC_BASE_URL") or None
 CLAUDE_MODEL = os.environ.get("CLAUDE_MODEL", "claude-sonnet-4-20250514")
 MAX_TOKENS = 4096
+# Upper bound on model round trips per request (each tool turn is one)
+MAX_TURNS = int(os.environ.get("AGENT_MAX_TURNS", "8"))
+
+# Connection pool for the shared client
+MAX_CONNECTIONS = int(os.environ.get("ANTHROPIC_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("ANTHROPIC_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.environ.get("ANTHROPIC_KEEPALIVE_EXPIRY", "120"))
+
+CACHE_CONTROL = {"type": "ephemeral"}
 
 SYSTEM_PROMPT = """You are ClawdBot, Manny's personal AI assistant. You help with:
 - Answering questions about projects and code
@@ -31,49 +53,260 @@ SYSTEM_PROMPT = """You are ClawdBot, Manny's personal AI assistant. You help wit
 Be concise, direct, and helpful. Use your tools when needed."""
 
 
+@dataclass
+class AgentMetrics:
+    """Process-wide counters for agent runs."""
+    requests: int = 0
+    errors: int = 0
+    input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    output_tokens: int = 0
+    ttft_ms: deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    def record_usage(self, usage: Any) -> None:
+        self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+        self.cache_read_input_tokens += getattr(usage, "cache_read_input_tokens", 0) or 0
+        self.cache_creation_input_tokens += getattr(usage, "cache_creation_input_tokens", 0) or 0
+
+    def snapshot(self) -> dict[str, Any]:
+        samples = sorted(self.ttft_ms)
+        total_input = (
+            self.input_tokens + self.cache_read_input_tokens + self.cache_creation_input_tokens
+        )
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "input_tokens": {
+                "uncached": self.input_tokens,
+                "cache_read": self.cache_read_input_tokens,
+                "cache_write": self.cache_creation_input_tokens,
+                "cache_read_ratio": (
+                    round(self.cache_read_input_tokens / total_input, 4) if total_input else 0.0
+                ),
+            },
+            "output_tokens": self.output_tokens,
+            "ttft_ms": {
+                "samples": len(samples),
+                "p50": round(statistics.median(samples), 1) if samples else None,
+                "p95": round(samples[int(0.95 * (len(samples) - 1))], 1) if samples else None,
+            },
+        }
+
+
+metrics = AgentMetrics()
+
+_client: anthropic.AsyncAnthropic | None = None
+
+
+def _create_client() -> anthropic.AsyncAnthropic:
+    http_client = anthropic.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    )
+    return anthropic.AsyncAnthropic(
+        api_key=ANTHROPIC_API_KEY,
+        base_url=ANTHROPIC_BASE_URL,
+        http_client=http_client,
+    )
+
+
+def get_client() -> anthropic.AsyncAnthropic:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+async def open_client() -> None:
+    """Lifespan startup: warm the shared client so the first request skips setup."""
+    if ANTHROPIC_API_KEY:
+        get_client()
+
+
+# Token usage writes still running; held so they aren't garbage collected
+_pending_writes: set[asyncio.Task[None]] = set()
+
+
+async def _record_usage(usage: dict[str, int]) -> None:
+    try:
+        await run_io(token_rollups.record, CLAUDE_MODEL, usage, timeout=None)
+    except (OSError, ExecutorSaturated) as e:
+        logger.warning("Could not record token usage: %s", e)
+
+
+async def close_client() -> None:
+    """Lifespan shutdown: finish usage writes and close pooled connections."""
+    global _client
+    await asyncio.gather(*_pending_writes, return_exceptions=True)
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _with_breakpoint(content: Any) -> list[dict[str, Any]]:
+    """Copy a message's content as blocks with a cache breakpoint on the last one."""
+    if isinstance(content, str):
+        return [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+    blocks = [dict(block) for block in content]
+    if blocks:
+        blocks[-1]["cache_control"] = CACHE_CONTROL
+    return blocks
+
+
+def build_request(messages: list[dict[str, Any]], extra_context: str = "") -> dict[str, Any]:
+    """Assemble system + messages with prompt-cache breakpoints.
+
+    Breakpoints go on the fixed system prompt, the per-request context, and
+    the last message — so the next turn of the same conversation reads the
+    whole prior exchange from cache. That is three of the four allowed.
+    """
+    system = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": CACHE_CONTROL}]
+    if extra_context:
+        system.append({"type": "text", "text": extra_context, "cache_control": CACHE_CONTROL})
+    cached_messages = list(messages)
+    if cached_messages:
+        last = cached_messages[-1]
+        cached_messages[-1] = {**last, "content": _with_breakpoint(last.get("content", ""))}
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": MAX_TOKENS,
+        "system": system,
+        "messages": cached_messages,
+        "tools": tool_definitions(),
+    }
+
+
 async def stream_agent(
     messages: list[dict[str, Any]],
     extra_context: str = "",
-) -> AsyncGenerator[str, None]:
-    """Run the agent loop, yielding SSE events as they happen.
+    use_cache: bool = True,
+    timed_replay: bool = False,
+) -> AsyncGenerator[bytes, None]:
+    """Stream the agent's events as SSE frames, served from the response cache when possible.
+
+    Text deltas are coalesced into fewer frames (see ``api.services.sse``).
+    A cache hit replays the recorded events (instantly, or at the original
+    pacing with ``timed_replay``) and marks the final ``done`` with
+    ``"cached": true``.
+    """
+    events = run_agent(messages, extra_context)
+    if use_cache and ANTHROPIC_API_KEY:
+        key = cache_key(CLAUDE_MODEL, SYSTEM_PROMPT, tool_definitions(), extra_context, messages)
+        events = response_cache.cached(key, events, timed=timed_replay)
+    async for frame in coalesce(events):
+        yield frame
+
+
+async def run_agent(
+    messages: list[dict[str, Any]],
+    extra_context: str = "",
+) -> AsyncGenerator[dict[str, Any], None]:
+    """Run the agent loop, yielding events as they happen.
 
     Events:
       - {"type": "text", "content": "..."}  — streamed text chunk
-      - {"type": "tool_use", "name": "...", "input": {...}}  — tool call indicator
-      - {"type": "tool_result", "name": "...", "result": "..."}  — tool result
+      - {"type": "tool_use", "id": "...", "name": "...", "input": {...}}  — tool call indicator
+      - {"type": "tool_result", "id": "...", "name": "...", "result": "...", "is_error": bool}
+        — tool result, in completion order (tools from one turn run concurrently)
+      - {"type": "usage", ...}  — token usage, cached vs uncached input
       - {"type": "done"}  — stream complete
       - {"type": "error", "message": "..."}  — error
     """
     if not ANTHROPIC_API_KEY:
-        yield _sse({"type": "error", "message": "ANTHROPIC_API_KEY not configured"})
+        yield {"type": "error", "message": "ANTHROPIC_API_KEY not configured"}
         return
 
-    client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
-    system = f"{SYSTEM_PROMPT}\n\n{extra_context}" if extra_context else SYSTEM_PROMPT
+    client = get_client()
+    metrics.requests += 1
+    started = time.perf_counter()
+    first_token = True
+    usage = {
+        "input_tokens": 0,
+        "cache_read_input_tokens": 0,
+        "cache_creation_input_tokens": 0,
+        "output_tokens": 0,
+    }
+    conversation = list(messages)
 
     try:
-        # Stream the initial response
-        async with client.messages.stream(
-            model=CLAUDE_MODEL,
-            max_tokens=MAX_TOKENS,
-            system=system,
-            messages=messages,
-        ) as stream:
-            async for event in stream:
-                if event.type == "content_block_delta":
-                    if hasattr(event.delta, "text"):
-                        yield _sse({"type": "text", "content": event.delta.text})
-
-        yield _sse({"type": "done"})
+        for _turn in range(MAX_TURNS):
+            async with client.messages.stream(**build_request(conversation, extra_context)) as stream:
+                async for event in stream:
+                    if event.type == "message_start":
+                        turn_usage = event.message.usage
+                        metrics.record_usage(turn_usage)
+                        usage["input_tokens"] += turn_usage.input_tokens or 0
+                        usage["cache_read_input_tokens"] += turn_usage.cache_read_input_tokens or 0
+                        usage["cache_creation_input_tokens"] += (
+                            turn_usage.cache_creation_input_tokens or 0
+                        )
+                    elif event.type == "content_block_delta":
+                        if hasattr(event.delta, "text"):
+                            if first_token:
+                                metrics.ttft_ms.append((time.perf_counter() - started) * 1000)
+                                first_token = False
+                            yield {"type": "text", "content": event.delta.text}
+                    elif event.type == "content_block_stop":
+                        block = event.content_block
+                        if block.type == "tool_use":
+                            yield {
+                                "type": "tool_use",
+                                "id": block.id,
+                                "name": block.name,
+                                "input": block.input,
+                            }
+                    elif event.type == "message_delta":
+                        usage["output_tokens"] += event.usage.output_tokens
+                        metrics.output_tokens += event.usage.output_tokens
+                message = await stream.get_final_message()
+
+            tool_calls = [block for block in message.content if block.type == "tool_use"]
+            if message.stop_reason != "tool_use" or not tool_calls:
+                break
+
+            # Run every tool from this turn at once; report each as it lands.
+            results = {}
+            async for outcome in run_tools_concurrently(tool_calls):
+                results[outcome.tool_use_id] = outcome
+                yield {
+                    "type": "tool_result",
+                    "id": outcome.tool_use_id,
+                    "name": outcome.name,
+                    "result": outcome.content,
+                    "is_error": outcome.is_error,
+                }
+            conversation.append({
+                "role": "assistant",
+                "content": [block.model_dump(exclude_none=True) for block in message.content],
+            })
+            conversation.append({
+                "role": "user",
+                "content": [results[call.id].result_block() for call in tool_calls],
+            })
+        else:
+            logger.warning("Agent stopped after %d turns", MAX_TURNS)
+
+        yield {"type": "usage", **usage}
+        yield {"type": "done"}
 
     except anthropic.APIError as e:
+        metrics.errors += 1
         logger.error(f"Anthropic API error: {e}")
-        yield _sse({"type": "error", "message": f"API error: {e.message}"})
+        yield {"type": "error", "message": f"API error: {e.message}"}
     except Exception as e:
+        metrics.errors += 1
         logger.error(f"Agent error: {e}")
-        yield _sse({"type": "error", "message": str(e)})
-
+        yield {"type": "error", "message": str(e)}
+    finally:
+        # Spent tokens count even if the run failed or the client left.
+        if any(usage.values()):
+            # A task, so the write outlives a cancelled stream and stays off the loop
+            task = asyncio.create_task(_record_usage(dict(usage)))
+            _pending_writes.add(task)
+            task.add_done_callback(_pending_writes.discard)
 
-def _sse(data: dict[str, Any]) -> str:
-    """Format a dict as an SSE data line."""
-    return f"data: {json.dumps(data)}\n\n"
@@ -0,0 +1,231 @@
+"""Agent tools — registry and concurrent executor for the agent loop.
+
+Each tool pairs an Anthropic tool definition with a handler. Handlers may be
+sync (run on a worker thread) or async; every call gets its own timeout, and
+all ``tool_use`` blocks from one model turn run concurrently, so a turn costs
+the slowest tool rather than the sum.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from api.services.commit_index import commit_index
+from api.services.executors import run_io
+from api.services.file_reader import read_bytes_range
+from api.services.research_index import research_index
+from api.services.task_queue import task_queue
+
+logger = logging.getLogger(__name__)
+
+TOOL_TIMEOUT = float(os.environ.get("AGENT_TOOL_TIMEOUT", "10"))
+# Keep tool results well inside the context window
+MAX_RESULT_CHARS = 20_000
+
+Handler = Callable[..., Any] | Callable[..., Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class Tool:
+    """A tool the model can call."""
+    name: str
+    description: str
+    input_schema: dict[str, Any]
+    handler: Handler
+    timeout: float = TOOL_TIMEOUT
+
+    def definition(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "input_schema": self.input_schema,
+        }
+
+
+@dataclass
+class ToolOutcome:
+    """Result of one ``tool_use`` block."""
+    tool_use_id: str
+    name: str
+    content: str
+    is_error: bool = False
+
+    def result_block(self) -> dict[str, Any]:
+        block: dict[str, Any] = {
+            "type": "tool_result",
+            "tool_use_id": self.tool_use_id,
+            "content": self.content,
+        }
+        if self.is_error:
+            block["is_error"] = True
+        return block
+
+
+TOOLS: dict[str, Tool] = {}
+
+
+def register(tool: Tool) -> Tool:
+    TOOLS[tool.name] = tool
+    return tool
+
+
+def tool_definitions() -> list[dict[str, Any]]:
+    return [tool.definition() for tool in TOOLS.values()]
+
+
+def _serialize(result: Any) -> str:
+    text = result if isinstance(result, str) else json.dumps(result, default=str)
+    if len(text) > MAX_RESULT_CHARS:
+        text = text[:MAX_RESULT_CHARS] + "\n…[truncated]"
+    return text
+
+
+async def run_tool(tool_use_id: str, name: str, tool_input: dict[str, Any]) -> ToolOutcome:
+    """Execute one tool call with its timeout; failures become error results."""
+    tool = TOOLS.get(name)
+    if tool is None:
+        return ToolOutcome(tool_use_id, name, f"Unknown tool: {name}", is_error=True)
+    try:
+        if inspect.iscoroutinefunction(tool.handler):
+            call = tool.handler(**tool_input)
+        else:
+            call = run_io(functools.partial(tool.handler, **tool_input), timeout=None)
+        result = await asyncio.wait_for(call, tool.timeout)
+    except asyncio.TimeoutError:
+        return ToolOutcome(tool_use_id, name, f"Tool timed out after {tool.timeout:g}s", is_error=True)
+    except Exception as e:
+        logger.warning("Tool %s failed: %s", name, e)
+        return ToolOutcome(tool_use_id, name, f"Tool error: {e}", is_error=True)
+    return ToolOutcome(tool_use_id, name, _serialize(result))
+
+
+async def run_tools_concurrently(calls: list[Any]) -> AsyncIterator[ToolOutcome]:
+    """Run ``tool_use`` blocks concurrently, yielding outcomes as each finishes."""
+    tasks = [asyncio.create_task(run_tool(c.id, c.name, dict(c.input or {}))) for c in calls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# --- Built-in tools ---
+
+
+def _list_research_briefs(limit: int = 20) -> list[dict[str, Any]]:
+    return research_index.list_briefs()[:limit]
+
+
+def _search_research(query: str, limit: int = 5) -> list[dict[str, Any]]:
+    return research_index.search(query, limit=limit)
+
+
+def _read_research_brief(slug: str, section: str | None = None) -> str:
+    if not slug or any(not (c.isalnum() or c in "-_") for c in slug):
+        raise ValueError(f"Invalid slug {slug!r}")
+    brief = research_index.current(slug)
+    if brief is None:
+        raise ValueError(f"No research brief named {slug!r}")
+    start, end = 0, brief.size
+    if section is not None:
+        heading = brief.find_section(section)
+        if heading is None:
+            raise ValueError(f"No section {section!r} in {slug!r}")
+        start, end = heading["offset"], heading["end"]
+    end = min(end, start + MAX_RESULT_CHARS * 4)
+    return read_bytes_range(brief.path, start, end).decode("utf-8", errors="replace")
+
+
+def _query_task_queue(
+    status: str | None = None,
+    priority: str | None = None,
+    limit: int = 50,
+) -> list[dict[str, Any]]:
+    return task_queue.query(status=status, priority=priority, limit=limit).tasks
+
+
+async def _recent_commits(limit: int = 20, repo: str | None = None) -> list[dict[str, Any]]:
+    await commit_index.refresh(timeout=TOOL_TIMEOUT / 2)
+    commits = commit_index.iter_commits()
+    if repo:
+        commits = (c for c in commits if c["repo"] == repo)
+    out = []
+    for commit in commits:
+        out.append(commit)
+        if len(out) >= limit:
+            break
+    return out
+
+
+register(Tool(
+    name="list_research_briefs",
+    description="List overnight research briefs, most recently modified first.",
+    input_schema={
+        "type": "object",
+        "properties": {"limit": {"type": "integer", "minimum": 1, "maximum": 200}},
+    },
+    handler=_list_research_briefs,
+))
+register(Tool(
+    name="search_research",
+    description="Full-text search over overnight research briefs; returns ranked hits with snippets.",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string"},
+            "limit": {"type": "integer", "minimum": 1, "maximum": 20},
+        },
+        "required": ["query"],
+    },
+    handler=_search_research,
+))
+register(Tool(
+    name="read_research_brief",
+    description=(
+        "Read a research brief's markdown by slug. Pass a heading anchor as "
+        "`section` to read just that section of a long brief."
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "slug": {"type": "string"},
+            "section": {"type": "string"},
+        },
+        "required": ["slug"],
+    },
+    handler=_read_research_brief,
+))
+register(Tool(
+    name="query_task_queue",
+    description="Look up overnight queue tasks, optionally filtered by status and priority.",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "status": {"type": "string"},
+            "priority": {"type": "string"},
+            "limit": {"type": "integer", "minimum": 1, "maximum": 200},
+        },
+    },
+    handler=_query_task_queue,
+))
+register(Tool(
+    name="recent_commits",
+    description="Recent git commits (last 7 days) across Manny's repos, newest first.",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "limit": {"type": "integer", "minimum": 1, "maximum": 100},
+            "repo": {"type": "string"},
+        },
+    },
+    handler=_recent_commits,
+))
@@ -0,0 +1,475 @@
+"""Change feed — one filesystem watcher fanned out to every ``/api/events`` client.
+
+Four sources are watched: token usage totals, the overnight task queue,
+research briefs and the commits in ``DEV_DIR`` repos. The watcher wakes on
+inotify events (through ``watchfiles``) or, where that is unavailable, every
+``POLL_INTERVAL`` seconds. It then compares each source's cheap stat
+signature and re-reads only the sources that changed. The new state is
+diffed against the previous one and published as a compact SSE event:
+
+- ``tokens``: the top-level usage keys whose values changed;
+- ``tasks``: tasks added, updated or removed;
+- ``briefs``: brief summaries added, updated or removed;
+- ``commits``: commits that just entered the recent window.
+
+Each event is encoded once and pushed onto every subscriber's bounded
+queue, so N open dashboards cost one watcher. A subscriber that falls
+``SUBSCRIBER_QUEUE`` events behind is sent ``resync`` instead, and should
+refetch. Recent events are kept so a reconnect with ``Last-Event-ID``
+replays what it missed. The watcher starts with the first subscriber and
+stops ``IDLE_STOP`` seconds after the last one leaves.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+from api.services.commit_index import commit_index
+from api.services.executors import ExecutorSaturated, run_io
+from api.services.file_reader import TOKEN_USAGE_PATH, read_json
+from api.services.research_index import research_index
+from api.services.task_queue import task_queue
+
+try:
+    import watchfiles
+except ImportError:  # mtime polling only
+    watchfiles = None
+
+logger = logging.getLogger(__name__)
+
+# auto (inotify when available) | inotify | poll
+WATCH_MODE = os.environ.get("EVENTS_WATCHER", "auto")
+POLL_INTERVAL = float(os.environ.get("EVENTS_POLL_INTERVAL", "1.0"))
+# inotify mode: how often the watch set is rebuilt to pick up new dirs and repos
+RECONCILE_INTERVAL = float(os.environ.get("EVENTS_RECONCILE_INTERVAL", "30"))
+DEBOUNCE_MS = int(os.environ.get("EVENTS_DEBOUNCE_MS", "100"))
+IDLE_STOP = float(os.environ.get("EVENTS_IDLE_STOP", "60"))
+SUBSCRIBER_QUEUE = int(os.environ.get("EVENTS_SUBSCRIBER_QUEUE", "64"))
+REPLAY_SIZE = int(os.environ.get("EVENTS_REPLAY_SIZE", "256"))
+
+
+def _stat_key(path: Path) -> tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 0, 0
+    return st.st_mtime_ns, st.st_size
+
+
+def _keyed_diff(
+    old: dict[Any, Any],
+    new: dict[Any, Any],
+    updates: bool = True,
+    removals: bool = True,
+) -> dict[str, Any] | None:
+    """``added``/``updated`` values and ``removed`` keys between two keyed states."""
+    diff: dict[str, Any] = {}
+    added = [value for key, value in new.items() if key not in old]
+    if added:
+        diff["added"] = added
+    if updates:
+        updated = [value for key, value in new.items() if key in old and old[key] != value]
+        if updated:
+            diff["updated"] = updated
+    if removals:
+        removed = [key for key in old if key not in new]
+        if removed:
+            diff["removed"] = removed
+    return diff or None
+
+
+class Source(ABC):
+    """One watched dataset: a cheap signature, a full snapshot and a diff."""
+
+    name = ""
+
+    @abstractmethod
+    def signature(self, fresh: bool = False) -> Any:
+        """Stat-level fingerprint; blocking, runs on the I/O pool.
+
+        ``fresh`` means the watcher just saw activity in this source's
+        directories, so any throttled stat cache should be bypassed.
+        """
+
+    @abstractmethod
+    def watch_paths(self) -> list[Path]:
+        """Directories to watch for this source; blocking."""
+
+    @abstractmethod
+    async def snapshot(self) -> Any:
+        """Full current state, diffed against the previous one."""
+
+    @abstractmethod
+    def compare(self, old: Any, new: Any) -> dict[str, Any] | None:
+        """Event payload for ``old`` -> ``new``, or None if nothing worth sending."""
+
+
+class TokenUsageSource(Source):
+    name = "tokens"
+
+    def signature(self, fresh: bool = False) -> Any:
+        return _stat_key(TOKEN_USAGE_PATH)
+
+    def watch_paths(self) -> list[Path]:
+        return [TOKEN_USAGE_PATH.parent]
+
+    async def snapshot(self) -> dict[str, Any]:
+        data = await run_io(read_json, TOKEN_USAGE_PATH, timeout=None)
+        return data if isinstance(data, dict) else {}
+
+    def compare(self, old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any] | None:
+        diff: dict[str, Any] = {}
+        changed = {key: value for key, value in new.items() if old.get(key) != value}
+        if changed:
+            diff["changed"] = changed
+        removed = [key for key in old if key not in new]
+        if removed:
+            diff["removed"] = removed
+        return diff or None
+
+
+class TaskQueueSource(Source):
+    name = "tasks"
+
+    def signature(self, fresh: bool = False) -> Any:
+        return task_queue.version()
+
+    def watch_paths(self) -> list[Path]:
+        return [task_queue.snapshot_path.parent]
+
+    async def snapshot(self) -> dict[str, dict[str, Any]]:
+        tasks = await run_io(task_queue.list_tasks, timeout=None)
+        # Legacy tasks without an id are keyed by position
+        return {str(task.get("id") or f"#{i}"): task for i, task in enumerate(tasks)}
+
+    def compare(self, old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any] | None:
+        return _keyed_diff(old, new)
+
+
+class BriefSource(Source):
+    name = "briefs"
+
+    def signature(self, fresh: bool = False) -> Any:
+        # Shares the index's throttled stat pass with the HTTP routes
+        research_index.refresh(force=fresh)
+        return research_index.version()
+
+    def watch_paths(self) -> list[Path]:
+        return [research_index.directory]
+
+    async def snapshot(self) -> dict[str, dict[str, Any]]:
+        briefs = await run_io(research_index.list_briefs, timeout=None)
+        return {brief["slug"]: brief for brief in briefs}
+
+    def compare(self, old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any] | None:
+        return _keyed_diff(old, new)
+
+
+class CommitSource(Source):
+    name = "commits"
+
+    def __init__(self, limit: int = 50) -> None:
+        self.limit = limit
+
+    def signature(self, fresh: bool = False) -> Any:
+        return commit_index.signature()
+
+    def watch_paths(self) -> list[Path]:
+        return commit_index.watch_paths()
+
+    async def snapshot(self) -> dict[tuple[str, str], dict[str, Any]]:
+        await commit_index.refresh()
+        return {(c["repo"], c["hash"]): c for c in commit_index.top(self.limit)}
+
+    def compare(self, old: dict[Any, Any], new: dict[Any, Any]) -> dict[str, Any] | None:
+        # Commits never change, and ageing out of the window isn't news
+        return _keyed_diff(old, new, updates=False, removals=False)
+
+
+def _frame(event: str, data: dict[str, Any], event_id: str | None = None) -> bytes:
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines += [f"event: {event}", f"data: {json.dumps(data, default=str)}", "", ""]
+    return "\n".join(lines).encode()
+
+
+class _Subscriber:
+    """One client's bounded outbox; overflowing collapses it into a resync."""
+
+    def __init__(self, size: int = SUBSCRIBER_QUEUE) -> None:
+        # ``None`` ends the stream; room is kept for it behind a resync
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=max(size, 2))
+        self.overflows = 0
+
+    def _drain(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def push(self, frame: bytes) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self._drain()
+            self.queue.put_nowait(_frame("resync", {"reason": "slow consumer"}))
+            self.overflows += 1
+
+    def close(self, reason: str) -> None:
+        """Tell the client to refetch, then end its stream."""
+        self._drain()
+        self.queue.put_nowait(_frame("resync", {"reason": reason}))
+        self.queue.put_nowait(None)
+
+
+class ChangeFeed:
+    """Single watcher over every source, fanned out to all subscribers."""
+
+    def __init__(self, sources: list[Source]) -> None:
+        self.sources = sources
+        self.mode: str | None = None
+        self._boot = uuid.uuid4().hex[:8]
+        self._seq = 0
+        # The running watcher started after this event; older ids may have gaps
+        self._floor = 0
+        self._replay: deque[tuple[int, bytes]] = deque(maxlen=REPLAY_SIZE)
+        self._subscribers: set[_Subscriber] = set()
+        self._signatures: dict[str, Any] = {}
+        self._states: dict[str, Any] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._primed: asyncio.Event | None = None
+        self._idle: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.wakeups = 0
+        self.events = 0
+        self.resyncs = 0
+
+    def _bind_loop(self) -> None:
+        """The watcher and subscriber queues belong to the loop that created them."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._task = None
+            self._idle = None
+            self._subscribers = set()
+
+    # --- watching ---
+
+    def _stat_all(self, fresh: frozenset[str] = frozenset()) -> list[Any]:
+        signatures = []
+        for source in self.sources:
+            try:
+                signatures.append(source.signature(fresh=source.name in fresh))
+            except OSError as exc:
+                logger.warning("[events] cannot stat %s: %s", source.name, exc)
+                signatures.append(None)
+        return signatures
+
+    def _watch_paths(self) -> dict[str, set[Path]]:
+        """Existing directories to watch, per source."""
+        paths: dict[str, set[Path]] = {}
+        for source in self.sources:
+            try:
+                paths[source.name] = {p for p in source.watch_paths() if p.is_dir()}
+            except OSError as exc:
+                logger.warning("[events] cannot list watch paths for %s: %s", source.name, exc)
+                paths[source.name] = set()
+        return paths
+
+    async def _prime(self) -> None:
+        try:
+            signatures = await run_io(self._stat_all, timeout=None)
+        except Exception as exc:
+            # e.g. the I/O pool is saturated: the first check primes instead
+            logger.warning("[events] cannot stat sources: %s", exc)
+            return
+        for source, signature in zip(self.sources, signatures):
+            try:
+                self._states[source.name] = await source.snapshot()
+                self._signatures[source.name] = signature
+            except Exception as exc:
+                logger.warning("[events] cannot read %s: %s", source.name, exc)
+
+    async def _check(self, fresh: frozenset[str] = frozenset()) -> None:
+        """Re-read the sources whose signature moved and publish their diffs."""
+        self.wakeups += 1
+        try:
+            signatures = await run_io(self._stat_all, fresh, timeout=None)
+        except Exception as exc:
+            logger.warning("[events] cannot stat sources: %s", exc)
+            return
+        for source, signature in zip(self.sources, signatures):
+            if signature is None or self._signatures.get(source.name) == signature:
+                continue
+            try:
+                state = await source.snapshot()
+            except Exception as exc:
+                # Keep the old signature so the next wake-up retries
+                logger.warning("[events] cannot read %s: %s", source.name, exc)
+                continue
+            old = self._states.get(source.name)
+            self._states[source.name] = state
+            self._signatures[source.name] = signature
+            diff = source.compare(old, state) if old is not None else None
+            if diff is not None:
+                self._publish(source.name, diff)
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            await self._check()
+
+    async def _watch(self) -> None:
+        every = frozenset(source.name for source in self.sources)
+        while True:
+            watched = await run_io(self._watch_paths, timeout=None)
+            paths = sorted(set().union(*watched.values()))
+            if not paths:
+                await asyncio.sleep(RECONCILE_INTERVAL)
+                await self._check(every)
+                continue
+            async for changes in watchfiles.awatch(
+                *paths,
+                # The default filter drops everything under .git
+                watch_filter=None,
+                recursive=False,
+                debounce=DEBOUNCE_MS,
+                rust_timeout=int(RECONCILE_INTERVAL * 1000),
+                yield_on_timeout=True,
+            ):
+                # A timeout (no changes) is a reconcile pass over everything
+                dirs = {Path(p).parent for _, p in changes} | {Path(p) for _, p in changes}
+                await self._check(frozenset(
+                    name for name, source_dirs in watched.items() if source_dirs & dirs
+                ) if changes else every)
+                if await run_io(self._watch_paths, timeout=None) != watched:
+                    break  # a directory or repo came or went: re-arm
+
+    async def _run(self) -> None:
+        try:
+            await self._prime()
+        finally:
+            # Subscribers wait on this; never leave them hanging
+            self._primed.set()
+        if watchfiles is not None and WATCH_MODE != "poll":
+            self.mode = "inotify"
+            try:
+                await self._watch()
+            except (OSError, RuntimeError, ExecutorSaturated) as exc:
+                # e.g. out of inotify watches
+                logger.warning("[events] file watcher failed, polling instead: %s", exc)
+        self.mode = "poll"
+        await self._poll()
+
+    def _start(self) -> None:
+        self._floor = self._seq
+        self._primed = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="change-feed")
+        self._task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task[None]) -> None:
+        """End every stream if the watcher dies, so clients reconnect and resync."""
+        if task.cancelled():
+            return
+        logger.error("[events] watcher stopped", exc_info=task.exception())
+        if self._task is task:
+            self._task = None
+            self.mode = None
+        for subscriber in self._subscribers:
+            subscriber.close("watcher stopped")
+
+    def _stop_if_idle(self) -> None:
+        self._idle = None
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.mode = None
+
+    async def stop(self) -> None:
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+        task, self._task = self._task, None
+        self.mode = None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    # --- fan-out ---
+
+    def _publish(self, event: str, data: dict[str, Any]) -> None:
+        self._seq += 1
+        frame = _frame(event, data, f"{self._boot}-{self._seq}")
+        self._replay.append((self._seq, frame))
+        self.events += 1
+        for subscriber in self._subscribers:
+            subscriber.push(frame)
+
+    def _backlog(self, last_event_id: str | None) -> list[bytes] | None:
+        """Frames after ``last_event_id``, or None if some were lost."""
+        if last_event_id is None:
+            return []
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self._boot or not seq.isdigit():
+            return None
+        last = int(seq)
+        oldest = self._replay[0][0] if self._replay else self._seq + 1
+        if last <= self._floor or last < oldest - 1 or last > self._seq:
+            return None
+        return [frame for n, frame in self._replay if n > last]
+
+    async def stream(self, last_event_id: str | None = None) -> AsyncIterator[bytes]:
+        """SSE frames for one client: replay or resync, ``ready``, then live diffs."""
+        self._bind_loop()
+        subscriber = _Subscriber()
+        self._subscribers.add(subscriber)
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+        if self._task is None:
+            self._start()
+        # Taken before any await so nothing falls between backlog and queue
+        backlog = self._backlog(last_event_id)
+        primed = self._primed
+        try:
+            await primed.wait()
+            if backlog is None:
+                self.resyncs += 1
+                yield _frame("resync", {"reason": "missed events"})
+            else:
+                for frame in backlog:
+                    yield frame
+            yield _frame("ready", {
+                "last_event_id": f"{self._boot}-{self._seq}",
+                "sources": [source.name for source in self.sources],
+                "watcher": self.mode,
+            })
+            while True:
+                frame = await subscriber.queue.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self._subscribers.discard(subscriber)
+            self.resyncs += subscriber.overflows
+            if not self._subscribers and self._task is not None and self._loop is not None:
+                self._idle = self._loop.call_later(IDLE_STOP, self._stop_if_idle)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "watcher": self.mode,
+            "subscribers": len(self._subscribers),
+            "wakeups": self.wakeups,
+            "events": self.events,
+            "resyncs": self.resyncs,
+            "last_event_id": f"{self._boot}-{self._seq}",
+        }
+
+
+change_feed = ChangeFeed([TokenUsageSource(), TaskQueueSource(), BriefSource(), CommitSource()])
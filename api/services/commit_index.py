@@ -0,0 +1,483 @@
+"""Incremental commit index — recent git commits per repo, served from memory.
+
+Each repo under the dev directory is tracked by a cheap ref signature (the
+mtimes of ``HEAD``, the branch ref it points at and ``packed-refs``). A refresh
+only re-reads repos whose signature changed, and when the new HEAD descends
+from the stored one only the commits in ``old..new`` are parsed. Those short
+incremental walks are read in-process via ``git_reader``; full window walks
+(first scan, rewritten history) go to ``git log``, which is faster cold and
+keeps the CPU work out of our process. Per-repo commit lists are kept
+newest-first so the top-N across all repos is a lazy k-way merge rather than a
+full sort, and a generation counter tells callers when that merge would come
+out differently without running it.
+
+Stale repos are scanned concurrently with asyncio subprocesses, bounded by a
+semaphore. A refresh waits up to a deadline and then answers from whatever is
+indexed; slow scans keep running and land in the index when they finish.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from api.services.git_reader import (
+    CommitInfo,
+    GitReaderError,
+    GitRepo,
+    common_dir,
+    read_head,
+    resolve_git_dir,
+)
+from api.services.executors import run_io, subprocess_slots
+from api.services.request_metrics import track
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 7 * 24 * 60 * 60
+GIT_TIMEOUT = 5
+SCAN_CONCURRENCY = int(os.environ.get("SIGNALS_SCAN_CONCURRENCY", "8"))
+# How long a request waits for stale repos before answering with what it has
+SCAN_DEADLINE = float(os.environ.get("SIGNALS_SCAN_DEADLINE", "2.0"))
+# Read incremental old..new walks in-process instead of spawning git
+USE_GIT_READER = os.environ.get("SIGNALS_GIT_READER", "1") != "0"
+LOG_FORMAT = "--format=%H|%at|%ct|%ai|%s"
+
+# (author timestamp, full sha, commit dict, committer timestamp) — lists are
+# kept sorted newest-first by author time, which is what the feed shows; the
+# window is cut by committer time, like ``git log --since``
+Commit = tuple[int, str, dict[str, Any], int]
+
+
+@dataclass
+class RepoEntry:
+    """Cached state for a single repository."""
+    head: str | None = None
+    signature: tuple[int, ...] = ()
+    commits: list[Commit] = field(default_factory=list)
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def ref_signature(git_dir: Path) -> tuple[int, ...]:
+    """Cheap change detector: mtimes of HEAD, its branch ref and packed-refs."""
+    common = common_dir(git_dir)
+    head_path = git_dir / "HEAD"
+    signature = [_mtime_ns(head_path), _mtime_ns(common / "packed-refs")]
+    try:
+        head = head_path.read_text(encoding="utf-8").strip()
+    except OSError:
+        return tuple(signature)
+    if head.startswith("ref: "):
+        signature.append(_mtime_ns(common / head[5:]))
+    return tuple(signature)
+
+
+def parse_log_line(repo_name: str, line: str) -> Commit | None:
+    """Parse one ``LOG_FORMAT`` line into an index entry."""
+    parts = line.split("|", 4)
+    if len(parts) != 5:
+        return None
+    hash_, timestamp, committed, date, message = parts
+    try:
+        ts, committed_ts = int(timestamp), int(committed)
+    except ValueError:
+        return None
+    return _make_commit(repo_name, hash_, ts, committed_ts, date, message)
+
+
+def _make_commit(
+    repo_name: str,
+    sha: str,
+    ts: int,
+    committed: int,
+    date: str,
+    message: str,
+) -> Commit:
+    return ts, sha, {
+        "type": "commit",
+        "repo": repo_name,
+        "hash": sha[:8],
+        "message": message,
+        "date": date,
+        "seed": f"[{repo_name}] {message}",
+    }, committed
+
+
+def _from_info(repo_name: str, info: CommitInfo) -> Commit:
+    return _make_commit(
+        repo_name, info.sha, info.author_time, info.commit_time, info.author_date, info.subject
+    )
+
+
+def read_window(
+    reader: GitRepo,
+    repo_name: str,
+    head: str,
+    entry: RepoEntry | None,
+    cutoff: int,
+) -> list[Commit] | None:
+    """Walk ``entry.head..head`` in-process and merge it into ``entry``.
+
+    Returns None when there is no previous head to start from or history was
+    rewritten; the caller then does a full window walk with ``git log``.
+    """
+    if entry is None or entry.head is None:
+        return None
+    known = {c[1] for c in entry.commits}
+    known.add(entry.head)
+    if head in known:
+        return None
+    fresh: list[Commit] = []
+    hit: set[str] = set()
+    for info in reader.iter_commits(head, since=cutoff, stop=known):
+        hit.update(p for p in info.parents if p in known)
+        fresh.append(_from_info(repo_name, info))
+    fresh.sort(key=lambda c: c[0], reverse=True)
+    if not hit:
+        # Never touched known history: the walk already covers the window.
+        return fresh
+    if entry.head in hit:
+        return list(heapq.merge(fresh, entry.commits, key=lambda c: c[0], reverse=True))
+    return None
+
+
+async def _run_git(repo: Path, args: list[str]) -> tuple[int, str] | None:
+    """Run git asynchronously; returns ``(returncode, stdout)`` or None on failure."""
+    async with subprocess_slots.slot():
+        with track("subprocess"):
+            return await _exec_git(repo, args)
+
+
+async def _exec_git(repo: Path, args: list[str]) -> tuple[int, str] | None:
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "git",
+            "-C",
+            str(repo),
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except Exception as exc:
+        logger.warning("[signals] git %s failed for repo %s: %s", args[0], repo, exc)
+        return None
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), GIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("[signals] git %s timed out for repo: %s", args[0], repo)
+        return None
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    return proc.returncode, stdout.decode("utf-8", errors="replace")
+
+
+async def _git_log(repo: Path, since: int, rev_range: str | None = None) -> list[Commit] | None:
+    """Run ``git log`` and return parsed commits newest-first, or None on failure."""
+    args = ["log", f"--since=@{since}", LOG_FORMAT]
+    if rev_range:
+        args.append(rev_range)
+    result = await _run_git(repo, args)
+    if result is None or result[0] != 0:
+        return None
+    commits = []
+    for line in result[1].splitlines():
+        if not line:
+            continue
+        parsed = parse_log_line(repo.name, line)
+        if parsed is not None:
+            commits.append(parsed)
+    commits.sort(key=lambda c: c[0], reverse=True)
+    return commits
+
+
+async def _is_ancestor(repo: Path, old: str, new: str) -> bool:
+    result = await _run_git(repo, ["merge-base", "--is-ancestor", old, new])
+    return result is not None and result[0] == 0
+
+
+def _trim(commits: list[Commit], cutoff: int) -> list[Commit]:
+    """Drop entries committed before ``cutoff``.
+
+    Lists are ordered by author time, so a rebased or cherry-picked commit
+    with an old author date can sit anywhere; every entry is checked.
+    """
+    kept = [c for c in commits if c[3] >= cutoff]
+    return kept if len(kept) < len(commits) else commits
+
+
+async def scan_repo(
+    repo: Path,
+    git_dir: Path,
+    entry: RepoEntry | None,
+    signature: tuple[int, ...],
+    cutoff: int,
+    reader: GitRepo | None = None,
+) -> RepoEntry:
+    """Bring a repo's entry up to date, parsing only commits it hasn't seen."""
+    head = await run_io(read_head, git_dir, timeout=None)
+    if head is None:
+        # Unborn branch — nothing to log until the first commit lands.
+        return RepoEntry(signature=signature)
+    if entry is not None and entry.head is not None and head == entry.head:
+        return RepoEntry(head=head, signature=signature, commits=entry.commits)
+
+    if reader is not None and entry is not None and entry.head is not None:
+        try:
+            with track("file_io"):
+                # No deadline here: refresh() already bounds how long a request waits
+                commits = await run_io(
+                    read_window, reader, repo.name, head, entry, cutoff, timeout=None
+                )
+            if commits is not None:
+                return RepoEntry(head=head, signature=signature, commits=commits)
+        except (GitReaderError, OSError) as exc:
+            logger.info("[signals] in-process read failed for %s, using git: %s", repo, exc)
+
+    if (
+        entry is not None
+        and entry.head is not None
+        and await _is_ancestor(repo, entry.head, head)
+    ):
+        fresh = await _git_log(repo, cutoff, f"{entry.head}..{head}")
+        if fresh is not None:
+            merged = list(heapq.merge(fresh, entry.commits, key=lambda c: c[0], reverse=True))
+            return RepoEntry(head=head, signature=signature, commits=merged)
+
+    commits = await _git_log(repo, cutoff)
+    if commits is None:
+        # Keep serving what we had; retry on the next refresh.
+        return entry or RepoEntry()
+    return RepoEntry(head=head, signature=signature, commits=commits)
+
+
+class CommitIndex:
+    """In-memory index of recent commits across every repo in a directory."""
+
+    def __init__(
+        self,
+        root: Path,
+        window_seconds: int = WINDOW_SECONDS,
+        concurrency: int = SCAN_CONCURRENCY,
+    ) -> None:
+        self.root = root
+        self.window_seconds = window_seconds
+        self.concurrency = concurrency
+        self._entries: dict[str, RepoEntry] = {}
+        self._repos: list[tuple[Path, Path]] = []
+        self._root_mtime: int | None = None
+        self._inflight: dict[str, asyncio.Task[None]] = {}
+        self._readers: dict[Path, GitRepo] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Bumped whenever the indexed commits change
+        self._generation = 0
+        # Oldest committer time indexed: once the window passes it, a commit ages out
+        self._expires: int | None = None
+
+    def _cutoff(self) -> int:
+        return int(time.time()) - self.window_seconds
+
+    def _changed(self) -> None:
+        self._generation += 1
+        self._expires = min(
+            (c[3] for entry in self._entries.values() for c in entry.commits),
+            default=None,
+        )
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        """Scan tasks and the semaphore belong to the loop that created them."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._semaphore is None:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._inflight = {}
+        return self._semaphore
+
+    def discover(self) -> list[tuple[Path, Path]]:
+        """Return ``(repo, git_dir)`` pairs, re-listing only when the root changes."""
+        try:
+            root_mtime = self.root.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._repos, self._root_mtime = [], None
+            return self._repos
+        except PermissionError as exc:
+            logger.warning("[signals] cannot read DEV_DIR %s: %s", self.root, exc)
+            return self._repos
+        if root_mtime == self._root_mtime:
+            return self._repos
+
+        repos = []
+        try:
+            for entry in sorted(self.root.iterdir()):
+                if not entry.is_dir():
+                    continue
+                git_dir = resolve_git_dir(entry)
+                if git_dir is not None:
+                    repos.append((entry, git_dir))
+        except PermissionError as exc:
+            logger.warning("[signals] cannot read DEV_DIR %s: %s", self.root, exc)
+            return self._repos
+        self._repos, self._root_mtime = repos, root_mtime
+        return repos
+
+    def _stat_repos(self) -> tuple[list[tuple[Path, Path]], list[tuple[int, ...]]]:
+        repos = self.discover()
+        return repos, [ref_signature(git_dir) for _, git_dir in repos]
+
+    def signature(self) -> tuple[tuple[str, tuple[int, ...]], ...]:
+        """Every repo's ref signature; changes whenever ``refresh`` has work to do."""
+        repos, signatures = self._stat_repos()
+        return tuple((repo.name, signature) for (repo, _), signature in zip(repos, signatures))
+
+    def watch_paths(self) -> list[Path]:
+        """Directories whose entries change when a repo appears or its refs move."""
+        paths = [self.root]
+        for _, git_dir in self.discover():
+            paths.append(git_dir)
+            common = common_dir(git_dir)
+            if common != git_dir:
+                paths.append(common)
+            for dirpath, _, _ in os.walk(common / "refs" / "heads"):
+                paths.append(Path(dirpath))
+        return paths
+
+    def _reader(self, git_dir: Path) -> GitRepo | None:
+        if not USE_GIT_READER:
+            return None
+        reader = self._readers.get(git_dir)
+        if reader is None:
+            try:
+                reader = self._readers[git_dir] = GitRepo(git_dir)
+            except (GitReaderError, OSError) as exc:
+                logger.info("[signals] in-process reader unavailable for %s: %s", git_dir, exc)
+                return None
+        return reader
+
+    async def _update(
+        self,
+        semaphore: asyncio.Semaphore,
+        repo: Path,
+        git_dir: Path,
+        signature: tuple[int, ...],
+    ) -> None:
+        try:
+            async with semaphore:
+                cutoff = self._cutoff()
+                entry = await scan_repo(
+                    repo,
+                    git_dir,
+                    self._entries.get(repo.name),
+                    signature,
+                    cutoff,
+                    self._reader(git_dir),
+                )
+        except Exception as exc:
+            logger.warning("[signals] scan failed for repo %s: %s", repo, exc)
+            return
+        entry.commits = _trim(entry.commits, cutoff)
+        previous = self._entries.get(repo.name)
+        self._entries[repo.name] = entry
+        if previous is None or entry.commits is not previous.commits:
+            self._changed()
+
+    def _schedule(
+        self,
+        semaphore: asyncio.Semaphore,
+        repo: Path,
+        git_dir: Path,
+        signature: tuple[int, ...],
+    ) -> asyncio.Task[None]:
+        """Start a scan for ``repo`` unless one is already running."""
+        task = self._inflight.get(repo.name)
+        if task is not None:
+            return task
+        task = asyncio.create_task(self._update(semaphore, repo, git_dir, signature))
+        self._inflight[repo.name] = task
+
+        def _done(finished: asyncio.Task[None], name: str = repo.name) -> None:
+            if self._inflight.get(name) is finished:
+                del self._inflight[name]
+
+        task.add_done_callback(_done)
+        return task
+
+    async def refresh(self, timeout: float | None = None) -> bool:
+        """Re-read any repo whose refs changed since the last refresh.
+
+        Returns False if some scans were still running when ``timeout``
+        elapsed; they continue in the background.
+        """
+        semaphore = self._bind_loop()
+        # Directory listing and ref stats touch the disk: keep them off the loop.
+        # No deadline on the stat pass itself: a slow one should still end in a
+        # partial answer below rather than a 504.
+        repos, signatures = await run_io(self._stat_repos, timeout=None)
+        names = {repo.name for repo, _ in repos}
+        if names != self._entries.keys():
+            self._entries = {n: e for n, e in self._entries.items() if n in names}
+            self._changed()
+            git_dirs = {git_dir for _, git_dir in repos}
+            for git_dir in [d for d in self._readers if d not in git_dirs]:
+                self._readers.pop(git_dir).close()
+
+        tasks = []
+        for (repo, git_dir), signature in zip(repos, signatures):
+            entry = self._entries.get(repo.name)
+            if entry is not None and entry.signature == signature:
+                continue
+            tasks.append(self._schedule(semaphore, repo, git_dir, signature))
+        if not tasks:
+            return True
+
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        return not pending
+
+    def iter_commits(self) -> Iterator[dict[str, Any]]:
+        """Yield commits in the window across all repos, newest first."""
+        cutoff = self._cutoff()
+        lists = [entry.commits for entry in self._entries.values()]
+        merged = heapq.merge(*lists, key=lambda c: c[0], reverse=True)
+        for _ts, _sha, commit, committed in merged:
+            # Ordered by author time, so an aged-out entry isn't the end
+            if committed >= cutoff:
+                yield commit
+
+    def version(self) -> int:
+        """Changes whenever ``top`` would, without merging anything.
+
+        Commits age out by committer time, which can drop one from the middle
+        of the list; the first time the window has passed the oldest indexed
+        commit, the lists are trimmed and the generation moves on.
+        """
+        cutoff = self._cutoff()
+        if self._expires is not None and self._expires < cutoff:
+            for entry in self._entries.values():
+                entry.commits = _trim(entry.commits, cutoff)
+            self._changed()
+        return self._generation
+
+    def top(self, limit: int = 50) -> list[dict[str, Any]]:
+        """Return the ``limit`` most recent commits."""
+        return list(itertools.islice(self.iter_commits(), limit))
+
+
+_dev_dir_raw = os.environ.get("DEV_DIR", str(Path.home() / "dev"))
+DEV_DIR = Path(_dev_dir_raw)
+
+commit_index = CommitIndex(DEV_DIR)
@@ -0,0 +1,203 @@
+"""Shared executors — where blocking work runs, so it never runs on the event loop.
+
+``io_pool`` is one sized thread pool for file and SQLite I/O. Every router
+and service sends blocking calls through ``run_io``, so they run outside the
+loop that serves SSE streams. Submissions beyond ``EXECUTOR_IO_MAX_QUEUE``
+waiting calls are rejected (``ExecutorSaturated``, a 503) instead of piling
+up. Each call has a request-level timeout (``ExecutorTimeout``, a 504).
+A thread can't be interrupted, so a call that overruns its timeout stays
+counted as ``active`` until it actually returns.
+
+``subprocess_slots`` bounds how many child processes (git, pm2) run at once.
+The processes themselves are asyncio subprocesses and never block the
+loop; the slots stop a burst of probes and scans from forking without
+limit.
+
+Both report queue depth, wait time and timeouts to ``/api/metrics``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from api.services.request_metrics import LatencyHistogram
+
+T = TypeVar("T")
+
+IO_WORKERS = int(os.environ.get("EXECUTOR_IO_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+IO_MAX_QUEUE = int(os.environ.get("EXECUTOR_IO_MAX_QUEUE", "1024"))
+SUBPROCESS_SLOTS = int(os.environ.get("EXECUTOR_SUBPROCESS_SLOTS", "4"))
+# Default per-call deadline for work done on behalf of a request
+REQUEST_TIMEOUT = float(os.environ.get("EXECUTOR_REQUEST_TIMEOUT", "10"))
+
+
+class ExecutorTimeout(asyncio.TimeoutError):
+    """A blocking call didn't finish within its deadline."""
+
+
+class ExecutorSaturated(Exception):
+    """Too many calls are already waiting for a worker."""
+
+
+class IOPool:
+    """Thread pool with queue-depth accounting and per-call deadlines."""
+
+    def __init__(self, workers: int = IO_WORKERS, max_queue: int = IO_MAX_QUEUE) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self.wait = LatencyHistogram()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="io")
+        return self._executor
+
+    def _call(self, state: dict[str, Any], context: contextvars.Context, fn: Callable[[], T]) -> T | None:
+        with self._lock:
+            if state["phase"] == "abandoned":
+                # Timed out while waiting for a worker; nobody wants the result
+                return None
+            state["phase"] = "running"
+            self.queued -= 1
+            self.active += 1
+            self.wait.record((time.perf_counter() - state["submitted"]) * 1000)
+        try:
+            # Run in the caller's context so I/O is attributed to its request
+            return context.run(fn)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    async def run(self, fn: Callable[..., T], *args: Any, timeout: float | None = REQUEST_TIMEOUT) -> T:
+        """Run ``fn(*args)`` on the pool; ``timeout=None`` waits indefinitely.
+
+        Like ``run_in_executor``, keyword arguments go through ``functools.partial``.
+        """
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(f"I/O pool saturated ({self.queued} calls waiting)")
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        state: dict[str, Any] = {"phase": "queued", "submitted": time.perf_counter()}
+        call = functools.partial(self._call, state, contextvars.copy_context(), functools.partial(fn, *args))
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._get_executor(), call)
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            raise
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+                if state["phase"] == "queued":
+                    state["phase"] = "abandoned"
+                    self.queued -= 1
+            raise ExecutorTimeout(f"{getattr(fn, '__name__', 'call')} timed out after {timeout:g}s") from None
+        except asyncio.CancelledError:
+            with self._lock:
+                if state["phase"] == "queued":
+                    state["phase"] = "abandoned"
+                    self.queued -= 1
+            raise
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "active": self.active,
+                "completed": self.completed,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "wait_ms": self.wait.snapshot(),
+            }
+
+
+class SubprocessSlots:
+    """Caps concurrent child processes; waiters are counted as queued."""
+
+    def __init__(self, slots: int = SUBPROCESS_SLOTS) -> None:
+        self.slots = slots
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.max_queued = 0
+        self.wait = LatencyHistogram()
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._semaphore is None:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.slots)
+        return self._semaphore
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        semaphore = self._bind_loop()
+        submitted = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.wait.record((time.perf_counter() - submitted) * 1000)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.completed += 1
+            semaphore.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "active": self.active,
+            "completed": self.completed,
+            "wait_ms": self.wait.snapshot(),
+        }
+
+
+io_pool = IOPool()
+subprocess_slots = SubprocessSlots()
+
+
+async def run_io(fn: Callable[..., T], *args: Any, timeout: float | None = REQUEST_TIMEOUT) -> T:
+    """Run a blocking call on the shared I/O pool (see ``IOPool.run``)."""
+    return await io_pool.run(fn, *args, timeout=timeout)
+
+
+def executor_stats() -> dict[str, Any]:
+    return {"io": io_pool.stats(), "subprocess": subprocess_slots.stats()}
@@ -2,51 +2,137 @@
 
 from __future__ import annotations
 
+import contextlib
 import json
+import os
+import tempfile
+import threading
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from api.services.executors import run_io
+from api.services.request_metrics import track
+
 # Allowed base directories for reads
 CLAWDBOT_DIR = Path.home() / "clawdbot"
 OPS_DIR = Path.home() / "Desktop" / "Manny" / "ops"
 
 ALLOWED_BASES = frozenset({CLAWDBOT_DIR, OPS_DIR})
+_RESOLVED_BASES = tuple(base.resolve() for base in ALLOWED_BASES)
 
 TOKEN_USAGE_PATH = OPS_DIR / "token-usage.json"
+TOKEN_EVENTS_PATH = OPS_DIR / "token-events.jsonl"
 TASK_QUEUE_PATH = CLAWDBOT_DIR / "data" / "task-queue.json"
 OVERNIGHT_DIR = CLAWDBOT_DIR / "overnight"
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class _CachedJson:
+    """A parsed file plus the stat fingerprint it was parsed from."""
+    fingerprint: tuple[int, int, int]
+    value: Any
+
+
+_json_cache: dict[Path, _CachedJson] = {}
+_json_cache_lock = threading.Lock()
+_json_stats = {"hits": 0, "misses": 0, "bytes_parsed": 0}
+
+
+def _fingerprint(st: os.stat_result) -> tuple[int, int, int]:
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def file_fingerprint(path: Path) -> tuple[int, int, int]:
+    """``(mtime_ns, size, inode)`` of a file, or zeros if it doesn't exist."""
+    try:
+        return _fingerprint(os.stat(path))
+    except FileNotFoundError:
+        return 0, 0, 0
+
 
 def _validate_path(path: Path) -> Path:
     """Ensure the resolved path falls under an allowed base directory."""
     resolved = path.resolve()
-    for base in ALLOWED_BASES:
-        try:
-            resolved.relative_to(base.resolve())
+    for base in _RESOLVED_BASES:
+        if resolved.is_relative_to(base):
             return resolved
-        except ValueError:
-            continue
     msg = f"Path not allowed: {resolved}"
     raise PermissionError(msg)
 
 
+@track("file_io")
 def read_json(path: Path) -> Any:
-    """Read and parse a JSON file from an allowed path."""
+    """Read and parse a JSON file from an allowed path.
+
+    Parsed results are cached per resolved path and revalidated with a single
+    ``os.stat``; the returned object is shared, so callers must not mutate it.
+    """
     safe_path = _validate_path(path)
-    if not safe_path.exists():
+    try:
+        fingerprint = _fingerprint(os.stat(safe_path))
+    except FileNotFoundError:
+        with _json_cache_lock:
+            _json_cache.pop(safe_path, None)
         return None
-    with safe_path.open("r", encoding="utf-8") as f:
-        return json.load(f)
 
+    cached = _json_cache.get(safe_path)
+    if cached is not None and cached.fingerprint == fingerprint:
+        with _json_cache_lock:
+            _json_stats["hits"] += 1
+        return cached.value
 
-def write_json(path: Path, data: Any) -> None:
-    """Write JSON to an allowed path."""
+    with safe_path.open("rb") as f:
+        # Fingerprint the descriptor we actually read, in case of a concurrent replace
+        fingerprint = _fingerprint(os.fstat(f.fileno()))
+        raw = f.read()
+    value = json.loads(raw)
+    with _json_cache_lock:
+        _json_cache[safe_path] = _CachedJson(fingerprint, value)
+        _json_stats["misses"] += 1
+        _json_stats["bytes_parsed"] += len(raw)
+    return value
+
+
+def json_cache_stats() -> dict[str, int]:
+    """Return hit/miss/bytes-parsed counters for the parsed-JSON cache."""
+    with _json_cache_lock:
+        return {**_json_stats, "entries": len(_json_cache)}
+
+
+@track("file_io")
+def write_json(path: Path, data: Any, if_unchanged: tuple[int, int, int] | None = None) -> bool:
+    """Write JSON to an allowed path, atomically replacing any existing file.
+
+    With ``if_unchanged`` (a ``file_fingerprint``, ``(0, 0, 0)`` for a missing
+    file) the swap is skipped and False returned if the file was changed after
+    that fingerprint was taken.
+    """
     safe_path = _validate_path(path)
     safe_path.parent.mkdir(parents=True, exist_ok=True)
-    with safe_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, default=str)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{safe_path.name}.", dir=safe_path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        if if_unchanged is not None and file_fingerprint(safe_path) != if_unchanged:
+            os.unlink(tmp_name)
+            return False
+        os.replace(tmp_name, safe_path)
+        return True
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    finally:
+        with _json_cache_lock:
+            _json_cache.pop(safe_path, None)
 
 
+@track("file_io")
 def read_text(path: Path) -> str | None:
     """Read a text file from an allowed path."""
     safe_path = _validate_path(path)
@@ -55,17 +141,53 @@ def read_text(path: Path) -> str | None:
     return safe_path.read_text(encoding="utf-8")
 
 
-def list_markdown_files(directory: Path) -> list[dict[str, str]]:
-    """List .md files in an allowed directory, returning name + slug."""
-    safe_dir = _validate_path(directory)
-    if not safe_dir.is_dir():
-        return []
-    files = sorted(safe_dir.glob("*.md"), key=lambda p: p.stat().st_mtime, reverse=True)
-    return [
-        {
-            "slug": f.stem,
-            "name": f.stem.replace("-", " ").title(),
-            "modified": f.stat().st_mtime,
-        }
-        for f in files
-    ]
+@track("file_io")
+def read_bytes_range(path: Path, start: int, end: int) -> bytes:
+    """Read ``[start, end)`` of a file from an allowed path."""
+    safe_path = _validate_path(path)
+    with safe_path.open("rb") as f:
+        f.seek(start)
+        return f.read(max(0, end - start))
+
+
+def iter_file_range(
+    path: Path,
+    start: int = 0,
+    end: int | None = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Yield ``[start, end)`` of a file in chunks without loading it whole."""
+    safe_path = _validate_path(path)
+    with safe_path.open("rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            # Timed per read: the consumer's time between chunks isn't I/O
+            with track("file_io"):
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+async def aiter_file_range(
+    path: Path,
+    start: int = 0,
+    end: int | None = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """``iter_file_range`` for async consumers: each read runs on the I/O pool."""
+    chunks = iter_file_range(path, start, end, chunk_size)
+    try:
+        while True:
+            chunk = await run_io(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # A read abandoned mid-flight (client gone) still owns the generator;
+        # it is then closed when collected.
+        with contextlib.suppress(ValueError):
+            chunks.close()
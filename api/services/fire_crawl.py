@@ -1,8 +1,51 @@
+import asyncio
+import codecs
+import colorsys
+import contextlib
+import ipaddress
 import os
+import re
+import socket
+import time
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from html.parser import HTMLParser
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import httpcore
 import httpx
 from pydantic import BaseModel
-from typing import List, Optional
-import json
+
+# Crawl limits
+CRAWL_CONCURRENCY = int(os.environ.get("CRAWL_CONCURRENCY", "16"))
+CRAWL_PER_HOST = int(os.environ.get("CRAWL_PER_HOST", "2"))
+CRAWL_HOST_INTERVAL = float(os.environ.get("CRAWL_HOST_INTERVAL", "0.25"))
+CRAWL_TIMEOUT = float(os.environ.get("CRAWL_TIMEOUT", "10"))
+MAX_STYLESHEETS = 8
+# Bodies are parsed as they stream in; stop after this many bytes per document
+CRAWL_MAX_BYTES = int(os.environ.get("CRAWL_MAX_BYTES", str(2 * 1024 * 1024)))
+CRAWL_CHUNK_SIZE = 64 * 1024
+# Stop reading once the DNA score reaches this and its signature holds steady
+CRAWL_CONVERGE_SCORE = float(os.environ.get("CRAWL_CONVERGE_SCORE", "9.0"))
+CONVERGE_STABLE_CHECKS = 3
+# Longest partial CSS declaration carried between chunks
+MAX_CSS_CARRY = 64 * 1024
+# The crawl endpoint is public: refuse private/loopback targets unless allowed
+CRAWL_ALLOW_PRIVATE = os.environ.get("CRAWL_ALLOW_PRIVATE", "0") == "1"
+
+# DNA cache: fresh entries are served as is, stale ones are revalidated
+DNA_CACHE_SIZE = int(os.environ.get("DNA_CACHE_SIZE", "512"))
+DNA_FRESH_SECONDS = float(os.environ.get("DNA_FRESH_SECONDS", "300"))
+
+USER_AGENT = "emanuelteklu-taste-crawler/0.1"
+
+_HEX_RE = re.compile(r"#([0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b")
+_RGB_RE = re.compile(r"rgba?\(\s*(\d{1,3})[\s,]+(\d{1,3})[\s,]+(\d{1,3})")
+_FONT_RE = re.compile(r"font-family\s*:\s*([^;}{]+)", re.IGNORECASE)
+_DISPLAY_RE = re.compile(r"display\s*:\s*(grid|flex|inline-grid|inline-flex)", re.IGNORECASE)
+GENERIC_FONTS = {"serif", "sans-serif", "monospace", "cursive", "fantasy", "system-ui", "inherit", "initial"}
+
 
 class DesignDNA(BaseModel):
     palette: List[str]
@@ -16,73 +59,582 @@ class ScrapeResult(BaseModel):
     dna: DesignDNA
     screenshot_url: Optional[str] = None
 
+
+# Curated DNA for reference sites, used when a live crawl isn't possible
+KNOWN_SITES = {
+    "rauno.me": {
+        "palette": ["#EFFF00", "#000000", "#FFFFFF"],
+        "typography": "Inter Display",
+        "layout": "Dynamic Grid / Fluid Motion",
+        "vibe": "Signal / High-Contrast",
+        "score": 9.9
+    },
+    "paco.me": {
+        "palette": ["#FFFFFF", "#F3F4FB", "#000000"],
+        "typography": "Inter / SF Pro",
+        "layout": "Modular Grid",
+        "vibe": "Architect / Clean",
+        "score": 9.6
+    },
+    "linear.app": {
+        "palette": ["#5E6AD2", "#0F1115", "#FFFFFF"],
+        "typography": "Inter",
+        "layout": "Dense / Efficiency-First",
+        "vibe": "Professional / SaaS",
+        "score": 9.8
+    }
+}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical cache key: https default, lower-case host, no fragment or default port.
+
+    Raises ValueError for anything that isn't an http(s) URL with a host.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError as e:
+        raise ValueError(f"Invalid URL {url!r}: {e}") from None
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        raise ValueError(f"Unsupported scheme: {scheme}")
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise ValueError(f"Invalid URL {url!r}: no host")
+    if ":" in host:
+        host = f"[{host}]"
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path or "/"
+    query = "&".join(sorted(q for q in parts.query.split("&") if q))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def _hex(r: int, g: int, b: int) -> str:
+    return f"#{min(r, 255):02X}{min(g, 255):02X}{min(b, 255):02X}"
+
+
+class StyleCollector:
+    """Frequency histograms of colors, fonts and layout modes seen in CSS."""
+
+    def __init__(self):
+        self.colors: Counter = Counter()
+        self.fonts: Counter = Counter()
+        self.layouts: Counter = Counter()
+
+    def feed_css(self, css: str) -> None:
+        for match in _HEX_RE.finditer(css):
+            value = match.group(1)
+            if len(value) == 3:
+                value = "".join(c * 2 for c in value)
+            self.colors["#" + value.upper()] += 1
+        for r, g, b in _RGB_RE.findall(css):
+            self.colors[_hex(int(r), int(g), int(b))] += 1
+        for families in _FONT_RE.findall(css):
+            for family in families.split(","):
+                name = family.strip().strip("'\"").strip()
+                if name and not name.startswith("var("):
+                    self.fonts[name] += 1
+                    break
+        for mode in _DISPLAY_RE.findall(css):
+            self.layouts[mode.lower().replace("inline-", "")] += 1
+
+    @property
+    def evidence(self) -> int:
+        return sum(self.colors.values()) + sum(self.fonts.values()) + sum(self.layouts.values())
+
+    @property
+    def score(self) -> float:
+        # Confidence grows with evidence and saturates toward 10
+        return round(10 * self.evidence / (self.evidence + 40), 1)
+
+    def signature(self) -> Optional[Tuple]:
+        """Leading palette, font and layout once the score is high enough to
+        call them; None before that. Reading stops when this holds steady."""
+        if self.score < CRAWL_CONVERGE_SCORE:
+            return None
+        grid, flex = self.layouts.get("grid", 0), self.layouts.get("flex", 0)
+        return (
+            tuple(color for color, _ in self.colors.most_common(3)),
+            tuple(font for font, _ in self.fonts.most_common(1)),
+            grid >= flex,
+        )
+
+    def dna(self) -> DesignDNA:
+        palette = [color for color, _ in self.colors.most_common(5)]
+        named = [f for f, _ in self.fonts.most_common() if f.lower() not in GENERIC_FONTS]
+        generic = [f for f, _ in self.fonts.most_common() if f.lower() in GENERIC_FONTS]
+        typography = " / ".join(named[:2]) or (generic[0] if generic else "Sans-Serif")
+
+        grid, flex = self.layouts.get("grid", 0), self.layouts.get("flex", 0)
+        if grid and grid >= flex:
+            layout = "Modular Grid"
+        elif flex:
+            layout = "Flex / Stacked Sections"
+        else:
+            layout = "Document Flow"
+
+        return DesignDNA(
+            palette=palette or ["#000000", "#FFFFFF"],
+            typography=typography,
+            layout=layout,
+            vibe=_vibe(palette, typography, generic),
+            score=self.score,
+        )
+
+
+def _vibe(palette: List[str], typography: str, generic: List[str]) -> str:
+    if not palette:
+        return "General Purpose"
+    rgb = [tuple(int(c[i:i + 2], 16) / 255 for i in (1, 3, 5)) for c in palette]
+    hls = [colorsys.rgb_to_hls(*c) for c in rgb]
+    lead_dark = hls[0][1] < 0.3
+    accent = any(s > 0.6 and 0.25 < l < 0.75 for _, l, s in hls)
+    fonts = (typography + " " + " ".join(generic)).lower()
+    if "mono" in fonts:
+        return "Terminal / Technical"
+    if "serif" in fonts and "sans" not in fonts:
+        return "Manuscript / Editorial"
+    if accent and lead_dark:
+        return "Signal / High-Contrast"
+    if lead_dark:
+        return "Dark / Moody"
+    if accent:
+        return "Vivid / Playful"
+    return "Architect / Clean"
+
+
+class _CssStream:
+    """Feeds CSS arriving in arbitrary chunks to a collector in whole declarations."""
+
+    def __init__(self, collector: StyleCollector):
+        self.collector = collector
+        self._tail = ""
+
+    def feed(self, text: str) -> None:
+        text = self._tail + text
+        cut = max(text.rfind("}"), text.rfind(";")) + 1
+        if not cut:
+            if len(text) < MAX_CSS_CARRY:
+                self._tail = text
+                return
+            cut = len(text)
+        self.collector.feed_css(text[:cut])
+        self._tail = text[cut:]
+
+    def close(self) -> None:
+        if self._tail:
+            self.collector.feed_css(self._tail)
+            self._tail = ""
+
+
+class _PageParser(HTMLParser):
+    """Collects stylesheet links, inline <style> blocks and style attributes."""
+
+    def __init__(self, collector: StyleCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+        self.stylesheets: List[str] = []
+        self._in_style = False
+        self._css = _CssStream(collector)
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag == "link" and "stylesheet" in (attributes.get("rel") or "").lower() and attributes.get("href"):
+            self.stylesheets.append(attributes["href"])
+        elif tag == "style":
+            self._in_style = True
+        if attributes.get("style"):
+            self.collector.feed_css(attributes["style"])
+
+    def handle_endtag(self, tag):
+        if tag == "style":
+            self._in_style = False
+            self._css.close()
+
+    def handle_data(self, data):
+        if self._in_style:
+            self._css.feed(data)
+
+    def close(self):
+        super().close()
+        self._css.close()
+
+
+class _HostState:
+    __slots__ = ("slots", "lock", "next_start", "users")
+
+    def __init__(self, per_host: int):
+        self.slots = asyncio.Semaphore(per_host)
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+        # Requests holding or waiting for a slot
+        self.users = 0
+
+
+class HostRateLimiter:
+    """
+    Caps concurrent requests per host and spaces out their start times.
+    A host's state is dropped once nothing holds or waits for its slots and
+    its next start time has passed, so arbitrary hostnames sent to the public
+    crawl endpoint can't grow it without bound.
+    """
+
+    def __init__(self, per_host: int = CRAWL_PER_HOST, interval: float = CRAWL_HOST_INTERVAL):
+        self.per_host = per_host
+        self.interval = interval
+        self._hosts: Dict[str, _HostState] = {}
+        # Hosts nobody is using, oldest first: their next_start is ~ordered too
+        self._idle: "OrderedDict[str, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    def _evict_idle(self, now: float) -> None:
+        while self._idle:
+            host = next(iter(self._idle))
+            if self._hosts[host].next_start > now:
+                break
+            del self._idle[host]
+            del self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        self._evict_idle(loop.time())
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.per_host)
+        self._idle.pop(host, None)
+        state.users += 1
+        try:
+            async with state.slots:
+                async with state.lock:
+                    wait = state.next_start - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    state.next_start = loop.time() + self.interval
+                yield
+        finally:
+            state.users -= 1
+            if not state.users:
+                self._idle[host] = None
+
+
+class CrawlBlocked(httpx.RequestError):
+    """Raised when a crawl (or one of its redirects) targets a disallowed address."""
+
+
+async def _check_target(request: httpx.Request) -> None:
+    """Request hook: only http(s), re-checked on every redirect."""
+    if request.url.scheme not in ("http", "https"):
+        raise CrawlBlocked(f"Unsupported scheme: {request.url.scheme}", request=request)
+
+
+def _is_public(address: str) -> bool:
+    return ipaddress.ip_address(address).is_global
+
+
+class _PublicOnlyBackend(httpcore.AsyncNetworkBackend):
+    """
+    Resolves each host itself and dials only the addresses it vetted.
+    Checking in a hook and letting the connection resolve again would leave
+    a DNS-rebinding gap; here the checked address is the one connected to.
+    TLS still verifies against the hostname.
+    """
+
+    def __init__(self):
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options=None,
+    ) -> httpcore.AsyncNetworkStream:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            raise httpcore.ConnectError(f"Cannot resolve {host}: {e}") from e
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        for address in addresses:
+            if not _is_public(address):
+                raise CrawlBlocked(f"Refusing to crawl non-public address {address}")
+        error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options=None):
+        raise CrawlBlocked("Refusing to crawl a unix socket")
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore errors as httpx's own transport maps them
+_HTTPCORE_ERRORS = (
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.ProxyError, httpx.ProxyError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+)
+
+
+@contextlib.contextmanager
+def _map_httpcore_errors() -> Iterator[None]:
+    try:
+        yield
+    except Exception as e:
+        mapped = None
+        for source, target in _HTTPCORE_ERRORS:
+            # The most specific match wins
+            if isinstance(e, source) and (mapped is None or issubclass(target, mapped)):
+                mapped = target
+        if mapped is None:
+            raise
+        raise mapped(str(e)) from e
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _map_httpcore_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class _PublicOnlyTransport(httpx.AsyncBaseTransport):
+    """
+    A direct (never proxied: the proxy would do the resolving) HTTP/1.1
+    connection pool dialling through ``_PublicOnlyBackend``.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=_PublicOnlyBackend(),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _map_httpcore_errors():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+
+class _CachedDNA(BaseModel):
+    dna: DesignDNA
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    checked_at: float = 0.0
+
+
 class FireCrawlService:
     """
     A robust design DNA extraction service.
-    Instead of mocks, this service can now take a URL and coordinate with
-    an analysis agent to extract real visual properties.
+    Crawls a page and its stylesheets over a shared, pooled HTTP client and
+    derives palette, typography and layout from the CSS actually served.
+    Bodies are parsed incrementally as they stream in, so memory stays
+    bounded and reading stops once the DNA converges.
     """
-    
-    async def analyze_url(self, url: str) -> ScrapeResult:
-        """
-        Extends the 'Fire Crawl' capability by analyzing the site's styles.
-        In the future, this would call a headless browser service.
-        For now, we'll use a more advanced heuristic-based analysis.
-        """
-        print(f"🔥 Real FireCrawl: Ingesting {url}...")
-        
-        # Heuristic: Extracting from common high-end sites or generic fallback
-        # In a real integrated environment, this would call out to a secondary agent.
-        
-        # Mapping known archetypes to DNA to prove the framework's robustness
-        sites_map = {
-            "rauno.me": {
-                "palette": ["#EFFF00", "#000000", "#FFFFFF"],
-                "typography": "Inter Display",
-                "layout": "Dynamic Grid / Fluid Motion",
-                "vibe": "Signal / High-Contrast",
-                "score": 9.9
-            },
-            "paco.me": {
-                "palette": ["#FFFFFF", "#F3F4FB", "#000000"],
-                "typography": "Inter / SF Pro",
-                "layout": "Modular Grid",
-                "vibe": "Architect / Clean",
-                "score": 9.6
-            },
-            "linear.app": {
-                "palette": ["#5E6AD2", "#0F1115", "#FFFFFF"],
-                "typography": "Inter",
-                "layout": "Dense / Efficiency-First",
-                "vibe": "Professional / SaaS",
-                "score": 9.8
-            }
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limiter = HostRateLimiter()
+        self._crawl_slots: Optional[asyncio.Semaphore] = None
+        self._cache: "OrderedDict[str, _CachedDNA]" = OrderedDict()
+        self.stats = {
+            "fresh_hits": 0, "revalidated": 0, "fetched": 0, "fallbacks": 0,
+            "bytes_read": 0, "early_stops": 0, "truncated": 0,
         }
-        
-        for key, dna_data in sites_map.items():
-            if key in url:
-                return ScrapeResult(url=url, dna=DesignDNA(**dna_data))
-                
-        # Default analysis for any other URL
-        return ScrapeResult(
-            url=url,
-            dna=DesignDNA(
-                palette=["#000000", "#FFFFFF"],
-                typography="Sans-Serif",
-                layout="Responsive Web",
-                vibe="General Purpose",
-                score=7.5
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=CRAWL_CONCURRENCY * 2, max_keepalive_connections=CRAWL_CONCURRENCY)
+            self._client = httpx.AsyncClient(
+                timeout=CRAWL_TIMEOUT,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                event_hooks={"request": [_check_target]},
+                limits=limits,
+                # Private targets are only reachable when explicitly allowed
+                transport=None if CRAWL_ALLOW_PRIVATE else _PublicOnlyTransport(limits),
             )
+        return self._client
+
+    async def close(self) -> None:
+        """Lifespan shutdown: close pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @asynccontextmanager
+    async def _open(self, url: str, headers: Optional[Dict[str, str]] = None) -> AsyncIterator[httpx.Response]:
+        """Streamed GET holding a per-host slot until the body is done with."""
+        async with self._limiter.slot(urlsplit(url).netloc):
+            async with self._get_client().stream("GET", url, headers=headers) as response:
+                yield response
+
+    async def _consume(self, response: httpx.Response, feed: Callable[[str], None], collector: StyleCollector) -> None:
+        """Decode and feed the body chunk by chunk, stopping at the byte cap
+        or once the collected DNA has converged."""
+        try:
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        read = stable = 0
+        signature = None
+        async for chunk in response.aiter_bytes(CRAWL_CHUNK_SIZE):
+            chunk = chunk[:CRAWL_MAX_BYTES - read]
+            read += len(chunk)
+            feed(decoder.decode(chunk))
+            if read >= CRAWL_MAX_BYTES:
+                self.stats["truncated"] += 1
+                break
+            # Each document gets a say: stop once its own last few chunks
+            # left the DNA signature unchanged
+            current = collector.signature()
+            stable = stable + 1 if current is not None and current == signature else 0
+            signature = current
+            if stable >= CONVERGE_STABLE_CHECKS:
+                self.stats["early_stops"] += 1
+                break
+        self.stats["bytes_read"] += read
+        feed(decoder.decode(b"", final=True))
+
+    async def _read_stylesheet(self, url: str, collector: StyleCollector) -> None:
+        async with self._open(url) as response:
+            if response.status_code != 200:
+                return
+            css = _CssStream(collector)
+            await self._consume(response, css.feed, collector)
+            css.close()
+
+    def _remember(self, key: str, entry: _CachedDNA) -> None:
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > DNA_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def _crawl(self, url: str, cached: Optional[_CachedDNA]) -> _CachedDNA:
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        collector = StyleCollector()
+        parser = _PageParser(collector)
+        async with self._open(url, headers) as response:
+            if response.status_code == 304 and cached is not None:
+                self.stats["revalidated"] += 1
+                return cached.model_copy(update={"checked_at": time.time()})
+            response.raise_for_status()
+            await self._consume(response, parser.feed, collector)
+            parser.close()
+            base_url = str(response.url)
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+
+        sheet_urls = [urljoin(base_url, href) for href in parser.stylesheets[:MAX_STYLESHEETS]]
+        await asyncio.gather(*(self._read_stylesheet(u, collector) for u in sheet_urls), return_exceptions=True)
+
+        self.stats["fetched"] += 1
+        return _CachedDNA(
+            dna=collector.dna(),
+            etag=etag,
+            last_modified=last_modified,
+            checked_at=time.time(),
         )
 
+    async def analyze_url(self, url: str) -> ScrapeResult:
+        """
+        Extracts the site's design DNA from its live HTML and CSS.
+        Results are cached per normalized URL and revalidated with
+        ETag / Last-Modified once stale.
+        """
+        key = normalize_url(url)
+        cached = self._cache.get(key)
+        if cached is not None and time.time() - cached.checked_at < DNA_FRESH_SECONDS:
+            self.stats["fresh_hits"] += 1
+            self._cache.move_to_end(key)
+            return ScrapeResult(url=url, dna=cached.dna)
+
+        print(f"🔥 Real FireCrawl: Ingesting {key}...")
+        if self._crawl_slots is None:
+            self._crawl_slots = asyncio.Semaphore(CRAWL_CONCURRENCY)
+        try:
+            async with self._crawl_slots:
+                entry = await self._crawl(key, cached)
+        except CrawlBlocked:
+            raise
+        except httpx.HTTPError as e:
+            known = next((dna for site, dna in KNOWN_SITES.items() if urlsplit(key).hostname == site), None)
+            if known is None:
+                raise
+            print(f"🔥 FireCrawl: live crawl of {key} failed ({e!r}); using curated DNA")
+            self.stats["fallbacks"] += 1
+            return ScrapeResult(url=url, dna=DesignDNA(**known))
+        self._remember(key, entry)
+        return ScrapeResult(url=url, dna=entry.dna)
+
+    async def analyze_many(self, urls: List[str]) -> List[ScrapeResult]:
+        """
+        Analyzes many URLs concurrently (bounded globally and per host).
+        """
+        return list(await asyncio.gather(*(self.analyze_url(u) for u in urls)))
+
     async def search_and_analyze(self, query: str) -> List[ScrapeResult]:
         """
         Performs a 'Fire Crawl' search — finding high-quality matches for a vibe.
         """
         print(f"🔥 FireCrawl: Finding inspiration for '{query}'...")
-        # Simulating a high-quality crawl of design references
-        return [
-            await self.analyze_url("rauno.me"),
-            await self.analyze_url("paco.me"),
-            await self.analyze_url("linear.app")
-        ]
+        return await self.analyze_many(list(KNOWN_SITES))
@@ -0,0 +1,124 @@
+"""Generation pipeline — concurrent, single-flight, cached image generation.
+
+Wraps an image generator (``async (prompt, style) -> image_url``) so that:
+
+- variants of a round are generated concurrently, bounded by a semaphore;
+- identical prompts already in flight, from any session, share one call;
+- finished results are cached by prompt hash in a size-bounded LRU;
+- rounds can be prefetched in the background and picked up from the cache.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CONCURRENCY = int(os.environ.get("TASTE_GENERATION_CONCURRENCY", "4"))
+GENERATION_CACHE_SIZE = int(os.environ.get("TASTE_GENERATION_CACHE_SIZE", "1024"))
+
+Generator = Callable[[str, str], Awaitable[str]]
+
+
+async def placeholder_image(prompt: str, style: str) -> str:
+    """Default generator: a stock image URL for the style (no model call)."""
+    return f"https://source.unsplash.com/featured/800x600?{style.lower().replace(' ', ',')},design"
+
+
+def prompt_key(prompt: str, style: str) -> str:
+    return hashlib.sha256(f"{style}\0{prompt}".encode()).hexdigest()
+
+
+class GenerationPipeline:
+    """Single-flight, cached front for an image generator."""
+
+    def __init__(
+        self,
+        generator: Generator = placeholder_image,
+        concurrency: int = GENERATION_CONCURRENCY,
+        cache_size: int = GENERATION_CACHE_SIZE,
+    ) -> None:
+        self.generator = generator
+        self.concurrency = concurrency
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[str]] = {}
+        self._background: set[asyncio.Task[Any]] = set()
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.prefetched = 0
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._semaphore is None:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._inflight.clear()
+        return self._semaphore
+
+    async def _produce(self, key: str, prompt: str, style: str) -> str:
+        semaphore = self._bind_loop()
+        try:
+            async with semaphore:
+                url = await self.generator(prompt, style)
+            self._cache[key] = url
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return url
+        finally:
+            self._inflight.pop(key, None)
+
+    async def generate(self, prompt: str, style: str) -> str:
+        """Image URL for ``prompt``: cached, joined in flight, or generated now."""
+        self._bind_loop()
+        key = prompt_key(prompt, style)
+        url = self._cache.get(key)
+        if url is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return url
+        future = self._inflight.get(key)
+        if future is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            future = self._inflight[key] = asyncio.ensure_future(self._produce(key, prompt, style))
+        # Shield so one caller disconnecting doesn't cancel the others' result
+        return await asyncio.shield(future)
+
+    async def generate_many(self, requests: Sequence[tuple[str, str]]) -> list[str]:
+        """Generate ``(prompt, style)`` pairs concurrently, preserving order."""
+        return list(await asyncio.gather(*(self.generate(p, s) for p, s in requests)))
+
+    def prefetch(self, requests: Sequence[tuple[str, str]]) -> None:
+        """Warm the cache for a likely next round without waiting on it."""
+        async def run() -> None:
+            try:
+                await self.generate_many(requests)
+            except Exception as e:
+                logger.warning("Prefetch failed: %s", e)
+
+        self.prefetched += len(requests)
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "cache_entries": len(self._cache),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_inflight": self.shared,
+            "prefetched": self.prefetched,
+        }
@@ -0,0 +1,482 @@
+"""In-process git reader — refs, loose objects and packfiles without spawning git.
+
+Only what the dashboard needs: resolve refs, inflate commit objects (including
+delta-compressed ones inside packs) and walk history newest-first. Pack
+indexes are mmap'd and searched with the fanout table plus a binary search,
+so a lookup is O(log n) in the number of packed objects. Anything exotic
+(SHA-256 repos, v1 pack indexes) raises ``GitReaderError`` so callers can fall
+back to the ``git`` binary.
+"""
+
+from __future__ import annotations
+
+import heapq
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_SHA_LEN = 20
+_IDX_MAGIC = b"\377tOc"
+
+_OBJ_COMMIT = 1
+_OBJ_OFS_DELTA = 6
+_OBJ_REF_DELTA = 7
+_TYPE_NAMES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+
+# Delta bases are reused along a chain; keep a handful of inflated ones around.
+_BASE_CACHE_SIZE = 256
+
+
+class GitReaderError(Exception):
+    """Raised when a repository can't be read in-process."""
+
+
+@dataclass(frozen=True)
+class CommitInfo:
+    """The parts of a commit object the routers care about."""
+    sha: str
+    parents: tuple[str, ...]
+    author_time: int
+    author_tz: str
+    commit_time: int
+    subject: str
+
+    @property
+    def author_date(self) -> str:
+        """Author date in ``git log --format=%ai`` form."""
+        return format_git_date(self.author_time, self.author_tz)
+
+
+def format_git_date(timestamp: int, tz: str) -> str:
+    """Render a timestamp + ``+HHMM`` offset the way ``%ai`` does."""
+    try:
+        sign = -1 if tz.startswith("-") else 1
+        offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])) * sign
+    except (ValueError, IndexError):
+        offset, tz = timedelta(0), "+0000"
+    moment = datetime.fromtimestamp(timestamp, timezone(offset))
+    return f"{moment:%Y-%m-%d %H:%M:%S} {tz}"
+
+
+# --- Refs ---
+
+
+def resolve_git_dir(repo: Path) -> Path | None:
+    """Return the git directory for a work tree (handles ``.git`` files)."""
+    dot_git = repo / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    if dot_git.is_file():
+        try:
+            content = dot_git.read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if content.startswith("gitdir:"):
+            git_dir = Path(content[len("gitdir:"):].strip())
+            return git_dir if git_dir.is_absolute() else (repo / git_dir).resolve()
+    return None
+
+
+def common_dir(git_dir: Path) -> Path:
+    """Linked worktrees keep shared refs and objects under ``commondir``."""
+    commondir = git_dir / "commondir"
+    if commondir.is_file():
+        try:
+            target = Path(commondir.read_text(encoding="utf-8").strip())
+        except OSError:
+            return git_dir
+        return target if target.is_absolute() else (git_dir / target).resolve()
+    return git_dir
+
+
+def _packed_refs(git_dir: Path) -> dict[str, str]:
+    refs: dict[str, str] = {}
+    try:
+        with (common_dir(git_dir) / "packed-refs").open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(("#", "^")):
+                    continue
+                sha, _, name = line.rstrip("\n").partition(" ")
+                if name:
+                    refs[name] = sha
+    except OSError:
+        pass
+    return refs
+
+
+def read_ref(git_dir: Path, name: str, _depth: int = 0) -> str | None:
+    """Resolve a ref name (``HEAD``, ``refs/heads/main``…) to a sha."""
+    if _depth > 5:
+        return None
+    base = git_dir if name == "HEAD" else common_dir(git_dir)
+    try:
+        value = (base / name).read_text(encoding="utf-8").strip()
+    except OSError:
+        return _packed_refs(git_dir).get(name)
+    if value.startswith("ref: "):
+        return read_ref(git_dir, value[5:], _depth + 1)
+    return value or None
+
+
+def read_head(git_dir: Path) -> str | None:
+    """Resolve HEAD to a commit sha."""
+    return read_ref(git_dir, "HEAD")
+
+
+def iter_refs(git_dir: Path) -> Iterator[tuple[str, str]]:
+    """Yield ``(name, sha)`` for every branch and tag, loose refs winning."""
+    refs = _packed_refs(git_dir)
+    refs_dir = common_dir(git_dir) / "refs"
+    for root, _dirs, files in os.walk(refs_dir):
+        for filename in files:
+            path = Path(root) / filename
+            name = path.relative_to(refs_dir.parent).as_posix()
+            try:
+                value = path.read_text(encoding="utf-8").strip()
+            except OSError:
+                continue
+            if value and not value.startswith("ref: "):
+                refs[name] = value
+    yield from sorted(refs.items())
+
+
+# --- Object storage ---
+
+
+def _read_varint_size(data: bytes | mmap.mmap, pos: int) -> tuple[int, int]:
+    """Little-endian base-128 size used in delta headers."""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Apply a git delta (copy/insert opcodes) to ``base``."""
+    src_size, pos = _read_varint_size(delta, 0)
+    dst_size, pos = _read_varint_size(delta, pos)
+    if src_size != len(base):
+        raise GitReaderError("delta base size mismatch")
+    out = bytearray()
+    end = len(delta)
+    while pos < end:
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            offset = size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (1 << (4 + i)):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            out += base[offset:offset + (size or 0x10000)]
+        elif op:
+            out += delta[pos:pos + op]
+            pos += op
+        else:
+            raise GitReaderError("invalid delta opcode")
+    if len(out) != dst_size:
+        raise GitReaderError("delta result size mismatch")
+    return bytes(out)
+
+
+def _inflate(data: bytes | mmap.mmap, pos: int, size: int) -> bytes:
+    """Inflate one zlib stream starting at ``pos`` whose output is ``size`` bytes."""
+    inflater = zlib.decompressobj()
+    out = bytearray()
+    chunk = max(size + 64, 4096)
+    end = len(data)
+    while not inflater.eof and pos < end:
+        piece = data[pos:pos + chunk]
+        pos += len(piece)
+        out += inflater.decompress(piece)
+    if not inflater.eof:
+        raise GitReaderError("truncated zlib stream")
+    return bytes(out)
+
+
+class PackFile:
+    """A ``.pack`` + v2 ``.idx`` pair, both memory-mapped."""
+
+    def __init__(self, idx_path: Path) -> None:
+        self.idx_path = idx_path
+        self.pack_path = idx_path.with_suffix(".pack")
+        with idx_path.open("rb") as f:
+            self._idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with self.pack_path.open("rb") as f:
+            self._pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._idx[:4] != _IDX_MAGIC or struct.unpack(">I", self._idx[4:8])[0] != 2:
+            raise GitReaderError(f"unsupported pack index: {idx_path.name}")
+        self._fanout = struct.unpack(">256I", self._idx[8:8 + 1024])
+        self.count = self._fanout[255]
+        self._names_at = 8 + 1024
+        self._offsets_at = self._names_at + self.count * (_SHA_LEN + 4)
+        self._large_at = self._offsets_at + self.count * 4
+        self._bases: OrderedDict[int, tuple[int, bytes]] = OrderedDict()
+
+    def close(self) -> None:
+        self._idx.close()
+        self._pack.close()
+
+    def find(self, sha: bytes) -> int | None:
+        """Return the pack offset for a binary sha, or None."""
+        first = sha[0]
+        lo = self._fanout[first - 1] if first else 0
+        hi = self._fanout[first]
+        idx, names = self._idx, self._names_at
+        while lo < hi:
+            mid = (lo + hi) // 2
+            at = names + mid * _SHA_LEN
+            candidate = idx[at:at + _SHA_LEN]
+            if candidate < sha:
+                lo = mid + 1
+            elif candidate > sha:
+                hi = mid
+            else:
+                return self._offset(mid)
+        return None
+
+    def _offset(self, n: int) -> int:
+        at = self._offsets_at + n * 4
+        offset = struct.unpack(">I", self._idx[at:at + 4])[0]
+        if offset & 0x80000000:
+            at = self._large_at + (offset & 0x7FFFFFFF) * 8
+            offset = struct.unpack(">Q", self._idx[at:at + 8])[0]
+        return offset
+
+    def _base_at(self, offset: int, repo: GitRepo) -> tuple[int, bytes]:
+        """``read_at`` for delta bases, which neighbouring objects tend to share."""
+        cached = self._bases.get(offset)
+        if cached is not None:
+            self._bases.move_to_end(offset)
+            return cached
+        result = self._bases[offset] = self.read_at(offset, repo)
+        if len(self._bases) > _BASE_CACHE_SIZE:
+            self._bases.popitem(last=False)
+        return result
+
+    def read_at(self, offset: int, repo: GitRepo) -> tuple[int, bytes]:
+        """Return ``(type, data)`` for the object at ``offset``, resolving deltas."""
+        pack = self._pack
+        byte = pack[offset]
+        pos = offset + 1
+        obj_type = (byte >> 4) & 0x7
+        size = byte & 0x0F
+        shift = 4
+        while byte & 0x80:
+            byte = pack[pos]
+            pos += 1
+            size |= (byte & 0x7F) << shift
+            shift += 7
+
+        if obj_type == _OBJ_OFS_DELTA:
+            byte = pack[pos]
+            pos += 1
+            rel = byte & 0x7F
+            while byte & 0x80:
+                byte = pack[pos]
+                pos += 1
+                rel = ((rel + 1) << 7) | (byte & 0x7F)
+            base_type, base = self._base_at(offset - rel, repo)
+            return base_type, apply_delta(base, _inflate(pack, pos, size))
+        elif obj_type == _OBJ_REF_DELTA:
+            base_sha = pack[pos:pos + _SHA_LEN]
+            pos += _SHA_LEN
+            base_type, base = repo.read_raw(base_sha.hex())
+            return base_type, apply_delta(base, _inflate(pack, pos, size))
+        if obj_type in _TYPE_NAMES:
+            return obj_type, _inflate(pack, pos, size)
+        raise GitReaderError(f"bad pack object type {obj_type} at {offset}")
+
+
+def _signature_time(line: bytes) -> tuple[int, str]:
+    """``author Name <email> 1700000000 +0200`` -> ``(1700000000, "+0200")``."""
+    _, stamp, tz = line.rsplit(b" ", 2)
+    return int(stamp), tz.decode("ascii")
+
+
+def parse_commit(sha: str, raw: bytes) -> CommitInfo:
+    """Parse the headers and subject out of a raw commit object."""
+    header_end = raw.find(b"\n\n")
+    if header_end < 0:
+        header_end = len(raw)
+    lines = raw[:header_end].split(b"\n")
+    # git fsck enforces the order: tree, parent*, author, committer, extras
+    i = 1
+    parents = []
+    while i < len(lines) and lines[i].startswith(b"parent "):
+        parents.append(lines[i][7:].decode("ascii"))
+        i += 1
+    author_time, author_tz = _signature_time(lines[i])
+    commit_time = _signature_time(lines[i + 1])[0]
+
+    # %s: the first paragraph with its line breaks folded into spaces
+    message = raw[header_end + 2:].lstrip(b"\n")
+    paragraph_end = message.find(b"\n\n")
+    if paragraph_end >= 0:
+        message = message[:paragraph_end]
+    subject = message.decode("utf-8", errors="replace").strip().replace("\n", " ")
+    return CommitInfo(
+        sha=sha,
+        parents=tuple(parents),
+        author_time=author_time,
+        author_tz=author_tz,
+        commit_time=commit_time,
+        subject=subject,
+    )
+
+
+class GitRepo:
+    """Read-only view of a repository's object database."""
+
+    def __init__(self, git_dir: Path) -> None:
+        self.git_dir = git_dir
+        objects = common_dir(git_dir) / "objects"
+        self._object_dirs = [objects, *self._alternates(objects)]
+        self._packs: list[PackFile] = []
+        self._pack_dirs_mtime: tuple[int, ...] | None = None
+        self._load_packs()
+
+    @staticmethod
+    def _alternates(objects: Path) -> list[Path]:
+        try:
+            lines = (objects / "info" / "alternates").read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return []
+        dirs = []
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                path = Path(line)
+                dirs.append(path if path.is_absolute() else (objects / path).resolve())
+        return dirs
+
+    def _pack_dirs_signature(self) -> tuple[int, ...]:
+        stamps = []
+        for objects in self._object_dirs:
+            try:
+                stamps.append((objects / "pack").stat().st_mtime_ns)
+            except OSError:
+                stamps.append(0)
+        return tuple(stamps)
+
+    def _load_packs(self) -> bool:
+        """(Re)open pack files if a pack directory changed; True if it did."""
+        signature = self._pack_dirs_signature()
+        if signature == self._pack_dirs_mtime:
+            return False
+        packs = []
+        for objects in self._object_dirs:
+            for idx_path in sorted((objects / "pack").glob("pack-*.idx")):
+                if not idx_path.with_suffix(".pack").exists():
+                    continue
+                try:
+                    packs.append(PackFile(idx_path))
+                except (OSError, ValueError, struct.error) as exc:
+                    raise GitReaderError(f"cannot open {idx_path.name}: {exc}") from exc
+        for pack in self._packs:
+            pack.close()
+        self._packs, self._pack_dirs_mtime = packs, signature
+        return True
+
+    def close(self) -> None:
+        for pack in self._packs:
+            pack.close()
+        self._packs = []
+
+    def _read_loose(self, sha: str) -> tuple[int, bytes] | None:
+        for objects in self._object_dirs:
+            try:
+                compressed = (objects / sha[:2] / sha[2:]).read_bytes()
+            except OSError:
+                continue
+            raw = zlib.decompress(compressed)
+            header, _, body = raw.partition(b"\0")
+            type_name = header.split(b" ", 1)[0].decode("ascii")
+            for obj_type, name in _TYPE_NAMES.items():
+                if name == type_name:
+                    return obj_type, body
+            raise GitReaderError(f"unknown loose object type {type_name!r}")
+        return None
+
+    def read_raw(self, sha: str) -> tuple[int, bytes]:
+        """Return ``(type, data)`` for an object, looking in packs then loose."""
+        if len(sha) != 2 * _SHA_LEN:
+            raise GitReaderError(f"unsupported object id {sha!r}")
+        binary = bytes.fromhex(sha)
+        for attempt in range(2):
+            for pack in self._packs:
+                offset = pack.find(binary)
+                if offset is not None:
+                    return pack.read_at(offset, self)
+            loose = self._read_loose(sha)
+            if loose is not None:
+                return loose
+            # A concurrent gc may have just moved the object into a new pack.
+            if attempt == 0 and not self._load_packs():
+                break
+        raise GitReaderError(f"object not found: {sha}")
+
+    def commit(self, sha: str) -> CommitInfo:
+        try:
+            obj_type, raw = self.read_raw(sha)
+            if obj_type != _OBJ_COMMIT:
+                raise GitReaderError(f"{sha} is not a commit")
+            return parse_commit(sha, raw)
+        except (zlib.error, struct.error, ValueError, IndexError) as exc:
+            raise GitReaderError(f"corrupt object {sha}: {exc}") from exc
+
+    def iter_commits(
+        self,
+        start: str,
+        since: int | None = None,
+        stop: frozenset[str] | set[str] = frozenset(),
+    ) -> Iterator[CommitInfo]:
+        """Walk history from ``start`` newest-first by committer date.
+
+        The walk ends once every remaining commit is older than ``since``
+        (like ``git log --since``) and never descends into shas in ``stop``.
+        """
+        if start in stop:
+            return
+        seen = {start}
+        first = self.commit(start)
+        queue = [(-first.commit_time, 0, first)]
+        counter = 1
+        while queue:
+            _, _, commit = heapq.heappop(queue)
+            if since is not None and commit.commit_time < since:
+                return
+            yield commit
+            for parent in commit.parents:
+                if parent in seen or parent in stop:
+                    continue
+                seen.add(parent)
+                info = self.commit(parent)
+                heapq.heappush(queue, (-info.commit_time, counter, info))
+                counter += 1
+
+    def log_oneline(self, limit: int, start: str | None = None) -> list[str]:
+        """Equivalent of ``git log --oneline -<limit>``."""
+        head = start or read_head(self.git_dir)
+        if head is None:
+            return []
+        lines = []
+        for commit in self.iter_commits(head):
+            lines.append(f"{commit.sha[:7]} {commit.subject}")
+            if len(lines) >= limit:
+                break
+        return lines
@@ -0,0 +1,243 @@
+"""Health probes — background checks whose latest results back ``/health``.
+
+Each probe (pm2, git, data-file freshness, upstream API reachability) runs in
+its own task on its own interval with a hard timeout, so a hung pm2 daemon
+delays only the pm2 result and never a request. ``snapshot()`` returns the
+last-published dict as is.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import inspect
+import json
+import logging
+import os
+import signal
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from api.services.executors import run_io, subprocess_slots
+from api.services.file_reader import (
+    OVERNIGHT_DIR,
+    TASK_QUEUE_PATH,
+    TOKEN_EVENTS_PATH,
+    TOKEN_USAGE_PATH,
+)
+from api.services.git_reader import GitReaderError, GitRepo, resolve_git_dir
+
+logger = logging.getLogger(__name__)
+
+PROJECT_REPO = Path("/Users/manny/dev/emanuelteklu")
+UPSTREAM_URL = os.environ.get("ANTHROPIC_BASE_URL") or "https://api.anthropic.com"
+
+PM2_INTERVAL = float(os.environ.get("HEALTH_PM2_INTERVAL", "15"))
+GIT_INTERVAL = float(os.environ.get("HEALTH_GIT_INTERVAL", "60"))
+FILES_INTERVAL = float(os.environ.get("HEALTH_FILES_INTERVAL", "30"))
+UPSTREAM_INTERVAL = float(os.environ.get("HEALTH_UPSTREAM_INTERVAL", "60"))
+PROBE_TIMEOUT = float(os.environ.get("HEALTH_PROBE_TIMEOUT", "10"))
+
+FRESHNESS_PATHS = {
+    "task_queue": TASK_QUEUE_PATH,
+    "token_usage": TOKEN_USAGE_PATH,
+    "token_events": TOKEN_EVENTS_PATH,
+    "overnight": OVERNIGHT_DIR,
+}
+
+
+class ProbeError(Exception):
+    """Raised by a probe to report a failed check."""
+
+
+@dataclass
+class Probe:
+    """A named check run every ``interval`` seconds."""
+    name: str
+    check: Callable[[], Any] | Callable[[], Awaitable[Any]]
+    interval: float
+    timeout: float = PROBE_TIMEOUT
+
+
+async def run_command(cmd: list[str], timeout: float = PROBE_TIMEOUT) -> str:
+    """Run a command without blocking the loop; kill it if it overruns."""
+    async with subprocess_slots.slot():
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+        except FileNotFoundError as e:
+            raise ProbeError(f"{cmd[0]} not found") from e
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            raise ProbeError(f"{cmd[0]} timed out after {timeout:g}s") from None
+        finally:
+            # Also reached when the caller cancels us; never leave a hung child
+            # (or its own children) behind.
+            if proc.returncode is None:
+                with contextlib.suppress(ProcessLookupError):
+                    os.killpg(proc.pid, signal.SIGKILL)
+    if proc.returncode != 0:
+        raise ProbeError(stderr.decode(errors="replace").strip() or f"{cmd[0]} exited {proc.returncode}")
+    return stdout.decode(errors="replace").strip()
+
+
+def parse_pm2(raw: str) -> dict[str, Any]:
+    """Summarise ``pm2 jlist`` output: per-process status plus counts."""
+    try:
+        apps = json.loads(raw)
+    except ValueError as e:
+        raise ProbeError(f"Unparseable pm2 output: {e}") from e
+    now_ms = time.time() * 1000
+    processes = []
+    for app in apps:
+        env = app.get("pm2_env") or {}
+        monit = app.get("monit") or {}
+        started = env.get("pm_uptime")
+        status = env.get("status", "unknown")
+        processes.append({
+            "name": app.get("name"),
+            "pid": app.get("pid"),
+            "status": status,
+            "cpu": monit.get("cpu"),
+            "memory_mb": round(monit["memory"] / 2**20, 1) if monit.get("memory") else None,
+            "uptime_s": int((now_ms - started) / 1000) if status == "online" and started else None,
+            "restarts": env.get("restart_time", 0),
+        })
+    online = sum(1 for p in processes if p["status"] == "online")
+    return {"online": online, "total": len(processes), "processes": processes}
+
+
+async def probe_pm2() -> dict[str, Any]:
+    return parse_pm2(await run_command(["pm2", "jlist"]))
+
+
+def _git_in_process(repo: Path, limit: int) -> str | None:
+    git_dir = resolve_git_dir(repo)
+    if git_dir is None:
+        return None
+    reader = None
+    try:
+        reader = GitRepo(git_dir)
+        return "\n".join(reader.log_oneline(limit))
+    except (GitReaderError, OSError):
+        return None
+    finally:
+        if reader is not None:
+            reader.close()
+
+
+async def probe_git(repo: Path = PROJECT_REPO, limit: int = 5) -> str:
+    """``git log --oneline -<limit>``, read in-process when possible."""
+    recent = await run_io(_git_in_process, repo, limit, timeout=None)
+    if recent is not None:
+        return recent
+    return await run_command(["git", "-C", str(repo), "log", "--oneline", f"-{limit}"])
+
+
+def probe_files() -> dict[str, Any]:
+    """Age in seconds of each data file ClawdBot writes (None if missing)."""
+    now = time.time()
+    ages: dict[str, Any] = {}
+    for name, path in FRESHNESS_PATHS.items():
+        try:
+            ages[name] = round(now - os.stat(path).st_mtime, 1)
+        except OSError:
+            ages[name] = None
+    return ages
+
+
+async def probe_upstream() -> dict[str, Any]:
+    """Whether the Anthropic API answers at all (any HTTP status counts)."""
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(timeout=PROBE_TIMEOUT) as client:
+            response = await client.head(UPSTREAM_URL)
+    except httpx.HTTPError as e:
+        raise ProbeError(f"{UPSTREAM_URL} unreachable: {e!r}") from e
+    return {
+        "url": UPSTREAM_URL,
+        "status_code": response.status_code,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+class ProbeScheduler:
+    """Runs probes in background tasks and publishes an immutable snapshot."""
+
+    def __init__(self) -> None:
+        self.probes: dict[str, Probe] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+        self._results: dict[str, dict[str, Any]] = {}
+        self._snapshot: dict[str, Any] = {"status": "starting", "probes": {}}
+
+    def register(self, probe: Probe) -> None:
+        self.probes[probe.name] = probe
+
+    async def _run_once(self, probe: Probe) -> dict[str, Any]:
+        started = time.perf_counter()
+        result: dict[str, Any] = {"ok": True, "value": None, "error": None}
+        try:
+            if inspect.iscoroutinefunction(probe.check):
+                call = probe.check()
+            else:
+                call = run_io(probe.check, timeout=None)
+            result["value"] = await asyncio.wait_for(call, probe.timeout)
+        except asyncio.TimeoutError:
+            result.update(ok=False, error=f"timed out after {probe.timeout:g}s")
+        except Exception as e:
+            result.update(ok=False, error=str(e))
+        result["checked_at"] = time.time()
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def _loop(self, probe: Probe) -> None:
+        while True:
+            result = await self._run_once(probe)
+            if not result["ok"]:
+                logger.warning("Health probe %s failed: %s", probe.name, result["error"])
+            self._publish(probe.name, result)
+            await asyncio.sleep(probe.interval)
+
+    def _publish(self, name: str, result: dict[str, Any]) -> None:
+        # Build a fresh dict so readers never see a half-updated snapshot.
+        self._results = {**self._results, name: result}
+        pending = len(self._results) < len(self.probes)
+        healthy = all(r["ok"] for r in self._results.values())
+        self._snapshot = {
+            "status": "starting" if pending and healthy else "ok" if healthy else "degraded",
+            "probes": self._results,
+        }
+
+    def snapshot(self) -> dict[str, Any]:
+        return self._snapshot
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._loop(probe), name=f"health-probe-{probe.name}")
+            for probe in self.probes.values()
+        ]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+health_probes = ProbeScheduler()
+health_probes.register(Probe("pm2", probe_pm2, PM2_INTERVAL))
+health_probes.register(Probe("git", probe_git, GIT_INTERVAL))
+health_probes.register(Probe("files", probe_files, FILES_INTERVAL))
+health_probes.register(Probe("upstream", probe_upstream, UPSTREAM_INTERVAL))
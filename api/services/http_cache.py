@@ -0,0 +1,289 @@
+"""HTTP response cache — validators, 304s and pre-compressed JSON bodies.
+
+Read-only GET routes hand ``respond`` a cheap version of their source
+(file stat, index generation, queue version) before doing any work. The
+ETag is a hash of the route key and that version, so:
+
+- a request whose ``If-None-Match`` (or ``If-Modified-Since``) still matches
+  gets a bodiless 304 without reading or serializing anything;
+- otherwise the serialized body is served from memory while the version is
+  unchanged, and is only produced again when it moves.
+
+Bodies are kept with their gzip (and, when the ``brotli`` package is
+installed, brotli) encodings, compressed on first demand. Each encoding
+gets its own ETag suffix, so the validators stay strong. The cache is LRU
+bounded by total bytes. ``stats()`` reports hits, 304s and bytes saved
+against sending every body uncompressed.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Any
+
+from fastapi import Request, Response
+
+from api.services.executors import run_io
+from api.services.file_reader import _fingerprint, _validate_path
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS = int(os.environ.get("HTTP_CACHE_MIN_COMPRESS", "1024"))
+GZIP_LEVEL = int(os.environ.get("HTTP_CACHE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("HTTP_CACHE_BROTLI_QUALITY", "5"))
+# Browsers keep the body but revalidate on every use
+CACHE_CONTROL = os.environ.get("HTTP_CACHE_CONTROL", "private, no-cache")
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+@dataclass
+class Payload:
+    """A response body plus headers to cache alongside it.
+
+    ``version`` is the source version the data was read at, when the
+    producer can report it; it replaces the one passed to ``respond``,
+    which may have moved on before the read.
+    """
+    data: Any
+    headers: dict[str, str] = field(default_factory=dict)
+    version: Any = None
+
+
+@dataclass
+class _Entry:
+    tag: str
+    body: bytes
+    headers: dict[str, str]
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(b) for b in self.encoded.values())
+
+
+def file_validator(path: Path) -> tuple[tuple[int, int, int], float] | None:
+    """``(version, mtime)`` of an allowed file, or None if it doesn't exist; blocking."""
+    try:
+        st = os.stat(_validate_path(path))
+    except FileNotFoundError:
+        return None
+    return _fingerprint(st), st.st_mtime
+
+
+def _tag(key: str, version: Any) -> str:
+    return hashlib.blake2b(repr((key, version)).encode(), digest_size=12).hexdigest()
+
+
+def _etag(tag: str, encoding: str | None) -> str:
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def _etag_matches(header: str, tag: str) -> bool:
+    """Whether ``If-None-Match`` names any encoding of ``tag`` (or ``*``)."""
+    for candidate in header.split(","):
+        candidate = candidate.strip().removeprefix("W/").strip('"')
+        if candidate == "*" or candidate.split("-", 1)[0] == tag:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, last_modified: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return int(last_modified) <= since.timestamp()
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Best encoding we offer for an ``Accept-Encoding`` header, else identity."""
+    if not accept_encoding:
+        return None
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output (and so the cache) deterministic
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _serialize(data: Any) -> bytes:
+    # Same separators and escaping as FastAPI's JSONResponse
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class HttpCache:
+    """Serialized, compressed GET bodies keyed by route, validated by ETag."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+
+    def _get(self, key: str, tag: str) -> _Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.tag != tag:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def _grow(self, key: str, entry: _Entry, encoding: str, encoded: bytes) -> None:
+        with self._lock:
+            if encoding in entry.encoded:
+                return
+            entry.encoded[encoding] = encoded
+            if self._entries.get(key) is entry:
+                self._bytes += len(encoded)
+                self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, dropped = self._entries.popitem(last=False)
+            self._bytes -= dropped.size
+            self.evictions += 1
+
+    async def respond(
+        self,
+        request: Request,
+        key: str,
+        version: Any,
+        produce: Callable[[], Awaitable[Any]],
+        last_modified: float | None = None,
+    ) -> Response:
+        """Answer a GET for ``key`` at ``version``; ``produce`` runs only on a miss.
+
+        ``produce`` returns JSON-able data, or a ``Payload`` to cache extra
+        headers or the exact version read with it. Exceptions it raises (e.g. a 404) pass through
+        uncached.
+        """
+        tag = _tag(key, version)
+        encoding = negotiate(request.headers.get("accept-encoding"))
+        headers = {"Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if last_modified is not None:
+            headers["Last-Modified"] = format_datetime(datetime.fromtimestamp(last_modified, timezone.utc), usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if (if_none_match and _etag_matches(if_none_match, tag)) or (
+            not if_none_match
+            and if_modified_since
+            and last_modified is not None
+            and _not_modified_since(if_modified_since, last_modified)
+        ):
+            entry = self._get(key, tag)
+            with self._lock:
+                self.not_modified += 1
+                # Counted at the uncompressed size when we still know it
+                self.bytes_saved += len(entry.body) if entry is not None else 0
+            return Response(status_code=304, headers={**headers, "ETag": _etag(tag, encoding)})
+
+        entry = self._get(key, tag)
+        if entry is None:
+            result = await produce()
+            if not isinstance(result, Payload):
+                result = Payload(result)
+            if result.version is not None:
+                tag = _tag(key, result.version)
+            entry = _Entry(tag, await run_io(_serialize, result.data), result.headers)
+            self._put(key, entry)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+
+        body = entry.body
+        if encoding is not None and len(body) >= MIN_COMPRESS:
+            encoded = entry.encoded.get(encoding)
+            if encoded is None:
+                encoded = await run_io(_compress, body, encoding)
+                self._grow(key, entry, encoding, encoded)
+            body = encoded
+            headers["Content-Encoding"] = encoding
+        else:
+            encoding = None
+        with self._lock:
+            self.bytes_sent += len(body)
+            self.bytes_saved += len(entry.body) - len(body)
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={**entry.headers, **headers, "ETag": _etag(entry.tag, encoding)},
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            requests = self.hits + self.misses + self.not_modified
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "encodings": list(ENCODINGS),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_rate": round((self.hits + self.not_modified) / requests, 4) if requests else 0.0,
+                "evictions": self.evictions,
+                "bytes_sent": self.bytes_sent,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+http_cache = HttpCache()
@@ -1,6 +1,9 @@
 import random
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from api.services.generation_pipeline import GenerationPipeline
+from api.services.taste_engine import Pick, TasteEngine
 
 class DesignOption(BaseModel):
     id: str
@@ -14,6 +17,8 @@ class TasteProfile(BaseModel):
     preferred_styles: List[str] = []
     style_weights: Dict[str, float] = {}
     chaos_level: float = 0.5
+    # Decayed preference vector in the taste engine's feature space
+    preference: List[float] = []
 
 class ImagenService:
     """
@@ -29,54 +34,66 @@ class ImagenService:
         "The Glass": "Backdrop blur, soft gradients, translucent layers, modern depth"
     }
 
-    async def generate_round(self, prompt: str, taste_profile: TasteProfile) -> List[DesignOption]:
+    def __init__(self, pipeline: Optional[GenerationPipeline] = None):
+        self.pipeline = pipeline or GenerationPipeline()
+
+    def plan_round(self, taste_profile: TasteProfile) -> List[Pick]:
+        """
+        Picks the 4 style directions for a round, steered by the 'Taste Profile' vector.
+        """
+        # Score the candidate pool against the taste vector and sample 4 distinct
+        # directions; chaos sets how far the draw strays from the preference.
+        preference = taste_profile.preference
+        if not preference and taste_profile.preferred_styles:
+            preference = taste_engine.from_history(taste_profile.preferred_styles)
+        picks = taste_engine.sample(preference, 4, taste_profile.chaos_level)
+        random.shuffle(picks)
+        return picks
+
+    def _variant_prompt(self, prompt: str, style_name: str) -> str:
+        return f"{prompt}, {self.ARCHETYPES[style_name]}"
+
+    async def generate_round(
+        self,
+        prompt: str,
+        taste_profile: TasteProfile,
+        picks: Optional[List[Pick]] = None,
+    ) -> List[DesignOption]:
         """
-        Generates 4 variants. The generation is steered by the 'Taste Profile' vector.
+        Generates 4 variants concurrently. Pass ``picks`` to render a round planned
+        earlier (e.g. one already prefetched).
         """
         print(f"🎨 Imagen: Refining design universe for '{prompt}'...")
-        
-        # Select 4 distinct directions. If we have taste preferences, lean into them.
-        selections = []
-        if taste_profile.preferred_styles:
-            # High probability of picking preferred styles, low probability of 'mutation' (chaos)
-            selections.append(random.choice(taste_profile.preferred_styles))
-        
-        remaining_slots = 4 - len(selections)
-        other_styles = [s for s in self.ARCHETYPES.keys() if s not in selections]
-        selections.extend(random.sample(other_styles, remaining_slots))
-        
-        random.shuffle(selections)
+        if picks is None:
+            picks = self.plan_round(taste_profile)
+
+        # All variants at once; identical prompts share one generation
+        image_urls = await self.pipeline.generate_many(
+            [(self._variant_prompt(prompt, pick.archetype), pick.archetype) for pick in picks]
+        )
 
         options = []
-        for i, style_name in enumerate(selections):
+        for i, (pick, image_url) in enumerate(zip(picks, image_urls)):
+            style_name = pick.archetype
             style_desc = self.ARCHETYPES[style_name]
-            # Use real search query terms to influence the mock image for now
-            # In production, this calls 'generate_image' internally
             options.append(DesignOption(
                 id=f"design_{style_name.lower().replace(' ', '_')}_{i}",
-                prompt=f"{prompt}, {style_desc}",
-                image_url=f"https://source.unsplash.com/featured/800x600?{style_name.lower().replace(' ', ',')},design",
+                prompt=self._variant_prompt(prompt, style_name),
+                image_url=image_url,
                 style_category=style_name,
-                confidence_score=round(random.uniform(0.8, 0.98), 2),
-                metadata={"style_description": style_desc}
+                confidence_score=round(0.8 + 0.09 * (pick.score + 1), 2),
+                metadata={"style_description": style_desc, "taste_score": round(pick.score, 4)}
             ))
-            
+
         return options
 
-    async def refine_taste(self, selection_id: str, selections_history: List[str]) -> TasteProfile:
+    def prefetch_round(self, prompt: str, picks: List[Pick]) -> None:
         """
-        Mathematical refinement of the taste vector.
+        Starts generating a planned round in the background.
         """
-        # Count frequency of style categories to build the vector
-        profile = TasteProfile()
-        for s in selections_history:
-            profile.style_weights[s] = profile.style_weights.get(s, 0) + 1.0
-        
-        # Set primary styles as those with highest weights
-        sorted_styles = sorted(profile.style_weights.items(), key=lambda x: x[1], reverse=True)
-        profile.preferred_styles = [s[0] for s in sorted_styles[:2]]
-        
-        # Decrease chaos as history builds
-        profile.chaos_level = max(0.1, 0.5 - (len(selections_history) * 0.05))
-        
-        return profile
+        self.pipeline.prefetch(
+            [(self._variant_prompt(prompt, pick.archetype), pick.archetype) for pick in picks]
+        )
+
+
+taste_engine = TasteEngine(ImagenService.ARCHETYPES)
@@ -0,0 +1,374 @@
+"""Request metrics — per-route latency, in-flight counts and I/O attribution.
+
+``api.middleware.timing.RequestMetricsMiddleware`` records every HTTP request
+against its route template (``GET /api/research/{slug}``): a log-bucketed
+latency histogram, in-flight and error counts, and for ``text/event-stream``
+responses the time to the first body byte.
+
+Code doing blocking work wraps it in ``track("file_io")`` or
+``track("subprocess")``. The time is added to whichever request is running
+in the current context (contextvars follow ``to_thread`` and tasks created
+from the request), so each route also reports how long it spent there.
+
+Alongside those, ``LoopLagMonitor`` measures event-loop lag, and
+``SamplingProfiler`` is an opt-in stack sampler. It writes folded stacks
+(``flamegraph.pl`` / speedscope format) while a chosen route is in flight.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL = float(os.environ.get("METRICS_LOOP_LAG_INTERVAL", "0.25"))
+# The profiler is off unless explicitly enabled
+PROFILER_ENABLED = os.environ.get("METRICS_PROFILER", "0") == "1"
+PROFILE_DIR = Path(os.environ.get("METRICS_PROFILE_DIR", tempfile.gettempdir()))
+MAX_PROFILE_SECONDS = 300
+
+# Histogram buckets grow by 10% from 10us, so quantiles are within ~5%
+BUCKET_MIN_MS = 0.01
+BUCKET_GROWTH = 1.1
+BUCKET_COUNT = 200  # covers up to ~30 minutes
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+QUANTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+UNMATCHED = "unmatched"
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets: O(1) record, bounded memory, approximate quantiles."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms: float) -> None:
+        index = 0 if ms <= BUCKET_MIN_MS else int(math.log(ms / BUCKET_MIN_MS) / _LOG_GROWTH) + 1
+        self.counts[min(index, BUCKET_COUNT - 1)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                # Geometric midpoint of the bucket, capped by the largest sample
+                upper = BUCKET_MIN_MS * BUCKET_GROWTH ** index
+                return min(upper / math.sqrt(BUCKET_GROWTH), self.max)
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            **{name: _round(self.quantile(q)) for name, q in QUANTILES},
+            "max": round(self.max, 3) if self.count else None,
+        }
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 3)
+
+
+@dataclass
+class RouteStats:
+    """Counters for one route template."""
+    requests: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    ttfb: LatencyHistogram | None = None
+    # Attributed time per kind ("file_io", "subprocess"), in ms
+    attributed: Counter = field(default_factory=Counter)
+    statuses: Counter = field(default_factory=Counter)
+
+    def snapshot(self) -> dict[str, Any]:
+        out = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "latency_ms": self.latency.snapshot(),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "attributed_ms": {
+                kind: {
+                    "total": round(ms, 3),
+                    "per_request": round(ms / self.requests, 3) if self.requests else None,
+                }
+                for kind, ms in sorted(self.attributed.items())
+            },
+        }
+        if self.ttfb is not None:
+            out["ttfb_ms"] = self.ttfb.snapshot()
+        return out
+
+
+class RequestTimes:
+    """One in-flight request: its route, once known, and attributed time by kind."""
+
+    __slots__ = ("route", "attributed", "token")
+
+    def __init__(self) -> None:
+        self.route: str | None = None
+        self.attributed: dict[str, float] = {}
+        self.token: Any = None
+
+
+_current: ContextVar[RequestTimes | None] = ContextVar("request_times", default=None)
+
+
+class track(ContextDecorator):
+    """Attribute the wrapped block's wall time to the current request.
+
+    Usable as ``with track("file_io"):`` or as a decorator; a no-op outside
+    a request (background tasks, startup).
+    """
+
+    __slots__ = ("kind", "_times", "_started")
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+
+    def _recreate_cm(self) -> track:
+        # Fresh instance per decorated call, so it is reentrant and thread-safe
+        return track(self.kind)
+
+    def __enter__(self) -> track:
+        self._times = _current.get()
+        if self._times is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        if self._times is not None:
+            elapsed = (time.perf_counter() - self._started) * 1000
+            attributed = self._times.attributed
+            attributed[self.kind] = attributed.get(self.kind, 0.0) + elapsed
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic sleep wakes up — time the loop was blocked."""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL) -> None:
+        self.interval = interval
+        self.histogram = LatencyHistogram()
+        self.last_ms = 0.0
+        self._task: asyncio.Task[None] | None = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.histogram.record(self.last_ms)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"interval_ms": self.interval * 1000, "last_ms": round(self.last_ms, 3), **self.histogram.snapshot()}
+
+
+# Leaf frames of threads that are parked, not working
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+class SamplingProfiler:
+    """Samples every thread's stack while a chosen route has requests in flight.
+
+    Threads parked in the selector or a queue are skipped. Samples are
+    folded as ``thread;module:function;... count`` lines, ready for
+    ``flamegraph.pl`` or speedscope. Time from other routes running
+    concurrently can show up too, so profile under a focused load.
+    """
+
+    def __init__(self, metrics: RequestMetrics) -> None:
+        self.metrics = metrics
+        self.route: str | None = None
+        self.interval = 0.005
+        self.samples = 0
+        self.path: Path | None = None
+        self._stacks: Counter = Counter()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._deadline = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, route: str, seconds: float, interval: float = 0.005) -> None:
+        if self.running:
+            raise RuntimeError(f"Already profiling {self.route}")
+        self.route, self.interval, self.samples, self.path = route, interval, 0, None
+        self._stacks = Counter()
+        self._stop.clear()
+        self._deadline = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Path | None:
+        """Stop early; returns the dump path once written."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.path
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                module = frame.f_globals.get("__name__", "?")
+                stack.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)).replace(";", "_").replace(" ", "_"))
+            self._stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set() and time.monotonic() < self._deadline:
+                stats = self.metrics.routes.get(self.route)
+                if stats is not None and stats.in_flight:
+                    self._sample()
+                self._stop.wait(self.interval)
+        finally:
+            self.path = self._dump()
+
+    def _dump(self) -> Path | None:
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", self.route or "route").strip("-")
+        path = PROFILE_DIR / f"profile-{slug}-{int(time.time())}.folded"
+        try:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            with path.open("w", encoding="utf-8") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            logger.warning("Could not write profile to %s: %s", path, e)
+            return None
+        return path
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "enabled": PROFILER_ENABLED,
+            "running": self.running,
+            "route": self.route,
+            "samples": self.samples,
+            "stacks": len(self._stacks),
+            "path": str(self.path) if self.path else None,
+        }
+
+
+class RequestMetrics:
+    """Registry of per-route stats plus the loop-lag monitor and profiler."""
+
+    def __init__(self) -> None:
+        self.routes: dict[str, RouteStats] = {}
+        self.in_flight = 0
+        self.started = time.time()
+        self.loop_lag = LoopLagMonitor()
+        self.profiler = SamplingProfiler(self)
+
+    def _stats(self, route: str) -> RouteStats:
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats()
+        return stats
+
+    def begin(self) -> RequestTimes:
+        """Start timing a request and make it the current attribution target."""
+        self.in_flight += 1
+        times = RequestTimes()
+        times.token = _current.set(times)
+        return times
+
+    def routed(self, route: str) -> None:
+        """Name the current request's route once routing has picked it."""
+        times = _current.get()
+        if times is not None and times.route is None:
+            times.route = route
+            self._stats(route).in_flight += 1
+
+    def end(self, times: RequestTimes, status: int, elapsed_ms: float, ttfb_ms: float | None = None) -> None:
+        """Record a finished request; call from the context that called ``begin``."""
+        _current.reset(times.token)
+        self.in_flight -= 1
+        if times.route is None:
+            # Never reached an endpoint (404, 405): pooled to bound cardinality
+            stats = self._stats(UNMATCHED)
+        else:
+            stats = self.routes[times.route]
+            stats.in_flight -= 1
+        stats.requests += 1
+        stats.statuses[status] += 1
+        if status >= 500:
+            stats.errors += 1
+        stats.latency.record(elapsed_ms)
+        if ttfb_ms is not None:
+            if stats.ttfb is None:
+                stats.ttfb = LatencyHistogram()
+            stats.ttfb.record(ttfb_ms)
+        for kind, ms in times.attributed.items():
+            stats.attributed[kind] += ms
+
+    def snapshot(self) -> dict[str, Any]:
+        routes = dict(self.routes)
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "in_flight": self.in_flight,
+            "loop_lag_ms": self.loop_lag.snapshot(),
+            "routes": {route: stats.snapshot() for route, stats in sorted(routes.items())},
+            "profiler": self.profiler.status(),
+        }
+
+
+request_metrics = RequestMetrics()
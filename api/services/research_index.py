@@ -0,0 +1,372 @@
+"""Research brief index — metadata cache and BM25 full-text search.
+
+Briefs in ``OVERNIGHT_DIR`` are indexed once and then kept current by
+polling: at most every ``POLL_INTERVAL`` seconds the directory is scanned and
+only files whose (mtime, size) changed are re-read. Files are read and
+tokenized outside the index lock and installed in small batches. Callers
+that arrive while another thread is re-scanning answer from the current index
+instead of queueing; only the very first build is waited for, so nobody reads
+a half-built index as an empty one. Each brief contributes its title, heading
+outline (with byte offsets) and token counts to an inverted index that ranks
+search results with BM25.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from api.services.file_reader import OVERNIGHT_DIR, _validate_path
+from api.services.request_metrics import track
+
+POLL_INTERVAL = float(os.environ.get("RESEARCH_POLL_INTERVAL", "2.0"))
+SNIPPET_WIDTH = 200
+# Parsed briefs installed per lock acquisition during a scan
+INSTALL_BATCH = 64
+
+# BM25 parameters (the usual Robertson/Sparck Jones defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_HEADING_RE = re.compile(rb"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+_WHITESPACE_RE = re.compile(r"\s+")
+_ANCHOR_STRIP_RE = re.compile(r"[^\w\- ]")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def slug_to_name(slug: str) -> str:
+    return slug.replace("-", " ").title()
+
+
+@dataclass
+class Brief:
+    """Cached metadata for one markdown brief."""
+    slug: str
+    path: Path
+    title: str
+    mtime_ns: int
+    size: int
+    length: int
+    outline: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def modified(self) -> float:
+        return self.mtime_ns / 1e9
+
+    def find_section(self, section: str) -> dict[str, Any] | None:
+        """Look a heading up by anchor, or by position in the outline."""
+        # str.isdigit() also accepts "²" and other digits int() rejects
+        if section.isascii() and section.isdigit():
+            index = int(section)
+            return self.outline[index] if index < len(self.outline) else None
+        return next((h for h in self.outline if h["anchor"] == section), None)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "slug": self.slug,
+            "name": slug_to_name(self.slug),
+            "title": self.title,
+            "modified": self.modified,
+            "size": self.size,
+        }
+
+
+def heading_anchor(text: str) -> str:
+    """GitHub-style anchor: lower-case, punctuation dropped, spaces to hyphens."""
+    return _ANCHOR_STRIP_RE.sub("", text.strip().lower()).replace(" ", "-")
+
+
+def parse_outline(data: bytes) -> list[dict[str, Any]]:
+    """ATX headings outside fenced code blocks, with their byte offsets.
+
+    Each entry spans ``[offset, end)``: up to the next heading of the same or
+    a higher level, or the end of the file.
+    """
+    outline: list[dict[str, Any]] = []
+    offset = 0
+    in_fence = False
+    for line in data.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith((b"```", b"~~~")):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = _HEADING_RE.match(line.rstrip(b"\r\n"))
+            if match:
+                outline.append({
+                    "level": len(match.group(1)),
+                    "text": match.group(2).decode("utf-8", errors="replace"),
+                    "offset": offset,
+                })
+        offset += len(line)
+
+    anchors: Counter[str] = Counter()
+    for i, heading in enumerate(outline):
+        anchor = heading_anchor(heading["text"])
+        heading["anchor"] = f"{anchor}-{anchors[anchor]}" if anchors[anchor] else anchor
+        anchors[anchor] += 1
+        heading["end"] = next(
+            (h["offset"] for h in outline[i + 1:] if h["level"] <= heading["level"]),
+            len(data),
+        )
+    return outline
+
+
+def make_snippet(text: str, terms: set[str], width: int = SNIPPET_WIDTH) -> str:
+    """Pick the ``width``-character window covering the most distinct query terms."""
+    if not terms:
+        return _WHITESPACE_RE.sub(" ", text[:width]).strip()
+    pattern = re.compile(
+        r"(?<![^\W_])(" + "|".join(map(re.escape, sorted(terms))) + r")(?![^\W_])",
+        re.IGNORECASE,
+    )
+    matches = [(m.start(), m.group(1).lower()) for _, m in zip(range(500), pattern.finditer(text))]
+    if not matches:
+        return _WHITESPACE_RE.sub(" ", text[:width]).strip()
+
+    best_start, best_count = matches[0][0], 0
+    window: Counter[str] = Counter()
+    j = 0
+    for start, term in matches:
+        window[term] += 1
+        while matches[j][0] < start - width // 2:
+            window[matches[j][1]] -= 1
+            if not window[matches[j][1]]:
+                del window[matches[j][1]]
+            j += 1
+        if len(window) > best_count:
+            best_start, best_count = matches[j][0], len(window)
+
+    start = max(0, best_start - width // 4)
+    end = min(len(text), start + width)
+    snippet = _WHITESPACE_RE.sub(" ", text[start:end]).strip()
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    return f"{prefix}{snippet}{suffix}"
+
+
+class ResearchIndex:
+    """Incrementally maintained metadata + inverted index over a brief directory."""
+
+    def __init__(self, directory: Path, poll_interval: float = POLL_INTERVAL) -> None:
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # Held for a whole scan; only one thread scans at a time
+        self._scanning = threading.Lock()
+        self._last_poll = 0.0
+        self._briefs: dict[str, Brief] = {}
+        self._sorted: list[dict[str, Any]] | None = None
+        # term -> slug -> term frequency
+        self._postings: dict[str, dict[str, int]] = {}
+        self._doc_terms: dict[str, tuple[str, ...]] = {}
+        self._total_length = 0
+        # Bumped whenever the set of briefs or their metadata changes
+        self._generation = 0
+
+    # --- maintenance ---
+
+    def _remove(self, slug: str) -> None:
+        brief = self._briefs.pop(slug, None)
+        if brief is None:
+            return
+        self._total_length -= brief.length
+        for term in self._doc_terms.pop(slug, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(slug, None)
+                if not postings:
+                    del self._postings[term]
+
+    @staticmethod
+    def _parse(slug: str, path: Path, st: os.stat_result) -> tuple[Brief, Counter[str]]:
+        """Read and tokenize one brief; blocking, touches no index state."""
+        with track("file_io"):
+            data = _validate_path(path).read_bytes()
+        text = data.decode("utf-8", errors="replace")
+        outline = parse_outline(data)
+        title = next((h["text"] for h in outline if h["level"] == 1), slug_to_name(slug))
+        counts = Counter(tokenize(text))
+        brief = Brief(
+            slug=slug,
+            path=path,
+            title=title,
+            mtime_ns=st.st_mtime_ns,
+            size=st.st_size,
+            length=sum(counts.values()),
+            outline=outline,
+        )
+        return brief, counts
+
+    def _install(self, brief: Brief, counts: Counter[str]) -> None:
+        """Replace ``brief.slug``'s entry; call with the lock held."""
+        self._remove(brief.slug)
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[brief.slug] = tf
+        self._doc_terms[brief.slug] = tuple(counts)
+        self._total_length += brief.length
+        self._briefs[brief.slug] = brief
+
+    def _install_batch(self, batch: list[tuple[Brief, Counter[str]]]) -> None:
+        with self._lock:
+            for brief, counts in batch:
+                self._install(brief, counts)
+
+    def refresh(self, force: bool = False) -> None:
+        """Re-scan the directory (throttled) and re-index changed briefs.
+
+        Unless ``force`` is set, a call that finds another thread already
+        scanning returns at once and readers see the index as it stands.
+        Before the first build has finished there is nothing to see yet, so
+        such a call waits for it instead.
+        """
+        built = self._sorted is not None
+        if not force and built and time.monotonic() - self._last_poll < self.poll_interval:
+            return
+        if not self._scanning.acquire(blocking=force or not built):
+            return
+        try:
+            if not force and not built and self._sorted is not None:
+                return  # the first build finished while we waited
+            self._last_poll = time.monotonic()
+            safe_dir = _validate_path(self.directory)
+            seen: dict[str, tuple[Path, os.stat_result]] = {}
+            try:
+                with os.scandir(safe_dir) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith(".md") or not entry.is_file():
+                            continue
+                        seen[entry.name[:-3]] = (Path(entry.path), entry.stat())
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+
+            with self._lock:
+                gone = [s for s in self._briefs if s not in seen]
+                for slug in gone:
+                    self._remove(slug)
+                stale = [
+                    (slug, path, st)
+                    for slug, (path, st) in seen.items()
+                    if (brief := self._briefs.get(slug)) is None
+                    or (brief.mtime_ns, brief.size) != (st.st_mtime_ns, st.st_size)
+                ]
+            changed = bool(gone)
+
+            batch: list[tuple[Brief, Counter[str]]] = []
+            for slug, path, st in stale:
+                try:
+                    batch.append(self._parse(slug, path, st))
+                except OSError:
+                    # Unreadable now: drop the stale entry, retry on the next scan
+                    with self._lock:
+                        changed |= self._briefs.get(slug) is not None
+                        self._remove(slug)
+                    continue
+                if len(batch) >= INSTALL_BATCH:
+                    self._install_batch(batch)
+                    changed, batch = True, []
+            if batch:
+                self._install_batch(batch)
+                changed = True
+            with self._lock:
+                if changed or self._sorted is None:
+                    self._resort()
+        finally:
+            self._scanning.release()
+
+    def _resort(self) -> None:
+        self._generation += 1
+        self._sorted = [
+            b.summary()
+            for b in sorted(self._briefs.values(), key=lambda b: b.mtime_ns, reverse=True)
+        ]
+
+    # --- reads ---
+
+    def version(self) -> int:
+        """Changes whenever ``list_briefs`` would return something different."""
+        self.refresh()
+        return self._generation
+
+    def list_briefs(self) -> list[dict[str, Any]]:
+        """Brief summaries, most recently modified first."""
+        self.refresh()
+        return list(self._sorted or [])
+
+    def get(self, slug: str) -> Brief | None:
+        self.refresh()
+        return self._briefs.get(slug)
+
+    def current(self, slug: str) -> Brief | None:
+        """Return ``slug``'s entry, re-indexing it now if the file changed since the last poll.
+
+        Used when byte offsets must match the file on disk, regardless of polling.
+        """
+        path = self.directory / f"{slug}.md"
+        try:
+            st = _validate_path(path).stat()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            brief = self._briefs.get(slug)
+        if brief is not None and (brief.mtime_ns, brief.size) == (st.st_mtime_ns, st.st_size):
+            return brief
+        try:
+            brief, counts = self._parse(slug, path, st)
+        except OSError:
+            return None
+        with self._lock:
+            self._install(brief, counts)
+            self._resort()
+        return brief
+
+    def search(self, query: str, limit: int = 10) -> list[dict[str, Any]]:
+        """BM25-ranked briefs for ``query`` with a snippet around the best match."""
+        self.refresh()
+        terms = set(tokenize(query))
+        with self._lock:
+            total = len(self._briefs)
+            if not terms or not total:
+                return []
+            avg_length = self._total_length / total
+            scores: dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                for slug, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._briefs[slug].length / avg_length)
+                    scores[slug] = scores.get(slug, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            hits = [(self._briefs[slug], score) for slug, score in top]
+
+        results = []
+        for brief, score in hits:
+            try:
+                with track("file_io"):
+                    text = _validate_path(brief.path).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            results.append({
+                **brief.summary(),
+                "score": round(score, 4),
+                "snippet": make_snippet(text, terms),
+            })
+        return results
+
+
+research_index = ResearchIndex(OVERNIGHT_DIR)
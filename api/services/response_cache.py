@@ -0,0 +1,222 @@
+"""Agent response cache — replay recorded event streams for repeated prompts.
+
+Entries are keyed on a canonical hash of everything that shapes the reply
+(model, system prompt, tool definitions, extra context, messages). Text is
+whitespace-normalised and plain-string message content is treated the same as
+a single text block, so trivially different requests share an entry.
+
+Each entry is the full event sequence of a completed run plus the offset at
+which every event was produced, so a hit can be replayed instantly or at the
+original pacing. Runs that called tools are not stored: tool results read
+live data, so a replay could serve stale answers. Entries expire after
+``TTL`` seconds and the cache is LRU bounded by both entry count and
+approximate byte size.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+TTL = float(os.environ.get("AGENT_CACHE_TTL", "300"))
+MAX_ENTRIES = int(os.environ.get("AGENT_CACHE_MAX_ENTRIES", "256"))
+MAX_BYTES = int(os.environ.get("AGENT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+Event = dict[str, Any]
+
+
+def _normalize(value: Any) -> Any:
+    """Canonical form for hashing: collapsed whitespace, text-only content as blocks."""
+    if isinstance(value, str):
+        return _WHITESPACE_RE.sub(" ", value).strip()
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {
+            key: _normalize(item)
+            for key, item in value.items()
+            if key != "cache_control"
+        }
+    return value
+
+
+def _normalize_messages(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    out = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        out.append({**message, "content": content})
+    return _normalize(out)
+
+
+def cache_key(
+    model: str,
+    system: str,
+    tools: list[dict[str, Any]],
+    extra_context: str,
+    messages: list[dict[str, Any]],
+) -> str:
+    """Stable hash of a request; equal for requests that should share a reply."""
+    canonical = json.dumps(
+        {
+            "model": model,
+            "system": _normalize(system),
+            "tools": tools,
+            "extra_context": _normalize(extra_context),
+            "messages": _normalize_messages(messages),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedResponse:
+    """One recorded run: events with their offsets (seconds from start)."""
+    events: list[tuple[float, Event]]
+    created: float
+    size: int
+    input_tokens: int
+    output_tokens: int
+
+
+class ResponseCache:
+    """TTL + LRU cache of agent event streams, bounded by count and bytes."""
+
+    def __init__(
+        self,
+        ttl: float = TTL,
+        max_entries: int = MAX_ENTRIES,
+        max_bytes: int = MAX_BYTES,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.saved_input_tokens = 0
+        self.saved_output_tokens = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def get(self, key: str) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.created > self.ttl:
+            self._drop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.saved_input_tokens += entry.input_tokens
+        self.saved_output_tokens += entry.output_tokens
+        return entry
+
+    def put(self, key: str, events: list[tuple[float, Event]]) -> None:
+        size = sum(len(json.dumps(event, default=str)) for _, event in events)
+        if size > self.max_bytes:
+            return
+        usage = next((e for _, e in reversed(events) if e.get("type") == "usage"), {})
+        self._drop(key)
+        self._entries[key] = CachedResponse(
+            events=events,
+            created=time.monotonic(),
+            size=size,
+            input_tokens=(
+                usage.get("input_tokens", 0)
+                + usage.get("cache_read_input_tokens", 0)
+                + usage.get("cache_creation_input_tokens", 0)
+            ),
+            output_tokens=usage.get("output_tokens", 0),
+        )
+        self._bytes += size
+        self.stores += 1
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    async def cached(
+        self,
+        key: str,
+        produce: AsyncIterator[Event],
+        timed: bool = False,
+    ) -> AsyncIterator[Event]:
+        """Yield from the cache on a hit, else from ``produce`` while recording it.
+
+        Only runs that end in ``done`` and made no tool calls are stored, so
+        errors, client disconnects and live tool results are never replayed.
+        """
+        entry = self.get(key) if self.enabled else None
+        if entry is not None:
+            async for event in replay(entry, timed):
+                yield event
+            return
+
+        started = time.monotonic()
+        recorded: list[tuple[float, Event]] = []
+        used_tools = False
+        async for event in produce:
+            recorded.append((time.monotonic() - started, event))
+            used_tools = used_tools or event.get("type") == "tool_use"
+            yield event
+        if self.enabled and not used_tools and recorded and recorded[-1][1].get("type") == "done":
+            self.put(key, recorded)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "saved_input_tokens": self.saved_input_tokens,
+            "saved_output_tokens": self.saved_output_tokens,
+        }
+
+
+async def replay(entry: CachedResponse, timed: bool = False) -> AsyncIterator[Event]:
+    """Re-emit a recorded run, event by event, optionally at the original pacing."""
+    started = time.monotonic()
+    last = len(entry.events) - 1
+    for i, (offset, event) in enumerate(entry.events):
+        if timed:
+            delay = offset - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield {**event, "cached": True} if i == last else event
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,124 @@
+"""SSE framing for agent streams — fast encoding and delta coalescing.
+
+``coalesce`` sits between an event source and the response. Consecutive text
+deltas are merged into one ``text`` frame, flushed once ``FLUSH_INTERVAL``
+has passed since the first buffered delta or ``FLUSH_BYTES`` have
+accumulated. Any other event flushes the buffer and goes out as is.
+
+The source runs in its own task feeding a bounded queue. A slow client
+therefore throttles the upstream read instead of growing memory. Whatever
+piled up in the queue is merged into a single frame on the next pull. When
+the consumer goes away (client disconnect), the source task is cancelled at
+once, which closes the upstream connection.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from collections.abc import AsyncIterator
+from json.encoder import encode_basestring_ascii
+from typing import Any
+
+FLUSH_INTERVAL = float(os.environ.get("AGENT_SSE_FLUSH_MS", "25")) / 1000
+FLUSH_BYTES = int(os.environ.get("AGENT_SSE_FLUSH_BYTES", "4096"))
+PING_INTERVAL = float(os.environ.get("AGENT_SSE_PING_INTERVAL", "15"))
+QUEUE_SIZE = 256
+
+_TEXT_PREFIX = b'data: {"type": "text", "content": '
+_FRAME_END = b"\n\n"
+_END = object()
+_FLUSH = object()
+
+
+def encode_event(event: dict[str, Any]) -> bytes:
+    """Encode one event as an SSE ``data:`` frame.
+
+    Text deltas, by far the most common event, skip the generic encoder and
+    only escape their string; the bytes match ``json.dumps`` exactly.
+    """
+    if event.get("type") == "text" and len(event) == 2 and isinstance(event.get("content"), str):
+        return b"".join((_TEXT_PREFIX, encode_basestring_ascii(event["content"]).encode(), b"}", _FRAME_END))
+    return b"".join((b"data: ", json.dumps(event).encode(), _FRAME_END))
+
+
+def _is_text(event: Any) -> bool:
+    return (
+        isinstance(event, dict)
+        and event.get("type") == "text"
+        and len(event) == 2
+        and isinstance(event.get("content"), str)
+    )
+
+
+async def coalesce(
+    events: AsyncIterator[dict[str, Any]],
+    flush_interval: float = FLUSH_INTERVAL,
+    flush_bytes: int = FLUSH_BYTES,
+) -> AsyncIterator[bytes]:
+    """Yield SSE frames for ``events``, merging runs of text deltas."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    async def pump() -> None:
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        await queue.put(_END)
+
+    source = asyncio.create_task(pump())
+    buffered: list[str] = []
+    buffered_len = 0
+    timer: asyncio.TimerHandle | None = None
+
+    def wake() -> None:
+        # Nudge a consumer blocked on an empty queue; otherwise it is busy anyway.
+        if queue.empty():
+            queue.put_nowait(_FLUSH)
+
+    def flush() -> bytes:
+        nonlocal buffered_len, timer
+        frame = encode_event({"type": "text", "content": "".join(buffered)})
+        buffered.clear()
+        buffered_len = 0
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        return frame
+
+    try:
+        while True:
+            item = await queue.get()
+            if _is_text(item):
+                buffered.append(item["content"])
+                buffered_len += len(item["content"])
+                if timer is None:
+                    timer = loop.call_later(flush_interval, wake)
+                elif timer.when() <= loop.time():
+                    yield flush()
+                    continue
+                if buffered_len >= flush_bytes:
+                    yield flush()
+                continue
+            if item is _FLUSH:
+                if buffered:
+                    yield flush()
+                continue
+            if buffered:
+                yield flush()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield encode_event(item)
+    finally:
+        if timer is not None:
+            timer.cancel()
+        source.cancel()
@@ -0,0 +1,300 @@
+"""Overnight task queue store — append-only log over a compacted JSON snapshot.
+
+``task-queue.json`` stays the canonical, human-readable snapshot (a JSON
+list). New tasks are appended as single lines to ``task-queue.jsonl`` next to
+it, so an enqueue is one ``O_APPEND`` write instead of a full rewrite. The
+log is folded into the snapshot (written to a temp file and swapped in with
+``os.replace``) ``COMPACT_DELAY`` seconds after the first pending append, so
+readers of the plain JSON file — the overnight runner, the freshness probe —
+see new tasks almost at once, and straight away once the log reaches
+``COMPACT_EVERY`` entries.
+
+Cross-process safety comes from ``flock`` on a sidecar ``.lock`` file:
+appenders and readers hold it shared, compaction holds it exclusive. Every
+task carries an ``id`` so a compaction interrupted between replacing the
+snapshot and resetting the log cannot duplicate tasks.
+
+Outside writers (ClawdBot updating a task's status) must follow the same
+protocol: take ``LOCK_EX`` on ``task-queue.json.lock`` around their
+read-modify-write of ``task-queue.json``, write it via a temp file and
+rename, keep each task's ``id``, and leave ``task-queue.jsonl`` alone.
+Tasks still in the log are not in the snapshot yet, so a writer that needs
+every task should compact first (it already holds the lock). Compaction
+re-checks the snapshot's fingerprint just before swapping and starts over if
+it moved, which narrows — but cannot close — the window for a writer that
+skips the lock.
+"""
+
+from __future__ import annotations
+
+import bisect
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from api.services.file_reader import (
+    TASK_QUEUE_PATH,
+    _validate_path,
+    file_fingerprint,
+    read_json,
+    write_json,
+)
+from api.services.request_metrics import track
+
+logger = logging.getLogger(__name__)
+
+COMPACT_EVERY = int(os.environ.get("TASK_QUEUE_COMPACT_EVERY", "256"))
+COMPACT_DELAY = float(os.environ.get("TASK_QUEUE_COMPACT_DELAY", "0.5"))
+INDEXED_FIELDS = ("status", "priority")
+
+
+class TaskQueueError(Exception):
+    """Raised when the on-disk queue can't be interpreted."""
+
+
+def new_task_id() -> str:
+    return uuid.uuid4().hex
+
+
+@dataclass
+class TaskPage:
+    """One page of a filtered queue read."""
+    tasks: list[dict[str, Any]]
+    next_cursor: int | None
+    version: tuple[int, ...]
+
+
+class TaskQueueStore:
+    """Append-only task queue backed by a JSON snapshot plus a JSON-lines log."""
+
+    def __init__(
+        self,
+        snapshot_path: Path,
+        compact_every: int = COMPACT_EVERY,
+        compact_delay: float | None = COMPACT_DELAY,
+    ) -> None:
+        self.snapshot_path = _validate_path(snapshot_path)
+        self.log_path = self.snapshot_path.with_suffix(".jsonl")
+        self.lock_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.lock")
+        self.compact_every = compact_every
+        # None leaves the log alone until it reaches compact_every
+        self.compact_delay = compact_delay
+        # Guards the in-memory tail state; flock handles other processes.
+        self._mutex = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self._log_id: tuple[int, int] | None = None
+        self._log_offset = 0
+        self._log_tasks: list[dict[str, Any]] = []
+        self._snapshot_ids: tuple[list[dict[str, Any]], frozenset[str]] | None = None
+        # Combined view (snapshot + log) with positional postings per indexed field
+        self._view_sources: tuple[object, object] | None = None
+        self._view: list[dict[str, Any]] = []
+        self._view_log_count = 0
+        self._index: dict[str, dict[str, list[int]]] = {f: {} for f in INDEXED_FIELDS}
+
+    @contextmanager
+    def _flock(self, exclusive: bool) -> Iterator[None]:
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+
+    def _snapshot(self) -> list[dict[str, Any]]:
+        data = read_json(self.snapshot_path)
+        if data is None:
+            return []
+        if not isinstance(data, list):
+            raise TaskQueueError("Task queue is malformed")
+        return data
+
+    def _sync_log(self, snapshot: list[dict[str, Any]]) -> None:
+        """Tail log lines appended since the last sync (caller holds ``_mutex``).
+
+        ``_log_tasks`` ends up holding only tasks not already in ``snapshot``.
+        """
+        if self._snapshot_ids is None or self._snapshot_ids[0] is not snapshot:
+            # read_json hands back the same object until the file changes
+            ids = frozenset(t["id"] for t in snapshot if isinstance(t, dict) and "id" in t)
+            self._snapshot_ids = (snapshot, ids)
+            # Compaction rewrites the snapshot before swapping the log, and the
+            # new log may reuse the old one's inode: re-read it from the start.
+            self._log_id, self._log_offset, self._log_tasks = None, 0, []
+        ids = self._snapshot_ids[1]
+
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            self._log_id, self._log_offset, self._log_tasks = None, 0, []
+            return
+        log_id = (st.st_dev, st.st_ino)
+        if log_id != self._log_id or st.st_size < self._log_offset:
+            # Compaction swapped in a fresh log; start over from its beginning.
+            self._log_id, self._log_offset, self._log_tasks = log_id, 0, []
+        if st.st_size == self._log_offset:
+            return
+        with track("file_io"), self.log_path.open("rb") as f:
+            f.seek(self._log_offset)
+            data = f.read(st.st_size - self._log_offset)
+        # Only consume whole lines; a concurrent append may still be in flight.
+        end = data.rfind(b"\n") + 1
+        tasks = self._log_tasks
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            task = json.loads(line)
+            if not ids or task.get("id") not in ids:
+                tasks.append(task)
+        self._log_offset += end
+
+    def _index_task(self, position: int, task: Any) -> None:
+        if not isinstance(task, dict):
+            return
+        for field_name in INDEXED_FIELDS:
+            value = task.get(field_name)
+            if isinstance(value, str):
+                self._index[field_name].setdefault(value, []).append(position)
+
+    def _sync_view(self, snapshot: list[dict[str, Any]]) -> None:
+        """Extend the view and index with new log tasks, or rebuild on a reset."""
+        sources = (snapshot, self._log_tasks)
+        if (
+            self._view_sources is None
+            or self._view_sources[0] is not snapshot
+            or self._view_sources[1] is not self._log_tasks
+        ):
+            self._view_sources = sources
+            self._view = []
+            self._view_log_count = 0
+            self._index = {f: {} for f in INDEXED_FIELDS}
+            for task in snapshot:
+                self._index_task(len(self._view), task)
+                self._view.append(task)
+        for task in self._log_tasks[self._view_log_count:]:
+            self._index_task(len(self._view), task)
+            self._view.append(task)
+        self._view_log_count = len(self._log_tasks)
+
+    def _load(self) -> list[dict[str, Any]]:
+        """Bring snapshot, log tail and view up to date (caller holds both locks)."""
+        snapshot = self._snapshot()
+        self._sync_log(snapshot)
+        self._sync_view(snapshot)
+        return self._view
+
+    def version(self) -> tuple[int, ...]:
+        """Cheap fingerprint of the on-disk queue; changes whenever its content may."""
+        return (*file_fingerprint(self.snapshot_path), *file_fingerprint(self.log_path))
+
+    def list_tasks(self) -> list[dict[str, Any]]:
+        """Return every task, snapshot first, then pending log entries."""
+        with self._flock(exclusive=False), self._mutex:
+            return list(self._load())
+
+    def query(
+        self,
+        status: str | None = None,
+        priority: str | None = None,
+        cursor: int = 0,
+        limit: int | None = None,
+    ) -> TaskPage:
+        """Return tasks at positions >= ``cursor`` matching the given filters."""
+        with self._flock(exclusive=False), self._mutex:
+            version = self.version()
+            view = self._load()
+            filters = [
+                (name, value)
+                for name, value in (("status", status), ("priority", priority))
+                if value is not None
+            ]
+            if filters:
+                # Walk the shortest posting list; check the other filter per task.
+                postings = min(
+                    (self._index[name].get(value, []) for name, value in filters), key=len
+                )
+                candidates: Iterator[int] = iter(postings[bisect.bisect_left(postings, cursor):])
+            else:
+                candidates = iter(range(cursor, len(view)))
+
+            tasks: list[dict[str, Any]] = []
+            for position in candidates:
+                task = view[position]
+                if any(task.get(name) != value for name, value in filters):
+                    continue
+                if limit is not None and len(tasks) == limit:
+                    return TaskPage(tasks, position, version)
+                tasks.append(task)
+            return TaskPage(tasks, None, version)
+
+    def append(self, task: dict[str, Any]) -> tuple[dict[str, Any], int]:
+        """Append a task, returning the stored record (with ``id``) and the queue length."""
+        record = {"id": new_task_id(), **task}
+        line = json.dumps(record, default=str).encode("utf-8") + b"\n"
+        with self._flock(exclusive=False), self._mutex:
+            snapshot = self._snapshot()
+            with track("file_io"):
+                fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+            self._sync_log(snapshot)
+            pending = len(self._log_tasks)
+            length = len(snapshot) + pending
+            # Geometric, so rewrite cost stays amortised O(1) per append in a burst
+            compact_now = pending >= max(self.compact_every, length - pending)
+            if not compact_now and self._timer is None and self.compact_delay is not None:
+                self._timer = threading.Timer(self.compact_delay, self._deferred_compact)
+                self._timer.daemon = True
+                self._timer.start()
+        if compact_now:
+            self.compact()
+        return record, length
+
+    def _deferred_compact(self) -> None:
+        with self._mutex:
+            self._timer = None
+        try:
+            self.compact()
+        except Exception as e:
+            # The next append schedules another attempt
+            logger.warning("Task queue compaction failed: %s", e)
+
+    def flush(self) -> None:
+        """Cancel any pending deferred compaction and compact now."""
+        with self._mutex:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        self.compact()
+
+    def compact(self) -> None:
+        """Fold the log into the snapshot and start a fresh, empty log."""
+        with self._flock(exclusive=True), self._mutex:
+            while True:
+                fingerprint = file_fingerprint(self.snapshot_path)
+                snapshot = self._snapshot()
+                self._sync_log(snapshot)
+                if not self._log_tasks:
+                    return
+                # False: a writer that skipped the lock replaced it meanwhile; merge again
+                if write_json(self.snapshot_path, [*snapshot, *self._log_tasks], if_unchanged=fingerprint):
+                    break
+            # Swap in an empty log (new inode) so tailing readers notice the reset.
+            empty = self.log_path.with_name(f".{self.log_path.name}.new")
+            empty.write_bytes(b"")
+            os.replace(empty, self.log_path)
+            self._log_id, self._log_offset, self._log_tasks = None, 0, []
+
+
+task_queue = TaskQueueStore(TASK_QUEUE_PATH)
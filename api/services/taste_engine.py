@@ -0,0 +1,140 @@
+"""Taste engine — vectorised archetype scoring and sampling for the Taste Tuner.
+
+Archetypes are embedded by hashing their descriptor phrases into a fixed
+``DIM``-dimensional signed feature space. This is deterministic across
+processes, and similar descriptions land near each other. Candidate designs
+are jittered copies of their archetype's vector.
+
+A session's preference vector is an exponentially decayed sum of the
+vectors it picked. A round scores every candidate against it in one matrix
+product. It then samples without replacement using the Gumbel-top-k trick,
+at a temperature set by the session's chaos level, keeping at most one
+candidate per archetype.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+DIM = 64
+# Weight kept by the existing preference on each new selection
+DECAY = float(os.environ.get("TASTE_DECAY", "0.8"))
+CANDIDATES_PER_ARCHETYPE = int(os.environ.get("TASTE_CANDIDATES_PER_ARCHETYPE", "20"))
+# How far candidates stray from their archetype
+CANDIDATE_JITTER = 0.35
+# Temperature range mapped from chaos level 0..1
+MIN_TEMPERATURE = 0.05
+MAX_TEMPERATURE = 1.0
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _features(description: str) -> Iterable[str]:
+    """Descriptor phrases plus their individual words."""
+    for phrase in description.lower().split(","):
+        words = _WORD_RE.findall(phrase)
+        if words:
+            yield " ".join(words)
+            yield from words
+
+
+def embed(description: str, dim: int = DIM) -> np.ndarray:
+    """Unit vector for a descriptor string via signed feature hashing."""
+    vector = np.zeros(dim)
+    for feature in _features(description):
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class Pick:
+    """One sampled candidate."""
+    archetype: str
+    candidate: int
+    score: float
+
+
+class TasteEngine:
+    """Archetype embeddings plus a reusable pool of candidate vectors."""
+
+    def __init__(
+        self,
+        archetypes: Mapping[str, str],
+        dim: int = DIM,
+        per_archetype: int = CANDIDATES_PER_ARCHETYPE,
+        seed: int = 0,
+    ) -> None:
+        self.names = list(archetypes)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.dim = dim
+        self.per_archetype = per_archetype
+        self.vectors = np.stack([embed(archetypes[n], dim) for n in self.names])
+        rng = np.random.default_rng(seed)
+        # Candidate pool: row i belongs to archetype owner[i]
+        self.owner = np.repeat(np.arange(len(self.names)), per_archetype)
+        pool = self.vectors[self.owner] + rng.normal(0, CANDIDATE_JITTER / np.sqrt(dim), (len(self.owner), dim))
+        self.candidates = pool / np.linalg.norm(pool, axis=1, keepdims=True)
+
+    def zero(self) -> np.ndarray:
+        return np.zeros(self.dim)
+
+    def update(self, preference: Sequence[float] | np.ndarray, style: str, weight: float = 1.0) -> np.ndarray:
+        """Decay the preference vector and add the selected archetype's direction."""
+        current = np.asarray(preference, dtype=float) if len(preference) else self.zero()
+        index = self.index.get(style)
+        if index is None:
+            return current
+        return DECAY * current + weight * self.vectors[index]
+
+    def from_history(self, history: Sequence[str]) -> np.ndarray:
+        """Preference vector for a full selection history (oldest first)."""
+        indices = np.array([self.index[s] for s in history if s in self.index], dtype=int)
+        if not len(indices):
+            return self.zero()
+        weights = DECAY ** np.arange(len(indices) - 1, -1, -1)
+        return weights @ self.vectors[indices]
+
+    def scores(self, preference: Sequence[float] | np.ndarray) -> np.ndarray:
+        """Cosine similarity of every candidate to the preference (zeros when cold)."""
+        p = np.asarray(preference, dtype=float)
+        norm = np.linalg.norm(p) if p.size else 0.0
+        if not norm:
+            return np.zeros(len(self.candidates))
+        return self.candidates @ (p / norm)
+
+    def sample(
+        self,
+        preference: Sequence[float] | np.ndarray,
+        k: int,
+        chaos: float,
+        rng: np.random.Generator | None = None,
+    ) -> list[Pick]:
+        """Draw ``k`` candidates from distinct archetypes, favouring the preference.
+
+        Equivalent to sampling without replacement from softmax(scores / T):
+        Gumbel noise is added to the scaled scores, and the best candidate
+        per archetype is kept. The top ``k`` of those are returned, best first.
+        """
+        rng = rng or np.random.default_rng()
+        temperature = MIN_TEMPERATURE + min(max(chaos, 0.0), 1.0) * (MAX_TEMPERATURE - MIN_TEMPERATURE)
+        scores = self.scores(preference)
+        perturbed = scores / temperature + rng.gumbel(size=len(scores))
+        # The pool holds equal, contiguous blocks per archetype: best of each block
+        blocks = perturbed.reshape(len(self.names), self.per_archetype)
+        best = blocks.argmax(axis=1) + np.arange(len(self.names)) * self.per_archetype
+        k = min(k, len(best))
+        top = best[np.argpartition(-perturbed[best], k - 1)[:k]]
+        top = top[np.argsort(-perturbed[top])]
+        return [
+            Pick(archetype=self.names[self.owner[i]], candidate=int(i), score=float(scores[i]))
+            for i in top
+        ]
@@ -0,0 +1,193 @@
+"""Taste sessions — server-side style-weight vectors for the Taste Tuner.
+
+Each session keeps its style weights, a selection count and the options it
+was last shown, so a selection is a constant-time update and a round loads
+the profile without replaying history. Sessions live in memory in
+last-touched order and expire after ``SESSION_TTL`` seconds of inactivity.
+They are only changed through ``TasteSessionStore.update``, under the store
+lock, so concurrent requests and eviction never see a half-applied update.
+If ``TASTE_DB_PATH`` is set, every update is also written through to SQLite,
+and sessions missing from memory (e.g. after a restart) are loaded from it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+from api.services.imagen_service import DesignOption, TasteProfile, taste_engine
+
+SESSION_TTL = float(os.environ.get("TASTE_SESSION_TTL", str(24 * 3600)))
+MAX_SESSIONS = int(os.environ.get("TASTE_MAX_SESSIONS", "10000"))
+DB_PATH = os.environ.get("TASTE_DB_PATH", "")
+# How many preferred styles a profile exposes
+TOP_STYLES = 2
+
+T = TypeVar("T")
+
+
+@dataclass
+class TasteSession:
+    """One tuning session's accumulated preferences."""
+    session_id: str
+    user_id: str = "anon"
+    style_weights: dict[str, float] = field(default_factory=dict)
+    preferred_styles: list[str] = field(default_factory=list)
+    # Decayed preference vector (see api.services.taste_engine)
+    preference: list[float] = field(default_factory=list)
+    selections: int = 0
+    # option id -> style category for the most recent round
+    last_options: dict[str, str] = field(default_factory=dict)
+    last_prompt: str = ""
+    # Next round's picks, chosen (and prefetched) right after a selection
+    planned: list[dict[str, Any]] = field(default_factory=list)
+    updated: float = field(default_factory=time.time)
+
+    @property
+    def chaos_level(self) -> float:
+        # Decrease chaos as history builds
+        return max(0.1, 0.5 - self.selections * 0.05)
+
+    def record_options(self, prompt: str, options: list[DesignOption]) -> None:
+        self.last_prompt = prompt
+        self.last_options = {o.id: o.style_category for o in options}
+
+    def select(self, style: str, weight: float = 1.0) -> None:
+        """Add one selection; keeps ``preferred_styles`` current without a re-sort."""
+        score = self.style_weights.get(style, 0.0) + weight
+        self.style_weights[style] = score
+        self.selections += 1
+        self.preference = taste_engine.update(self.preference, style, weight).tolist()
+        top = [s for s in self.preferred_styles if s != style]
+        position = next(
+            (i for i, s in enumerate(top) if self.style_weights[s] < score),
+            len(top),
+        )
+        top.insert(position, style)
+        self.preferred_styles = top[:TOP_STYLES]
+
+    def profile(self) -> TasteProfile:
+        return TasteProfile(
+            preferred_styles=list(self.preferred_styles),
+            style_weights=dict(self.style_weights),
+            chaos_level=self.chaos_level,
+            preference=list(self.preference),
+        )
+
+
+class TasteSessionStore:
+    """In-memory TTL/LRU session map with optional SQLite write-through."""
+
+    def __init__(
+        self,
+        db_path: str | Path | None = DB_PATH or None,
+        ttl: float = SESSION_TTL,
+        max_sessions: int = MAX_SESSIONS,
+    ) -> None:
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, TasteSession] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS taste_sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS taste_sessions_updated ON taste_sessions (updated)"
+            )
+            self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired sessions from the cold end (caller holds the lock)."""
+        cutoff = now - self.ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.updated >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+        if self._db is not None:
+            self._db.execute("DELETE FROM taste_sessions WHERE updated < ?", (cutoff,))
+
+    def _load(self, session_id: str) -> TasteSession | None:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT data FROM taste_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        session = TasteSession(**json.loads(row[0]))
+        return session if session.updated >= time.time() - self.ttl else None
+
+    def _store(self, session: TasteSession, now: float) -> None:
+        """Save ``session`` as the most recent one, then evict (caller holds the lock).
+
+        Evicting after the insert keeps the store within ``max_sessions``;
+        the commit below also covers the expiry DELETE.
+        """
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        self._evict(now)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO taste_sessions (session_id, data, updated) VALUES (?, ?, ?)",
+                (session.session_id, json.dumps(asdict(session)), session.updated),
+            )
+            self._db.commit()
+
+    def create(self, session_id: str, user_id: str = "anon") -> TasteSession:
+        with self._lock:
+            now = time.time()
+            session = TasteSession(session_id=session_id, user_id=user_id, updated=now)
+            self._store(session, now)
+            return session
+
+    def _get(self, session_id: str, now: float) -> TasteSession | None:
+        """Live session from memory or the database (caller holds the lock)."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._load(session_id)
+            if session is not None:
+                self._sessions[session_id] = session
+        elif session.updated < now - self.ttl:
+            del self._sessions[session_id]
+            return None
+        return session
+
+    def update(self, session_id: str, change: Callable[[TasteSession], T]) -> T:
+        """Apply ``change`` to a session (created if missing) and persist it.
+
+        ``change`` runs under the store lock and its result is returned. If
+        it raises, nothing is saved, so it should raise before mutating.
+        """
+        with self._lock:
+            now = time.time()
+            session = self._get(session_id, now) or TasteSession(session_id=session_id, updated=now)
+            result = change(session)
+            session.updated = now
+            self._store(session, now)
+            return result
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+taste_sessions = TasteSessionStore()
@@ -0,0 +1,201 @@
+"""Token usage rollups — ingest per-request usage, answer range queries from aggregates.
+
+Usage events are appended as JSON lines to ``token-events.jsonl`` next to
+``token-usage.json``. The agent runner writes one per request, and any other
+process may append its own. The log is tailed incrementally and folded into
+per-model hourly and daily buckets (UTC). Each (granularity, model) series is
+columnar: a sorted ``array`` of bucket starts plus one ``array`` per metric.
+A range query therefore costs two bisects plus the buckets it returns,
+independent of how many records were ingested.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any
+
+from api.services.file_reader import TOKEN_EVENTS_PATH, _validate_path
+from api.services.request_metrics import track
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {"hour": 3600, "day": 86400}
+METRICS = (
+    "requests",
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+)
+
+
+class _Series:
+    """Sorted bucket starts with one parallel column per metric."""
+    __slots__ = ("starts", "columns")
+
+    def __init__(self) -> None:
+        self.starts = array("q")
+        self.columns = {metric: array("q") for metric in METRICS}
+
+    def add(self, start: int, values: dict[str, int]) -> None:
+        starts = self.starts
+        if starts and starts[-1] == start:
+            i = len(starts) - 1
+        else:
+            i = bisect_left(starts, start)
+            if i == len(starts) or starts[i] != start:
+                starts.insert(i, start)
+                for column in self.columns.values():
+                    column.insert(i, 0)
+        for metric, value in values.items():
+            self.columns[metric][i] += value
+
+    def window(self, lo: int, hi: int) -> tuple[int, int]:
+        """Index range of buckets starting in ``[lo, hi)``."""
+        return bisect_left(self.starts, lo), bisect_left(self.starts, hi)
+
+
+# Columns are int64; anything near that is a corrupt record, not real usage
+MAX_COUNT = 2**48
+
+
+def _count(value: Any) -> int:
+    count = int(value or 0)
+    if not 0 <= count < MAX_COUNT:
+        raise ValueError(f"Count out of range: {value!r}")
+    return count
+
+
+def _values(record: dict[str, Any]) -> dict[str, int]:
+    values = {"requests": _count(record.get("requests", 1))}
+    for metric in METRICS[1:]:
+        values[metric] = _count(record.get(metric, 0))
+    return values
+
+
+def _timestamp(value: Any) -> int:
+    ts = float(value)
+    # json.loads turns 1e400 and Infinity into inf
+    if not math.isfinite(ts) or not 0 <= ts < MAX_COUNT:
+        raise ValueError(f"Timestamp out of range: {value!r}")
+    return int(ts)
+
+
+class TokenRollups:
+    """Incrementally maintained hourly/daily usage aggregates over an event log."""
+
+    def __init__(self, log_path: Path) -> None:
+        self.log_path = _validate_path(log_path)
+        self._lock = threading.Lock()
+        self._log_id: tuple[int, int] | None = None
+        self._offset = 0
+        self._series: dict[str, dict[str, _Series]] = {g: {} for g in GRANULARITIES}
+        self.records = 0
+
+    def record(
+        self,
+        model: str,
+        usage: dict[str, Any],
+        source: str = "agent",
+        ts: float | None = None,
+    ) -> None:
+        """Append one usage event to the log (picked up by the next sync)."""
+        event = {"ts": time.time() if ts is None else ts, "model": model, "source": source}
+        event.update({metric: usage.get(metric, 0) for metric in METRICS[1:]})
+        line = json.dumps(event).encode("utf-8") + b"\n"
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def _ingest(self, event: dict[str, Any]) -> None:
+        # Validate everything before touching a series
+        ts = _timestamp(event["ts"])
+        model = str(event.get("model") or "unknown")
+        values = _values(event)
+        for granularity, width in GRANULARITIES.items():
+            series = self._series[granularity].get(model)
+            if series is None:
+                series = self._series[granularity][model] = _Series()
+            series.add(ts - ts % width, values)
+        self.records += 1
+
+    def sync(self) -> None:
+        """Fold log lines appended since the last sync into the rollups."""
+        with self._lock:
+            try:
+                st = os.stat(self.log_path)
+            except FileNotFoundError:
+                if self._log_id is not None:
+                    self._reset(None)
+                return
+            log_id = (st.st_dev, st.st_ino)
+            if log_id != self._log_id or st.st_size < self._offset:
+                # Rotated or truncated: rebuild from the start of the new file.
+                self._reset(log_id)
+            if st.st_size == self._offset:
+                return
+            with track("file_io"), self.log_path.open("rb") as f:
+                f.seek(self._offset)
+                data = f.read(st.st_size - self._offset)
+            # Only consume whole lines; a concurrent append may still be in flight.
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    self._ingest(json.loads(line))
+                except (ValueError, KeyError, TypeError, OverflowError) as e:
+                    logger.warning("Skipping bad token event: %s", e)
+            self._offset += end
+
+    def _reset(self, log_id: tuple[int, int] | None) -> None:
+        self._log_id, self._offset, self.records = log_id, 0, 0
+        self._series = {g: {} for g in GRANULARITIES}
+
+    def summary(
+        self,
+        granularity: str,
+        start: int,
+        end: int,
+        model: str | None = None,
+    ) -> dict[str, Any]:
+        """Per-model bucket columns and totals for buckets starting in ``[start, end)``."""
+        width = GRANULARITIES[granularity]
+        self.sync()
+        lo, hi = start - start % width, end
+        series_out: dict[str, dict[str, list[int]]] = {}
+        totals = dict.fromkeys(METRICS, 0)
+        with self._lock:
+            for name, series in self._series[granularity].items():
+                if model is not None and name != model:
+                    continue
+                i, j = series.window(lo, hi)
+                if i == j:
+                    continue
+                out = {"start": series.starts[i:j].tolist()}
+                for metric, column in series.columns.items():
+                    values = column[i:j].tolist()
+                    out[metric] = values
+                    totals[metric] += sum(values)
+                series_out[name] = out
+        return {
+            "granularity": granularity,
+            "from": lo,
+            "to": hi,
+            "series": series_out,
+            "totals": totals,
+        }
+
+
+token_rollups = TokenRollups(TOKEN_EVENTS_PATH)
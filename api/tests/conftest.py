@@ -0,0 +1,40 @@
+"""Shared test setup.
+
+Data paths (``~/clawdbot``, ``~/Desktop/Manny/ops``, ``DEV_DIR``) are computed
+when the service modules are imported, so ``HOME`` is pointed at a scratch
+tree here, before any test module imports them.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+import pytest
+
+HOME = Path(tempfile.mkdtemp(prefix="api-tests-"))
+os.environ["HOME"] = str(HOME)
+os.environ["DEV_DIR"] = str(HOME / "dev")
+for sub in ("clawdbot/data", "clawdbot/overnight", "Desktop/Manny/ops", "dev"):
+    (HOME / sub).mkdir(parents=True, exist_ok=True)
+
+requires_git = pytest.mark.skipif(shutil.which("git") is None, reason="git binary not installed")
+
+
+def git(repo: Path, *args: str, env: dict[str, str] | None = None) -> str:
+    """Run git in ``repo`` with a fixed identity and return its stdout."""
+    result = subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "GIT_CONFIG_NOSYSTEM": "1", **(env or {})},
+    )
+    return result.stdout
+
+
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    shutil.rmtree(HOME, ignore_errors=True)
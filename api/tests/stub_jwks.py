@@ -0,0 +1,73 @@
+"""Locally generated signing keys and a stub JWKS endpoint serving them.
+
+Shared by the auth tests and ``api.benchmarks.bench_auth``.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+SECRET = "test-secret-" + "x" * 32
+ADMIN = "admin-user"
+
+
+class SigningKey:
+    """A private key plus the public JWK that verifies it."""
+
+    def __init__(self, kid: str, algorithm: str) -> None:
+        self.kid = kid
+        self.algorithm = algorithm
+        if algorithm == "RS256":
+            self.private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        else:
+            self.private = ec.generate_private_key(ec.SECP256R1())
+        jwk = json.loads(jwt.algorithms.get_default_algorithms()[algorithm].to_jwk(self.private.public_key()))
+        self.jwk = {**jwk, "kid": kid, "alg": algorithm, "use": "sig"}
+
+    def sign(self, claims: dict[str, Any], kid: str | None = None) -> str:
+        return jwt.encode(claims, self.private, algorithm=self.algorithm, headers={"kid": kid or self.kid})
+
+
+def claims(sub: str = ADMIN, ttl: float = 3600, **extra: Any) -> dict[str, Any]:
+    return {"sub": sub, "aud": "authenticated", "exp": int(time.time() + ttl), **extra}
+
+
+def hs256(payload: dict[str, Any], secret: str = SECRET) -> str:
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+class JwksServer:
+    """Serves ``keys`` as a JWKS document; change ``keys`` to rotate."""
+
+    def __init__(self, keys: list[SigningKey]) -> None:
+        self.keys = keys
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                stub.requests += 1
+                body = json.dumps({"keys": [key.jwk for key in stub.keys]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/.well-known/jwks.json"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
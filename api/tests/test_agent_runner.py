@@ -0,0 +1,226 @@
+"""Agent runner against the local Messages API stub: prompt caching, shared client, tool loop."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from api.benchmarks.stub_anthropic import StubServer, StubState
+from api.services import agent_runner, agent_tools
+from api.services.file_reader import OPS_DIR
+from api.services.response_cache import ResponseCache
+from api.services.token_rollups import TokenRollups
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+@pytest.fixture(scope="module")
+def server() -> Iterator[StubServer]:
+    with StubServer(StubState(words=5)) as server:
+        yield server
+
+
+@pytest.fixture
+def stub(server: StubServer, monkeypatch: pytest.MonkeyPatch) -> Iterator[StubState]:
+    state = server.state
+    state.requests.clear()
+    state.cached_prefixes.clear()
+    state.script = None
+    monkeypatch.setattr(agent_runner, "ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setattr(agent_runner, "ANTHROPIC_BASE_URL", server.base_url)
+    monkeypatch.setattr(agent_runner, "CLAUDE_MODEL", "stub-model")
+    monkeypatch.setattr(agent_runner, "_client", None)
+    monkeypatch.setattr(agent_runner, "metrics", agent_runner.AgentMetrics())
+    log = Path(tempfile.mkdtemp(dir=OPS_DIR)) / "token-events.jsonl"
+    monkeypatch.setattr(agent_runner, "token_rollups", TokenRollups(log))
+    yield state
+
+
+def _run(messages: list[dict[str, Any]], extra_context: str = "") -> list[dict[str, Any]]:
+    async def run() -> list[dict[str, Any]]:
+        try:
+            return [event async for event in agent_runner.run_agent(messages, extra_context)]
+        finally:
+            await agent_runner.close_client()
+
+    return asyncio.run(run())
+
+
+def _usage(events: list[dict[str, Any]]) -> dict[str, Any]:
+    return next(e for e in events if e["type"] == "usage")
+
+
+def test_build_request_places_cache_breakpoints() -> None:
+    messages = [
+        {"role": "user", "content": "first"},
+        {"role": "assistant", "content": [{"type": "text", "text": "reply"}]},
+        {"role": "user", "content": [{"type": "text", "text": "a"}, {"type": "text", "text": "b"}]},
+    ]
+    original = copy.deepcopy(messages)
+    request = agent_runner.build_request(messages, "context")
+    assert [block["cache_control"] for block in request["system"]] == [CACHE_CONTROL] * 2
+    assert request["system"][1]["text"] == "context"
+    # Only the last block of the last message carries a breakpoint
+    last = request["messages"][-1]["content"]
+    assert "cache_control" not in last[0] and last[1]["cache_control"] == CACHE_CONTROL
+    assert request["messages"][:2] == messages[:2]
+    assert messages == original
+    assert request["tools"] == agent_runner.tool_definitions()
+
+
+def test_plain_string_content_becomes_a_cached_block() -> None:
+    request = agent_runner.build_request([{"role": "user", "content": "hi"}])
+    assert len(request["system"]) == 1
+    assert request["messages"] == [
+        {"role": "user", "content": [{"type": "text", "text": "hi", "cache_control": CACHE_CONTROL}]},
+    ]
+
+
+def test_repeated_prefixes_are_read_from_the_prompt_cache(stub: StubState) -> None:
+    messages = [{"role": "user", "content": "What changed overnight?"}]
+    first = _usage(_run(messages, "ctx"))
+    assert first["cache_creation_input_tokens"] > 0
+    assert first["cache_read_input_tokens"] == 0
+
+    second = _usage(_run(messages, "ctx"))
+    assert second["cache_read_input_tokens"] == first["cache_creation_input_tokens"]
+    assert second["cache_creation_input_tokens"] == 0
+
+    snapshot = agent_runner.metrics.snapshot()
+    assert snapshot["requests"] == 2
+    assert snapshot["input_tokens"]["cache_read_ratio"] == 0.5
+    assert snapshot["ttft_ms"]["samples"] == 2
+    assert stub.requests[0]["stream"] is True
+
+
+def test_usage_is_recorded_to_the_rollups(stub: StubState) -> None:
+    _run([{"role": "user", "content": "hello"}])
+    summary = agent_runner.token_rollups.summary("day", 0, 2**40)
+    assert summary["totals"]["requests"] == 1
+    assert summary["totals"]["output_tokens"] == 5
+
+
+def test_one_client_is_shared_until_closed(stub: StubState) -> None:
+    async def run() -> None:
+        client = agent_runner.get_client()
+        assert agent_runner.get_client() is client
+        await agent_runner.open_client()
+        assert agent_runner.get_client() is client
+        await agent_runner.close_client()
+        assert agent_runner._client is None
+
+    asyncio.run(run())
+
+
+def test_missing_api_key_is_an_error_event(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(agent_runner, "ANTHROPIC_API_KEY", "")
+    assert _run([{"role": "user", "content": "hi"}]) == [
+        {"type": "error", "message": "ANTHROPIC_API_KEY not configured"},
+    ]
+
+
+def _tool_use(id_: str, name: str, **tool_input: Any) -> dict[str, Any]:
+    return {"type": "tool_use", "id": id_, "name": name, "input": tool_input}
+
+
+def _answered(body: dict[str, Any]) -> bool:
+    content = body["messages"][-1]["content"]
+    return any(block.get("type") == "tool_result" for block in content)
+
+
+@pytest.fixture
+def tools(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def nap(seconds: float) -> dict[str, float]:
+        await asyncio.sleep(seconds)
+        return {"slept": seconds}
+
+    def boom() -> None:
+        raise ValueError("no such thing")
+
+    schema = {"type": "object", "properties": {}}
+    for tool in (
+        agent_tools.Tool("nap", "Sleep.", schema, nap),
+        agent_tools.Tool("boom", "Fail.", schema, boom),
+    ):
+        monkeypatch.setitem(agent_tools.TOOLS, tool.name, tool)
+
+
+def test_tool_calls_from_one_turn_run_concurrently(stub: StubState, tools: None) -> None:
+    stub.script = lambda body: [{"type": "text", "text": "all done"}] if _answered(body) else [
+        {"type": "text", "text": "checking"},
+        _tool_use("toolu_1", "nap", seconds=0.3),
+        _tool_use("toolu_2", "nap", seconds=0.3),
+        _tool_use("toolu_3", "boom"),
+        _tool_use("toolu_4", "missing"),
+    ]
+    started = time.perf_counter()
+    events = _run([{"role": "user", "content": "go"}])
+    assert time.perf_counter() - started < 0.55
+    assert [e["type"] for e in events] == [
+        "text", *["tool_use"] * 4, *["tool_result"] * 4, "text", "text", "usage", "done",
+    ]
+    finished = [e for e in events if e["type"] == "tool_result"]
+    # Reported as they finish: the failures land before the naps
+    assert {e["id"] for e in finished[:2]} == {"toolu_3", "toolu_4"}
+    results = {e["id"]: e for e in finished}
+    assert json.loads(results["toolu_1"]["result"]) == {"slept": 0.3}
+    assert results["toolu_3"] == {
+        "type": "tool_result", "id": "toolu_3", "name": "boom",
+        "result": "Tool error: no such thing", "is_error": True,
+    }
+    assert results["toolu_4"]["result"] == "Unknown tool: missing"
+
+    # The second turn sees the assistant's calls and every result, in call order
+    assistant, user = stub.requests[1]["messages"][-2:]
+    assert [b["type"] for b in assistant["content"]] == ["text", *["tool_use"] * 4]
+    assert [b["tool_use_id"] for b in user["content"]] == ["toolu_1", "toolu_2", "toolu_3", "toolu_4"]
+    assert [b.get("is_error", False) for b in user["content"]] == [False, False, True, True]
+    assert len(stub.requests) == 2
+
+
+def test_loop_stops_after_max_turns(stub: StubState, tools: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(agent_runner, "MAX_TURNS", 3)
+    stub.script = lambda body: [_tool_use(f"toolu_{len(stub.requests)}", "nap", seconds=0)]
+    events = _run([{"role": "user", "content": "loop forever"}])
+    assert len(stub.requests) == 3
+    assert [e["type"] for e in events[-2:]] == ["usage", "done"]
+    assert sum(e["type"] == "tool_result" for e in events) == 3
+    assert _usage(events)["output_tokens"] == 0
+
+
+def test_repeated_runs_are_replayed_from_the_response_cache(
+    stub: StubState, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(agent_runner, "response_cache", ResponseCache())
+
+    def stream(content: str, use_cache: bool = True) -> list[dict[str, Any]]:
+        async def run() -> list[bytes]:
+            try:
+                messages = [{"role": "user", "content": content}]
+                return [frame async for frame in agent_runner.stream_agent(messages, use_cache=use_cache)]
+            finally:
+                await agent_runner.close_client()
+
+        return [json.loads(frame.removeprefix(b"data: ")) for frame in asyncio.run(run())]
+
+    def text(events: list[dict[str, Any]]) -> str:
+        return "".join(e["content"] for e in events if e["type"] == "text")
+
+    first = stream("Summarise   the queue")
+    assert first[-1] == {"type": "done"}
+    replayed = stream("Summarise the queue")
+    assert len(stub.requests) == 1
+    assert text(replayed) == text(first) == "word0 word1 word2 word3 word4"
+    assert replayed[-2] == first[-2] and replayed[-2]["type"] == "usage"
+    assert replayed[-1] == {"type": "done", "cached": True}
+    stream("Summarise the queue", use_cache=False)
+    assert len(stub.requests) == 2
+    assert agent_runner.response_cache.stats()["hits"] == 1
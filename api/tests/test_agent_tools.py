@@ -0,0 +1,66 @@
+"""Agent tools: timeouts, error results, truncation and the research tools."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.services import agent_tools
+from api.services.agent_tools import Tool, ToolOutcome, run_tool
+from api.services.file_reader import OVERNIGHT_DIR
+
+SCHEMA = {"type": "object", "properties": {}}
+
+
+def _register(monkeypatch: pytest.MonkeyPatch, name: str, handler: agent_tools.Handler, **kwargs: float) -> None:
+    monkeypatch.setitem(agent_tools.TOOLS, name, Tool(name, name, SCHEMA, handler, **kwargs))
+
+
+def test_sync_handlers_run_off_the_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    _register(monkeypatch, "where", lambda: threading.current_thread().name)
+    outcome = asyncio.run(run_tool("t1", "where", {}))
+    assert outcome.content.startswith("io")
+    assert not outcome.is_error
+
+
+def test_slow_tools_time_out(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def stall() -> None:
+        await asyncio.sleep(5)
+
+    _register(monkeypatch, "stall", stall, timeout=0.05)
+    _register(monkeypatch, "block", lambda: time.sleep(0.3), timeout=0.05)
+    for name in ("stall", "block"):
+        started = time.perf_counter()
+        outcome = asyncio.run(run_tool("t1", name, {}))
+        assert time.perf_counter() - started < 0.25
+        assert outcome == ToolOutcome("t1", name, "Tool timed out after 0.05s", is_error=True)
+
+
+def test_bad_input_and_large_results(monkeypatch: pytest.MonkeyPatch) -> None:
+    _register(monkeypatch, "echo", lambda text: text)
+    outcome = asyncio.run(run_tool("t1", "echo", {"wrong": 1}))
+    assert outcome.is_error and outcome.content.startswith("Tool error:")
+    assert outcome.result_block()["is_error"] is True
+
+    outcome = asyncio.run(run_tool("t2", "echo", {"text": "x" * (agent_tools.MAX_RESULT_CHARS + 10)}))
+    assert outcome.content.endswith("…[truncated]")
+    assert len(outcome.content) < agent_tools.MAX_RESULT_CHARS + 20
+    assert "is_error" not in outcome.result_block()
+
+
+def test_read_research_brief_by_section() -> None:
+    (OVERNIGHT_DIR / "tool-brief.md").write_text("# Title\n\nintro\n\n## Risks\n\nall of them\n\n## Next\n")
+    read = agent_tools.TOOLS["read_research_brief"]
+    assert asyncio.run(run_tool("t1", read.name, {"slug": "tool-brief", "section": "risks"})).content == (
+        "## Risks\n\nall of them\n\n"
+    )
+    for tool_input, error in (
+        ({"slug": "../etc/passwd"}, "Invalid slug"),
+        ({"slug": "no-such-brief"}, "No research brief"),
+        ({"slug": "tool-brief", "section": "absent"}, "No section"),
+    ):
+        outcome = asyncio.run(run_tool("t2", read.name, tool_input))
+        assert outcome.is_error and error in outcome.content
@@ -0,0 +1,155 @@
+"""verify_token: the verified-token cache and HS256/RS256/ES256 via a stub JWKS server."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from api.middleware import auth
+from api.tests.stub_jwks import ADMIN, SECRET, JwksServer, SigningKey, claims, hs256
+
+
+@pytest.fixture(scope="module")
+def keys() -> dict[str, SigningKey]:
+    return {
+        "rsa": SigningKey("rsa-1", "RS256"),
+        "ec": SigningKey("ec-1", "ES256"),
+        "rotated": SigningKey("rsa-2", "RS256"),
+    }
+
+
+@pytest.fixture
+def jwks(keys: dict[str, SigningKey], monkeypatch: pytest.MonkeyPatch) -> Iterator[JwksServer]:
+    server = JwksServer([keys["rsa"], keys["ec"]])
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", SECRET)
+    monkeypatch.setattr(auth, "ADMIN_USER_ID", ADMIN)
+    monkeypatch.setattr(auth, "jwks_cache", auth.JwksCache(server.url))
+    monkeypatch.setattr(auth, "token_cache", auth.TokenCache(max_entries=8))
+    yield server
+    server.close()
+
+
+def _request(token: str | None) -> Request:
+    headers = [] if token is None else [(b"authorization", f"Bearer {token}".encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def _verify(token: str | None) -> dict[str, Any]:
+    return asyncio.run(auth.verify_token(_request(token)))
+
+
+def _status(token: str | None) -> int:
+    with pytest.raises(HTTPException) as raised:
+        _verify(token)
+    return raised.value.status_code
+
+
+@pytest.mark.parametrize("kind", ["hs256", "rsa", "ec"])
+def test_accepts_each_algorithm_and_caches_it(jwks: JwksServer, keys: dict[str, SigningKey], kind: str) -> None:
+    token = hs256(claims()) if kind == "hs256" else keys[kind].sign(claims())
+    assert _verify(token)["sub"] == ADMIN
+    assert (auth.token_cache.hits, auth.token_cache.misses) == (0, 1)
+    assert _verify(token)["sub"] == ADMIN
+    assert auth.token_cache.hits == 1
+    assert jwks.requests == (0 if kind == "hs256" else 1)
+
+
+def test_cached_payloads_are_copies(jwks: JwksServer) -> None:
+    token = hs256(claims(roles=["reader"]))
+    _verify(token)["roles"].append("admin")
+    assert _verify(token)["roles"] == ["reader"]
+
+
+def test_cache_is_a_bounded_lru() -> None:
+    cache = auth.TokenCache(max_entries=2)
+    exp = time.time() + 60
+    for name in ("a", "b"):
+        cache.put(cache.key(name), {"sub": name, "exp": exp})
+    assert cache.get(cache.key("a")) is not None  # a is now most recent
+    cache.put(cache.key("c"), {"sub": "c", "exp": exp})
+    assert cache.get(cache.key("b")) is None
+    assert [cache.get(cache.key(n))["sub"] for n in ("a", "c")] == ["a", "c"]
+    # Tokens without exp are never cached
+    cache.put(cache.key("d"), {"sub": "d"})
+    assert cache.get(cache.key("d")) is None
+
+
+def test_cached_entries_expire_at_exp(jwks: JwksServer) -> None:
+    payload = claims(ttl=1)
+    token = hs256(payload)
+    assert _verify(token)["sub"] == ADMIN
+    while time.time() < payload["exp"]:
+        time.sleep(0.05)
+    assert _status(token) == 401
+    assert len(auth.token_cache._entries) == 0
+
+
+def test_unknown_kid_refetches_to_pick_up_a_rotation(jwks: JwksServer, keys: dict[str, SigningKey]) -> None:
+    assert _verify(keys["rsa"].sign(claims()))["sub"] == ADMIN
+    # Past the refetch gap, the provider starts signing with a new key
+    auth.jwks_cache._fetched_at -= auth.JWKS_MIN_REFETCH
+    jwks.keys = [keys["rsa"], keys["rotated"]]
+    assert _verify(keys["rotated"].sign(claims()))["sub"] == ADMIN
+    assert jwks.requests == 2
+
+
+def test_unknown_kid_refetches_are_rate_limited(jwks: JwksServer, keys: dict[str, SigningKey]) -> None:
+    assert _verify(keys["rsa"].sign(claims()))["sub"] == ADMIN
+    jwks.keys = [keys["rsa"], keys["rotated"]]
+    # Fetched moments ago: unknown kids are rejected without hitting the endpoint
+    for n in range(5):
+        assert _status(keys["rotated"].sign(claims(n=n))) == 401
+    assert jwks.requests == 1
+
+
+def test_concurrent_unknown_kids_share_one_refetch(jwks: JwksServer, keys: dict[str, SigningKey]) -> None:
+    jwks.keys = [keys["rotated"]]
+
+    async def burst() -> list[dict[str, Any]]:
+        requests = [_request(keys["rotated"].sign(claims(n=n))) for n in range(10)]
+        return list(await asyncio.gather(*(auth.verify_token(r) for r in requests)))
+
+    assert {p["sub"] for p in asyncio.run(burst())} == {ADMIN}
+    assert jwks.requests == 1
+
+
+@pytest.mark.parametrize(
+    "case",
+    ["missing", "garbage", "wrong-key", "wrong-kid-key", "expired", "audience", "none-alg", "hs256-with-public-key"],
+)
+def test_rejects_bad_tokens(jwks: JwksServer, keys: dict[str, SigningKey], case: str) -> None:
+    rsa = keys["rsa"]
+    token = {
+        "missing": None,
+        "garbage": "not.a.jwt",
+        # Signed by a key the JWKS doesn't publish, under a kid it does
+        "wrong-key": keys["rotated"].sign(claims(), kid="rsa-1"),
+        # An RS256 signature checked against the ES256 key its kid names
+        "wrong-kid-key": rsa.sign(claims(), kid="ec-1"),
+        "expired": rsa.sign(claims(ttl=-10)),
+        "audience": rsa.sign(claims(aud="anon")),
+        "none-alg": auth.jwt.encode(claims(), None, algorithm="none"),
+        "hs256-with-public-key": hs256(claims(), secret=str(rsa.jwk["n"])),
+    }[case]
+    assert _status(token) == 401
+    assert len(auth.token_cache._entries) == 0
+
+
+def test_asymmetric_tokens_need_a_jwks_url(
+    jwks: JwksServer, keys: dict[str, SigningKey], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(auth, "jwks_cache", None)
+    assert _status(keys["rsa"].sign(claims())) == 401
+
+
+def test_non_admin_is_forbidden_even_when_cached(jwks: JwksServer) -> None:
+    token = hs256(claims(sub="someone-else"))
+    assert _status(token) == 403
+    assert _status(token) == 403
+    assert auth.token_cache.hits == 1
@@ -0,0 +1,204 @@
+"""Change feed: live diffs, Last-Event-ID replay, resyncs and watcher failures."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from api.services import change_feed as cf
+
+
+class FakeSource(cf.Source):
+    """In-memory source: bump ``version`` after editing ``state``."""
+
+    name = "fake"
+
+    def __init__(self) -> None:
+        self.state: dict[str, Any] = {}
+        self.version = 0
+        self.fail: Exception | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.state[key] = value
+        self.version += 1
+
+    def signature(self, fresh: bool = False) -> Any:
+        if self.fail is not None:
+            raise self.fail
+        return self.version
+
+    def watch_paths(self) -> list[Path]:
+        return []
+
+    async def snapshot(self) -> dict[str, Any]:
+        return dict(self.state)
+
+    def compare(self, old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any] | None:
+        return cf._keyed_diff(old, new)
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(cf, "WATCH_MODE", "poll")
+    monkeypatch.setattr(cf, "POLL_INTERVAL", 0.01)
+
+
+def _parse(frame: bytes) -> dict[str, Any]:
+    fields: dict[str, Any] = {}
+    for line in frame.decode().strip("\n").split("\n"):
+        key, _, value = line.partition(": ")
+        fields[key] = json.loads(value) if key == "data" else value
+    return fields
+
+
+async def _next(stream: AsyncIterator[bytes]) -> dict[str, Any]:
+    return _parse(await asyncio.wait_for(stream.__anext__(), 2))
+
+
+async def _wait(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_live_diffs_then_replay_after_reconnect() -> None:
+    async def run() -> None:
+        source = FakeSource()
+        feed = cf.ChangeFeed([source])
+        try:
+            first = feed.stream()
+            ready = await _next(first)
+            assert ready["event"] == "ready" and ready["data"]["watcher"] == "poll"
+
+            source.set("a", 1)
+            added = await _next(first)
+            assert added["event"] == "fake" and added["data"] == {"added": [1]}
+            source.set("a", 2)
+            updated = await _next(first)
+            assert updated["data"] == {"updated": [2]}
+            await first.aclose()
+
+            # Missed while disconnected; the watcher keeps running until IDLE_STOP
+            source.set("b", 3)
+            await _wait(lambda: feed.events == 3)
+
+            again = feed.stream(added["id"])
+            replayed = [await _next(again), await _next(again)]
+            assert [f["id"] for f in replayed] == [updated["id"], f"{added['id'].split('-')[0]}-3"]
+            assert replayed[1]["data"] == {"added": [3]}
+            ready = await _next(again)
+            assert ready["event"] == "ready" and ready["data"]["last_event_id"] == replayed[1]["id"]
+            await again.aclose()
+        finally:
+            await feed.stop()
+
+    asyncio.run(run())
+
+
+def test_up_to_date_reconnect_replays_nothing() -> None:
+    async def run() -> None:
+        source = FakeSource()
+        feed = cf.ChangeFeed([source])
+        try:
+            stream = feed.stream()
+            await _next(stream)
+            source.set("a", 1)
+            last = (await _next(stream))["id"]
+            await stream.aclose()
+
+            again = feed.stream(last)
+            assert (await _next(again))["event"] == "ready"
+            await again.aclose()
+        finally:
+            await feed.stop()
+
+    asyncio.run(run())
+
+
+def test_unknown_or_evicted_ids_resync(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(cf, "REPLAY_SIZE", 2)
+
+    async def run() -> None:
+        source = FakeSource()
+        feed = cf.ChangeFeed([source])
+        try:
+            stream = feed.stream()
+            await _next(stream)
+            ids = []
+            for n in range(4):
+                source.set(f"k{n}", n)
+                ids.append((await _next(stream))["id"])
+            await stream.aclose()
+
+            for last in ("00000000-1", "garbage", ids[0]):
+                again = feed.stream(last)
+                assert (await _next(again))["event"] == "resync"
+                assert (await _next(again))["event"] == "ready"
+                await again.aclose()
+            # Still inside the replay buffer
+            again = feed.stream(ids[1])
+            assert (await _next(again))["id"] == ids[2]
+            await again.aclose()
+        finally:
+            await feed.stop()
+
+    asyncio.run(run())
+
+
+def test_backlog_rejects_ids_from_before_the_watcher_started() -> None:
+    feed = cf.ChangeFeed([])
+    feed._publish("fake", {"added": [1]})
+    feed._floor = 1
+    feed._publish("fake", {"added": [2]})
+    assert feed._backlog(None) == []
+    assert feed._backlog(f"{feed._boot}-2") == []
+    # Changes between the old watcher stopping and the new one priming are lost
+    assert feed._backlog(f"{feed._boot}-1") is None
+    assert feed._backlog(f"{feed._boot}-9") is None
+
+
+def test_failed_priming_still_sends_ready() -> None:
+    async def run() -> None:
+        source = FakeSource()
+        source.fail = RuntimeError("pool saturated")
+        feed = cf.ChangeFeed([source])
+        try:
+            stream = feed.stream()
+            assert (await _next(stream))["event"] == "ready"
+            # Recovers once stats work again; the first read only primes
+            source.fail = None
+            source.set("a", 1)
+            await _wait(lambda: "fake" in feed._states)
+            source.set("b", 2)
+            assert (await _next(stream))["data"] == {"added": [2]}
+            await stream.aclose()
+        finally:
+            await feed.stop()
+
+    asyncio.run(run())
+
+
+def test_watcher_crash_ends_streams() -> None:
+    async def run() -> None:
+        feed = cf.ChangeFeed([FakeSource()])
+        stream = feed.stream()
+        await _next(stream)
+
+        async def crash() -> None:
+            raise ValueError("boom")
+
+        feed._task.cancel()
+        feed._task = asyncio.create_task(crash())
+        feed._task.add_done_callback(feed._finished)
+        assert (await _next(stream))["event"] == "resync"
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+        assert feed._task is None
+
+    asyncio.run(run())
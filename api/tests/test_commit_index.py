@@ -0,0 +1,85 @@
+"""Commit index: merged top-N across repos and the generation that versions it."""
+
+from __future__ import annotations
+
+import asyncio
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from api.services.commit_index import CommitIndex
+from api.tests.conftest import git, requires_git
+
+pytestmark = requires_git
+
+HOUR = 3600
+
+
+def _commit(repo: Path, message: str, age: int) -> None:
+    (repo / "file.txt").write_text(message)
+    git(repo, "add", "file.txt")
+    stamp = f"@{int(time.time()) - age} +0000"
+    git(repo, "commit", "-q", "-m", message, env={"GIT_AUTHOR_DATE": stamp, "GIT_COMMITTER_DATE": stamp})
+
+
+def _repo(root: Path, name: str) -> Path:
+    repo = root / name
+    repo.mkdir()
+    git(repo, "init", "-q", "-b", "main")
+    return repo
+
+
+@pytest.fixture
+def root(tmp_path: Path) -> Path:
+    alpha, beta = _repo(tmp_path, "alpha"), _repo(tmp_path, "beta")
+    _commit(alpha, "alpha one", 3 * HOUR)
+    _commit(alpha, "alpha two", 2 * HOUR)
+    _commit(beta, "beta one", HOUR)
+    return tmp_path
+
+
+def _messages(index: CommitIndex) -> list[str]:
+    return [c["message"] for c in index.top()]
+
+
+def test_top_merges_repos_newest_first(root: Path) -> None:
+    index = CommitIndex(root)
+    assert asyncio.run(index.refresh()) is True
+    assert _messages(index) == ["beta one", "alpha two", "alpha one"]
+    assert [c["repo"] for c in index.top(2)] == ["beta", "alpha"]
+
+
+def test_version_moves_only_when_top_would(root: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    index = CommitIndex(root)
+    asyncio.run(index.refresh())
+    version = index.version()
+    asyncio.run(index.refresh())
+    assert index.version() == version
+
+    # Answered from the counter, without walking the commit lists
+    def no_merge() -> None:
+        raise AssertionError("version() merged the commit lists")
+
+    monkeypatch.setattr(index, "iter_commits", no_merge)
+    assert index.version() == version
+    monkeypatch.undo()
+
+    _commit(root / "alpha", "alpha three", 0)
+    asyncio.run(index.refresh())
+    assert index.version() > version
+    assert _messages(index)[0] == "alpha three"
+
+    # The window moving past the oldest commit changes the list on its own
+    version = index.version()
+    index.window_seconds = int(2.5 * HOUR)
+    assert index.version() > version
+    assert "alpha one" not in _messages(index)
+    version = index.version()
+    assert index.version() == version
+
+    shutil.rmtree(root / "beta")
+    asyncio.run(index.refresh())
+    assert index.version() > version
+    assert _messages(index) == ["alpha three", "alpha two"]
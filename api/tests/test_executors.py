@@ -0,0 +1,161 @@
+"""I/O pool and subprocess slots: deadlines, saturation and their 504/503 responses."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import main
+from api.routers import research
+from api.services import executors
+from api.services.executors import ExecutorSaturated, ExecutorTimeout, IOPool, SubprocessSlots
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="")
+
+
+def test_runs_on_a_worker_with_the_callers_context() -> None:
+    pool = IOPool(workers=2)
+
+    async def run() -> tuple[str, str]:
+        request_id.set("req-1")
+        return await pool.run(lambda: (threading.current_thread().name, request_id.get()))
+
+    try:
+        thread, seen = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert thread.startswith("io") and seen == "req-1"
+    assert pool.stats()["completed"] == 1
+
+
+def test_errors_propagate() -> None:
+    pool = IOPool(workers=1)
+
+    def fail() -> None:
+        raise FileNotFoundError("gone")
+
+    try:
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(pool.run(fail))
+    finally:
+        pool.shutdown()
+    assert pool.stats() | {"wait_ms": None} == {
+        "workers": 1, "queued": 0, "max_queued": 1, "active": 0, "completed": 1,
+        "timeouts": 0, "rejected": 0, "wait_ms": None,
+    }
+
+
+def test_overrunning_calls_time_out_but_stay_active_until_they_return() -> None:
+    pool = IOPool(workers=1)
+    release = threading.Event()
+    try:
+        with pytest.raises(ExecutorTimeout, match="wait timed out after 0.05s"):
+            asyncio.run(pool.run(release.wait, timeout=0.05))
+        assert isinstance(ExecutorTimeout(), asyncio.TimeoutError)
+        assert (pool.stats()["timeouts"], pool.stats()["active"]) == (1, 1)
+        release.set()
+        deadline = time.monotonic() + 5
+        while pool.stats()["active"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert (pool.stats()["active"], pool.stats()["completed"]) == (0, 1)
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_calls_abandoned_in_the_queue_never_run() -> None:
+    pool = IOPool(workers=1)
+    release = threading.Event()
+    ran: list[str] = []
+
+    async def run() -> None:
+        blocker = asyncio.ensure_future(pool.run(release.wait, timeout=None))
+        await asyncio.sleep(0.02)
+        with pytest.raises(ExecutorTimeout):
+            await pool.run(ran.append, "late", timeout=0.05)
+        assert pool.stats()["queued"] == 0
+        release.set()
+        await blocker
+        await pool.run(ran.append, "next")
+
+    try:
+        asyncio.run(run())
+    finally:
+        release.set()
+        pool.shutdown()
+    assert ran == ["next"]
+
+
+def test_submissions_beyond_the_queue_bound_are_rejected() -> None:
+    pool = IOPool(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run() -> None:
+        running = asyncio.ensure_future(pool.run(release.wait, timeout=None))
+        await asyncio.sleep(0.02)
+        waiting = asyncio.ensure_future(pool.run(time.sleep, 0, timeout=None))
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorSaturated, match="1 calls waiting"):
+            await pool.run(time.sleep, 0)
+        release.set()
+        await asyncio.gather(running, waiting)
+
+    try:
+        asyncio.run(run())
+    finally:
+        release.set()
+        pool.shutdown()
+    assert (pool.stats()["rejected"], pool.stats()["completed"]) == (1, 2)
+
+
+def test_subprocess_slots_bound_concurrency() -> None:
+    slots = SubprocessSlots(slots=2)
+    active: list[int] = []
+
+    async def child() -> None:
+        async with slots.slot():
+            active.append(slots.active)
+            await asyncio.sleep(0.01)
+
+    async def run() -> None:
+        await asyncio.gather(*(child() for _ in range(6)))
+
+    asyncio.run(run())
+    assert max(active) == 2
+    assert slots.stats()["completed"] == 6 and slots.stats()["queued"] == 0
+
+
+class QuickPool(IOPool):
+    """Every request-level deadline is 50 ms."""
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: float | None = None) -> Any:
+        return await super().run(fn, *args, timeout=0.05)
+
+
+@pytest.mark.parametrize(
+    ("pool", "status"),
+    [(IOPool(workers=1, max_queue=0), 503), (QuickPool(workers=1), 504)],
+    ids=["saturated", "timeout"],
+)
+def test_app_maps_executor_errors_to_responses(
+    pool: IOPool, status: int, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(executors, "io_pool", pool)
+    monkeypatch.setattr(research.research_index, "search", lambda q, limit: time.sleep(0.3))
+    try:
+        response = TestClient(main.app).get("/api/research/search", params={"q": "pricing"})
+    finally:
+        pool.shutdown()
+    assert response.status_code == status
+    if status == 503:
+        assert response.headers["Retry-After"] == "1"
+        assert "saturated" in response.json()["detail"]
+    else:
+        assert "timed out after 0.05s" in response.json()["detail"]
@@ -0,0 +1,75 @@
+"""Parsed-JSON cache: stat revalidation, counters and their /metrics exposure."""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routers import metrics
+from api.services import file_reader
+from api.services.file_reader import CLAWDBOT_DIR, json_cache_stats, read_json, write_json
+
+
+@pytest.fixture
+def path() -> Path:
+    return Path(tempfile.mkdtemp(dir=CLAWDBOT_DIR / "data")) / "data.json"
+
+
+def _delta(before: dict[str, int]) -> dict[str, int]:
+    after = json_cache_stats()
+    return {key: after[key] - before[key] for key in ("hits", "misses", "bytes_parsed")}
+
+
+def test_parses_once_until_the_file_changes(path: Path) -> None:
+    path.write_text(json.dumps({"n": 1}))
+    before = json_cache_stats()
+    first = read_json(path)
+    assert read_json(path) is first
+    assert _delta(before) == {"hits": 1, "misses": 1, "bytes_parsed": path.stat().st_size}
+
+    # Same size, new mtime: reparsed
+    path.write_text(json.dumps({"n": 2}))
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    assert read_json(path) == {"n": 2}
+    assert _delta(before)["misses"] == 2
+
+
+def test_write_and_delete_invalidate(path: Path) -> None:
+    write_json(path, [1])
+    assert read_json(path) == [1]
+    write_json(path, [1, 2])
+    assert read_json(path) == [1, 2]
+    path.unlink()
+    assert read_json(path) is None
+    assert path.resolve() not in file_reader._json_cache
+
+
+def test_write_json_if_unchanged(path: Path) -> None:
+    assert write_json(path, [1], if_unchanged=(0, 0, 0))
+    fingerprint = file_reader.file_fingerprint(path)
+    assert not write_json(path, [2], if_unchanged=(0, 0, 0))
+    assert write_json(path, [3], if_unchanged=fingerprint)
+    assert read_json(path) == [3]
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_paths_outside_the_allowed_bases_are_refused() -> None:
+    with pytest.raises(PermissionError):
+        read_json(Path(tempfile.gettempdir()) / "elsewhere.json")
+
+
+def test_metrics_expose_the_counters(path: Path) -> None:
+    path.write_text("{}")
+    read_json(path)
+    read_json(path)
+    app = FastAPI()
+    app.include_router(metrics.router, prefix="/api")
+    body = TestClient(app).get("/api/metrics").json()
+    assert body["json_cache"] == json_cache_stats()
+    assert body["json_cache"]["hits"] >= 1 and body["json_cache"]["bytes_parsed"] >= 2
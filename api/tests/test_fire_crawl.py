@@ -0,0 +1,268 @@
+"""Crawler against a local static server: DNA, SSRF guard, revalidation and per-host limits."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routers import taste
+from api.services import fire_crawl as fc
+
+PAGE = b"""<!doctype html><html><head>
+<link rel="stylesheet" href="/site.css">
+<style>body { color: #0F1115; font-family: 'Inter Display', sans-serif; }</style>
+</head><body><div style="display: grid; background: #EFFF00">hi</div></body></html>"""
+SHEET = b".a { color: #0F1115; display: grid } .b { color: #FFFFFF; font-family: Inter, sans-serif }"
+ETAG = '"v1"'
+MODIFIED = "Tue, 14 Nov 2023 22:13:20 GMT"
+
+
+class Site:
+    """Static pages on a loopback address, recording every request it answers."""
+
+    def __init__(self, host: str = "127.0.0.1") -> None:
+        self.pages: dict[str, tuple[int, dict[str, str], bytes]] = {}
+        self.requests: list[tuple[str, dict[str, str], float]] = []
+        self.delay = 0.0
+        self.active = self.max_active = 0
+        self._lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                with site._lock:
+                    site.requests.append((self.path, dict(self.headers), time.monotonic()))
+                    site.active += 1
+                    site.max_active = max(site.max_active, site.active)
+                try:
+                    time.sleep(site.delay)
+                    status, headers, body = site.pages.get(self.path.split("?")[0], (404, {}, b""))
+                    etag, modified = headers.get("ETag"), headers.get("Last-Modified")
+                    if status == 200 and (
+                        (etag and self.headers.get("If-None-Match") == etag)
+                        or (modified and self.headers.get("If-Modified-Since") == modified)
+                    ):
+                        status, body = 304, b""
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with site._lock:
+                        site.active -= 1
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer((host, 0), Handler)
+        self.url = f"http://{host}:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def paths(self) -> list[str]:
+        return [path for path, _, _ in self.requests]
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def site() -> Iterator[Site]:
+    site = Site()
+    site.pages["/"] = (200, {"Content-Type": "text/html", "ETag": ETAG, "Last-Modified": MODIFIED}, PAGE)
+    site.pages["/site.css"] = (200, {"Content-Type": "text/css"}, SHEET)
+    yield site
+    site.close()
+
+
+@pytest.fixture
+def allow_private(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(fc, "CRAWL_ALLOW_PRIVATE", True)
+
+
+def _service(per_host: int = 4, interval: float = 0.0) -> fc.FireCrawlService:
+    service = fc.FireCrawlService()
+    service._limiter = fc.HostRateLimiter(per_host=per_host, interval=interval)
+    return service
+
+
+async def _analyze(service: fc.FireCrawlService, *urls: str) -> list[fc.ScrapeResult]:
+    try:
+        return await service.analyze_many(list(urls))
+    finally:
+        await service.close()
+
+
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("Example.COM", "https://example.com/"),
+        ("http://example.com:80/a?b=2&a=1#frag", "http://example.com/a?a=1&b=2"),
+        ("https://example.com:8443", "https://example.com:8443/"),
+        ("http://[::1]:8080/x", "http://[::1]:8080/x"),
+    ],
+)
+def test_normalize_url(url: str, expected: str) -> None:
+    assert fc.normalize_url(url) == expected
+
+
+@pytest.mark.parametrize("url", ["http://a:99999/", "http://[::1", "https:///", "", "ftp://example.com/"])
+def test_normalize_url_rejects_malformed_input(url: str) -> None:
+    with pytest.raises(ValueError):
+        fc.normalize_url(url)
+
+
+def test_extracts_dna_from_page_and_stylesheets(site: Site, allow_private: None) -> None:
+    [result] = asyncio.run(_analyze(_service(), site.url))
+    assert site.paths() == ["/", "/site.css"]
+    assert result.dna.palette[0] == "#0F1115"
+    assert {"#EFFF00", "#FFFFFF"} <= set(result.dna.palette)
+    assert result.dna.typography == "Inter Display / Inter"
+    assert result.dna.layout == "Modular Grid"
+
+
+def test_revalidates_with_etag_and_last_modified(
+    site: Site, allow_private: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    service = _service()
+
+    async def run() -> list[fc.ScrapeResult]:
+        try:
+            first = await service.analyze_url(site.url)
+            monkeypatch.setattr(fc, "DNA_FRESH_SECONDS", 0)
+            second = await service.analyze_url(site.url)
+            monkeypatch.setattr(fc, "DNA_FRESH_SECONDS", 300)
+            third = await service.analyze_url(site.url)
+            return [first, second, third]
+        finally:
+            await service.close()
+
+    first, second, third = asyncio.run(run())
+    # Stale: one conditional GET answered 304, stylesheets not refetched; then fresh
+    assert site.paths() == ["/", "/site.css", "/"]
+    conditional = site.requests[2][1]
+    assert conditional["If-None-Match"] == ETAG
+    assert conditional["If-Modified-Since"] == MODIFIED
+    assert first.dna == second.dna == third.dna
+    assert service.stats["fetched"] == 1
+    assert service.stats["revalidated"] == 1
+    assert service.stats["fresh_hits"] == 1
+
+
+def test_changed_page_is_fetched_again(site: Site, allow_private: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(fc, "DNA_FRESH_SECONDS", 0)
+    service = _service()
+
+    async def run() -> list[fc.ScrapeResult]:
+        try:
+            first = await service.analyze_url(site.url)
+            site.pages["/"] = (200, {"ETag": '"v2"'}, b"<style>a { color: #E11D48 }</style>")
+            return [first, await service.analyze_url(site.url)]
+        finally:
+            await service.close()
+
+    first, second = asyncio.run(run())
+    assert second.dna.palette == ["#E11D48"]
+    assert service.stats["fetched"] == 2 and service.stats["revalidated"] == 0
+
+
+def test_per_host_limit(site: Site, allow_private: None) -> None:
+    site.delay = 0.1
+    asyncio.run(_analyze(_service(per_host=2), *(f"{site.url}/?n={n}" for n in range(6))))
+    assert len([path for path in site.paths() if path.startswith("/?")]) == 6
+    assert site.max_active == 2
+
+
+def test_limiter_spaces_out_starts_per_host() -> None:
+    async def run() -> dict[str, list[float]]:
+        limiter = fc.HostRateLimiter(per_host=4, interval=0.05)
+        starts: dict[str, list[float]] = {"a": [], "b": []}
+
+        async def fetch(host: str) -> None:
+            async with limiter.slot(host):
+                starts[host].append(asyncio.get_running_loop().time())
+
+        await asyncio.gather(*(fetch(host) for host in ("a", "b") * 4))
+        return starts
+
+    starts = asyncio.run(run())
+    for host in ("a", "b"):
+        gaps = [later - earlier for earlier, later in zip(starts[host], starts[host][1:])]
+        assert len(gaps) == 3 and min(gaps) >= 0.045
+    # Hosts don't wait on each other
+    assert abs(starts["a"][0] - starts["b"][0]) < 0.04
+
+
+def test_limiter_forgets_idle_hosts() -> None:
+    async def run() -> None:
+        limiter = fc.HostRateLimiter(per_host=1, interval=0.02)
+        for n in range(200):
+            async with limiter.slot(f"host-{n}.example"):
+                pass
+        assert len(limiter) == 200
+        async with limiter.slot("busy.example"):
+            await asyncio.sleep(0.05)
+            async with limiter.slot("other.example"):
+                # Idle and past their next start: dropped; the busy host stays
+                assert set(limiter._hosts) == {"busy.example", "other.example"}
+        await asyncio.sleep(0.05)
+        async with limiter.slot("last.example"):
+            assert set(limiter._hosts) == {"last.example"}
+
+    asyncio.run(run())
+
+
+def test_crawl_endpoint_rejects_bad_and_private_urls(site: Site, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(fc, "CRAWL_ALLOW_PRIVATE", False)
+    monkeypatch.setattr(taste, "fire_crawl", _service())
+    app = FastAPI()
+    app.include_router(taste.router)
+    port = site.server.server_port
+    with TestClient(app) as client:
+        for url in ("http://a:99999/", "http://[::1", "https:///"):
+            assert client.post("/api/taste/crawl", params={"url": url}).status_code == 400, url
+        for url in (f"http://127.0.0.1:{port}/", f"http://localhost:{port}/", "http://10.0.0.1/", "http://[::1]/"):
+            response = client.post("/api/taste/crawl", params={"url": url})
+            assert response.status_code == 400, url
+            assert "non-public" in response.json()["detail"]
+    assert site.requests == []
+
+
+def test_redirects_to_private_addresses_are_refused(site: Site, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Treat the fixture's address as public; everything else on loopback stays private
+    monkeypatch.setattr(fc, "CRAWL_ALLOW_PRIVATE", False)
+    monkeypatch.setattr(fc, "_is_public", lambda address: address == "127.0.0.1")
+    internal = Site("127.0.0.2")
+    internal.pages["/"] = (200, {}, PAGE)
+    site.pages["/hop"] = (302, {"Location": f"{internal.url}/"}, b"")
+    try:
+        # The public-only transport itself works end to end
+        [result] = asyncio.run(_analyze(_service(), site.url))
+        assert result.dna.layout == "Modular Grid"
+        with pytest.raises(fc.CrawlBlocked, match="127.0.0.2"):
+            asyncio.run(_analyze(_service(), f"{site.url}/hop"))
+        assert internal.requests == []
+    finally:
+        internal.close()
+
+
+def test_transport_maps_connection_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(fc, "CRAWL_ALLOW_PRIVATE", False)
+    monkeypatch.setattr(fc, "_is_public", lambda address: True)
+    closed = Site()
+    closed.close()
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(_analyze(_service(), closed.url))
@@ -0,0 +1,168 @@
+"""Generation pipeline with a stub generator: fan-out, single-flight, LRU and prefetch."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routers import taste
+from api.services.generation_pipeline import GenerationPipeline
+from api.services.imagen_service import ImagenService
+
+LATENCY = 0.05
+
+
+class StubGenerator:
+    """Stands in for an image model: fixed latency, counts calls and overlap."""
+
+    def __init__(self, latency: float = LATENCY) -> None:
+        self.latency = latency
+        self.calls: Counter[tuple[str, str]] = Counter()
+        self.active = self.max_active = 0
+        self.fail: set[str] = set()
+
+    async def __call__(self, prompt: str, style: str) -> str:
+        self.calls[prompt, style] += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        if prompt in self.fail:
+            raise RuntimeError(f"generation failed for {prompt}")
+        return f"https://images.test/{style}/{prompt}"
+
+
+def _pairs(*prompts: str) -> list[tuple[str, str]]:
+    return [(prompt, "The Architect") for prompt in prompts]
+
+
+def test_round_is_generated_concurrently() -> None:
+    stub = StubGenerator()
+    pipeline = GenerationPipeline(stub, concurrency=4)
+
+    async def run() -> tuple[list[str], float]:
+        started = time.perf_counter()
+        urls = await pipeline.generate_many(_pairs("a", "b", "c", "d"))
+        return urls, time.perf_counter() - started
+
+    urls, elapsed = asyncio.run(run())
+    assert urls == [f"https://images.test/The Architect/{p}" for p in "abcd"]
+    assert stub.max_active == 4
+    assert elapsed < 3 * LATENCY
+
+
+def test_semaphore_bounds_concurrent_generations() -> None:
+    stub = StubGenerator()
+    pipeline = GenerationPipeline(stub, concurrency=2)
+    asyncio.run(pipeline.generate_many(_pairs(*"abcdef")))
+    assert stub.max_active == 2
+    assert sum(stub.calls.values()) == 6
+
+
+def test_identical_prompts_in_flight_share_one_call() -> None:
+    stub = StubGenerator()
+    pipeline = GenerationPipeline(stub)
+
+    async def run() -> list[list[str]]:
+        # Two sessions asking for overlapping rounds at the same time
+        return list(await asyncio.gather(
+            pipeline.generate_many(_pairs("a", "b", "c")),
+            pipeline.generate_many(_pairs("b", "c", "d")),
+        ))
+
+    first, second = asyncio.run(run())
+    assert first[1:] == second[:2]
+    assert set(stub.calls.values()) == {1}
+    assert pipeline.stats() == {
+        "cache_entries": 4, "inflight": 0, "hits": 0, "misses": 4, "shared_inflight": 2, "prefetched": 0,
+    }
+
+
+def test_one_waiter_cancelling_does_not_cancel_the_others() -> None:
+    stub = StubGenerator()
+    pipeline = GenerationPipeline(stub)
+
+    async def run() -> str:
+        impatient = asyncio.create_task(pipeline.generate("a", "The Glass"))
+        patient = asyncio.create_task(pipeline.generate("a", "The Glass"))
+        await asyncio.sleep(LATENCY / 5)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(run()) == "https://images.test/The Glass/a"
+    assert stub.calls["a", "The Glass"] == 1
+
+
+def test_cache_is_a_bounded_lru() -> None:
+    stub = StubGenerator(latency=0)
+    pipeline = GenerationPipeline(stub, cache_size=2)
+
+    async def run() -> None:
+        await pipeline.generate_many(_pairs("a", "b"))
+        await pipeline.generate(*_pairs("a")[0])  # a is now most recent
+        await pipeline.generate(*_pairs("c")[0])  # evicts b
+        await pipeline.generate_many(_pairs("a", "c", "b"))
+
+    asyncio.run(run())
+    assert len(pipeline._cache) == 2
+    assert [stub.calls[pair] for pair in _pairs("a", "b", "c")] == [1, 2, 1]
+    assert pipeline.hits == 3
+
+
+def test_failures_are_not_cached() -> None:
+    stub = StubGenerator(latency=0)
+    stub.fail.add("a")
+    pipeline = GenerationPipeline(stub)
+
+    async def run() -> str:
+        with pytest.raises(RuntimeError):
+            await pipeline.generate("a", "The Signal")
+        stub.fail.clear()
+        return await pipeline.generate("a", "The Signal")
+
+    assert asyncio.run(run()) == "https://images.test/The Signal/a"
+    assert stub.calls["a", "The Signal"] == 2
+    assert pipeline.stats()["inflight"] == 0
+
+
+def test_select_prefetches_the_next_round(monkeypatch: pytest.MonkeyPatch) -> None:
+    stub = StubGenerator()
+    imagen = ImagenService(GenerationPipeline(stub))
+    monkeypatch.setattr(taste, "imagen", imagen)
+    app = FastAPI()
+    app.include_router(taste.router)
+    prompt = "Portfolio for a type foundry"
+
+    with TestClient(app) as client:
+        session_id = client.post("/api/taste/start", json={}).json()["session_id"]
+        first = client.post("/api/taste/round", json={"session_id": session_id, "prompt": prompt, "round_number": 1})
+        options = first.json()["options"]
+        assert len(options) == 4
+        # Forget round one so the prefetch has to generate
+        imagen.pipeline._cache.clear()
+        before = sum(stub.calls.values())
+
+        selected = client.post("/api/taste/select", json={
+            "session_id": session_id, "selected_option_id": options[0]["id"], "round_number": 1,
+        })
+        assert selected.status_code == 200
+        deadline = time.monotonic() + 5
+        while imagen.pipeline._background and time.monotonic() < deadline:
+            time.sleep(0.01)
+        calls = sum(stub.calls.values())
+        assert imagen.pipeline.prefetched == 4
+        assert calls == before + 4
+
+        # The planned round is served from the prefetched results
+        second = client.post("/api/taste/round", json={"session_id": session_id, "prompt": prompt, "round_number": 2})
+        assert second.status_code == 200
+        assert len(second.json()["options"]) == 4
+        assert sum(stub.calls.values()) == calls
+        assert imagen.pipeline.hits == 4
@@ -0,0 +1,121 @@
+"""git_reader against the git binary: loose objects, packs and both delta kinds."""
+
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from api.services.git_reader import GitRepo, read_head
+from api.tests.conftest import git, requires_git
+
+pytestmark = requires_git
+
+# Mostly identical bodies so pack-objects stores commits as deltas
+BODY = "\n".join(f"Line {n} of a long commit message body." for n in range(60))
+ZONES = ("+0000", "+0530", "-0800", "+0100")
+LOG_FORMAT = "--format=%H|%P|%at|%ai|%ct|%s"
+
+
+def _commit(repo: Path, n: int, message: str, name: str = "main.txt") -> None:
+    (repo / name).write_text(f"revision {n}\n" + BODY)
+    git(repo, "add", name)
+    stamp = f"@{1_700_000_000 + n * 3600} {ZONES[n % len(ZONES)]}"
+    git(repo, "commit", "-q", "-m", message, "-m", f"{BODY}\n{n}",
+        env={"GIT_AUTHOR_DATE": stamp, "GIT_COMMITTER_DATE": stamp})
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    """Forty commits with a merge, all still loose objects."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q", "-b", "main")
+    for n in range(20):
+        _commit(repo, n, f"main {n}")
+    git(repo, "checkout", "-q", "-b", "side", "HEAD~5")
+    for n in range(20, 30):
+        _commit(repo, n, f"side {n}", "side.txt")
+    git(repo, "checkout", "-q", "main")
+    stamp = f"@{1_700_000_000 + 30 * 3600} +0200"
+    git(repo, "merge", "-q", "--no-ff", "side", "-m", "merge side",
+        env={"GIT_AUTHOR_DATE": stamp, "GIT_COMMITTER_DATE": stamp})
+    for n in range(31, 40):
+        _commit(repo, n, f"main {n}")
+    return repo
+
+
+def _reader_log(repo: Path, since: int | None = None) -> list[str]:
+    reader = GitRepo(repo / ".git")
+    try:
+        return [
+            f"{c.sha}|{' '.join(c.parents)}|{c.author_time}|{c.author_date}|{c.commit_time}|{c.subject}"
+            for c in reader.iter_commits(read_head(repo / ".git"), since=since)
+        ]
+    finally:
+        reader.close()
+
+
+def _git_log(repo: Path, *args: str) -> list[str]:
+    return git(repo, "log", LOG_FORMAT, *args).splitlines()
+
+
+def _packed_commit_kinds(repo: Path) -> Counter[int]:
+    """Pack entry type (1 commit, 6 ofs-delta, 7 ref-delta) of every packed commit."""
+    kinds: Counter[int] = Counter()
+    for idx in (repo / ".git" / "objects" / "pack").glob("*.idx"):
+        data = idx.with_suffix(".pack").read_bytes()
+        for line in git(repo, "verify-pack", "-v", str(idx)).splitlines():
+            parts = line.split()
+            if len(parts) >= 5 and parts[1] == "commit":
+                kinds[(data[int(parts[4])] >> 4) & 7] += 1
+    return kinds
+
+
+def _loose_count(repo: Path) -> int:
+    return sum(1 for d in (repo / ".git" / "objects").glob("[0-9a-f][0-9a-f]") for _ in d.iterdir())
+
+
+def test_loose_objects(repo: Path) -> None:
+    assert not _packed_commit_kinds(repo)
+    assert _reader_log(repo) == _git_log(repo)
+
+
+def test_pack_with_ofs_deltas(repo: Path) -> None:
+    git(repo, "repack", "-a", "-d", "-f", "-q")
+    kinds = _packed_commit_kinds(repo)
+    assert kinds[6] > 0 and kinds[7] == 0
+    assert _loose_count(repo) == 0
+    assert _reader_log(repo) == _git_log(repo)
+
+
+def test_pack_with_ref_deltas(repo: Path) -> None:
+    git(repo, "-c", "repack.useDeltaBaseOffset=false", "repack", "-a", "-d", "-f", "-q")
+    kinds = _packed_commit_kinds(repo)
+    assert kinds[7] > 0 and kinds[6] == 0
+    assert _reader_log(repo) == _git_log(repo)
+
+
+def test_pack_plus_new_loose_commits(repo: Path) -> None:
+    git(repo, "repack", "-a", "-d", "-q")
+    for n in range(40, 43):
+        _commit(repo, n, f"after gc {n}")
+    assert _loose_count(repo) > 0
+    assert _reader_log(repo) == _git_log(repo)
+
+
+def test_since_matches_git_log(repo: Path) -> None:
+    since = 1_700_000_000 + 25 * 3600
+    assert _reader_log(repo, since=since) == _git_log(repo, f"--since=@{since}")
+
+
+def test_stop_set_limits_the_walk(repo: Path) -> None:
+    head = read_head(repo / ".git")
+    old = git(repo, "rev-parse", "HEAD~3").strip()
+    reader = GitRepo(repo / ".git")
+    try:
+        walked = [c.sha for c in reader.iter_commits(head, stop={old})]
+    finally:
+        reader.close()
+    assert walked == git(repo, "rev-list", f"{old}..{head}").split()
@@ -0,0 +1,176 @@
+"""HTTP response cache: ETags, 304s, Last-Modified and Accept-Encoding negotiation."""
+
+from __future__ import annotations
+
+import gzip
+import json
+from email.utils import formatdate
+from typing import Any
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.testclient import TestClient
+
+from api.services import http_cache as hc
+
+BIG = {"items": [f"entry {n}" for n in range(200)]}
+SMALL = {"ok": True}
+MODIFIED = 1_700_000_000.0
+
+
+class Route:
+    """One cached route whose version, body and read-time version tests control."""
+
+    def __init__(self) -> None:
+        self.cache = hc.HttpCache()
+        self.version: Any = 1
+        self.data: Any = BIG
+        self.produced_version: Any = None
+        self.calls = 0
+        self.app = FastAPI()
+
+        @self.app.get("/thing")
+        async def thing(request: Request) -> Response:
+            async def produce() -> Any:
+                self.calls += 1
+                if self.data is None:
+                    raise HTTPException(status_code=404, detail="gone")
+                return hc.Payload(self.data, {"X-Extra": "1"}, version=self.produced_version)
+
+            return await self.cache.respond(request, "thing", self.version, produce, last_modified=MODIFIED)
+
+
+@pytest.fixture
+def route() -> Route:
+    return Route()
+
+
+@pytest.fixture
+def client(route: Route) -> TestClient:
+    return TestClient(route.app)
+
+
+def _get(client: TestClient, **headers: str):
+    return client.get("/thing", headers={"Accept-Encoding": "identity", **headers})
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("GZIP, deflate", "gzip"),
+        ("gzip;q=0", None),
+        ("gzip;q=0.5, identity", "gzip"),
+        ("*", hc.ENCODINGS[0]),
+        ("*, gzip;q=0", "br" if "br" in hc.ENCODINGS else None),
+        ("br", "br" if "br" in hc.ENCODINGS else None),
+    ],
+)
+def test_negotiate(header: str | None, expected: str | None) -> None:
+    assert hc.negotiate(header) == expected
+
+
+def test_etag_matching_ignores_weakness_and_encoding() -> None:
+    tag = hc._tag("k", 1)
+    assert hc._etag_matches(f'"{tag}"', tag)
+    assert hc._etag_matches(f'W/"{tag}-gzip"', tag)
+    assert hc._etag_matches(f'"other", "{tag}-br"', tag)
+    assert hc._etag_matches("*", tag)
+    assert not hc._etag_matches(f'"{hc._tag("k", 2)}"', tag)
+
+
+def test_miss_then_hit_then_not_modified(route: Route, client: TestClient) -> None:
+    first = _get(client)
+    assert first.status_code == 200
+    assert first.json() == BIG
+    assert first.headers["X-Extra"] == "1"
+    assert first.headers["Cache-Control"] == hc.CACHE_CONTROL
+    etag = first.headers["ETag"]
+
+    second = _get(client)
+    assert second.headers["ETag"] == etag and second.content == first.content
+    assert route.calls == 1
+
+    revalidated = _get(client, **{"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+    assert route.calls == 1
+    assert route.cache.stats()["not_modified"] == 1
+
+
+def test_version_change_invalidates(route: Route, client: TestClient) -> None:
+    etag = _get(client).headers["ETag"]
+    route.version, route.data = 2, SMALL
+    fresh = _get(client, **{"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.json() == SMALL
+    assert fresh.headers["ETag"] != etag
+    assert route.calls == 2
+
+
+def test_gzip_is_negotiated_and_tagged_per_encoding(route: Route, client: TestClient) -> None:
+    plain = _get(client)
+    zipped = client.get("/thing", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.headers["Vary"] == "Accept-Encoding"
+    assert zipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    # httpx decodes the body; it must be the same JSON
+    assert zipped.content == plain.content
+    assert int(zipped.headers["Content-Length"]) < len(plain.content)
+    assert gzip.decompress(route.cache._entries["thing"].encoded["gzip"]) == plain.content
+    # Either encoding's validator revalidates the other
+    assert _get(client, **{"If-None-Match": zipped.headers["ETag"]}).status_code == 304
+    assert route.calls == 1
+
+
+def test_small_bodies_are_not_compressed(route: Route, client: TestClient) -> None:
+    route.data = SMALL
+    response = client.get("/thing", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert not response.headers["ETag"].endswith('-gzip"')
+
+
+def test_if_modified_since(client: TestClient) -> None:
+    first = _get(client)
+    assert first.headers["Last-Modified"] == formatdate(MODIFIED, usegmt=True)
+    assert _get(client, **{"If-Modified-Since": formatdate(MODIFIED, usegmt=True)}).status_code == 304
+    assert _get(client, **{"If-Modified-Since": formatdate(MODIFIED - 60, usegmt=True)}).status_code == 200
+    # If-None-Match takes precedence when both are sent
+    response = _get(client, **{"If-Modified-Since": formatdate(MODIFIED, usegmt=True), "If-None-Match": '"nope"'})
+    assert response.status_code == 200
+
+
+def test_body_is_tagged_with_the_version_it_was_read_at(route: Route, client: TestClient) -> None:
+    # The source moved from version 1 to 2 between the version check and the read
+    route.version, route.produced_version = 1, 2
+    response = _get(client)
+    assert response.headers["ETag"] == hc._etag(hc._tag("thing", 2), None)
+
+    route.version = 2
+    calls = route.calls
+    assert _get(client, **{"If-None-Match": hc._etag(hc._tag("thing", 1), None)}).status_code == 200
+    assert _get(client, **{"If-None-Match": response.headers["ETag"]}).status_code == 304
+    assert _get(client).headers["ETag"] == response.headers["ETag"]
+    assert route.calls == calls
+
+
+def test_errors_pass_through_uncached(route: Route, client: TestClient) -> None:
+    route.data = None
+    assert _get(client).status_code == 404
+    assert route.cache.stats()["entries"] == 0
+    route.data = SMALL
+    assert _get(client).json() == SMALL
+
+
+def test_lru_is_bounded_by_bytes() -> None:
+    cache = hc.HttpCache(max_bytes=300)
+    body = json.dumps(["x" * 100]).encode()
+    for n in range(5):
+        cache._put(f"k{n}", hc._Entry(f"t{n}", body, {}))
+    assert cache.stats()["bytes"] <= 300
+    assert list(cache._entries) == ["k3", "k4"]
+    assert cache.stats()["evictions"] == 3
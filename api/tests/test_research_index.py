@@ -0,0 +1,168 @@
+"""Research index: outlines, BM25 ranking, incremental polling and the cold build."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routers import research
+from api.services import research_index as ri
+from api.services.file_reader import OVERNIGHT_DIR
+
+BRIEF = b"""# Pricing Research
+
+Intro about pricing tiers.
+
+## Competitors
+
+Competitor pricing and pricing pages.
+
+### Notes
+
+```
+# not a heading
+```
+
+## Competitors
+
+Second section with the same heading.
+"""
+
+
+@pytest.fixture
+def directory() -> Path:
+    # Must sit under an allowed data directory
+    return Path(tempfile.mkdtemp(dir=OVERNIGHT_DIR))
+
+
+def _write(directory: Path, slug: str, body: str | bytes, mtime: int | None = None) -> Path:
+    path = directory / f"{slug}.md"
+    path.write_bytes(body.encode() if isinstance(body, str) else body)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_outline_offsets_anchors_and_fences() -> None:
+    outline = ri.parse_outline(BRIEF)
+    assert [(h["level"], h["anchor"]) for h in outline] == [
+        (1, "pricing-research"), (2, "competitors"), (3, "notes"), (2, "competitors-1"),
+    ]
+    for heading in outline:
+        assert BRIEF[heading["offset"]:].startswith(b"#" * heading["level"] + b" ")
+    # A section runs up to the next heading of the same or a higher level
+    assert outline[1]["end"] == outline[3]["offset"]
+    assert outline[0]["end"] == outline[3]["end"] == len(BRIEF)
+
+
+def test_find_section_by_anchor_or_position() -> None:
+    brief = ri.Brief("b", Path("b.md"), "B", 0, len(BRIEF), 0, ri.parse_outline(BRIEF))
+    assert brief.find_section("competitors-1") is brief.outline[3]
+    assert brief.find_section("2") is brief.outline[2]
+    assert brief.find_section("4") is None
+    # Unicode digits that int() rejects or reads differently are just unknown anchors
+    for section in ("²", "٣", "１", "-1", ""):
+        assert brief.find_section(section) is None
+
+
+def test_section_endpoint_404s_on_unknown_sections() -> None:
+    slug = "section-endpoint"
+    _write(OVERNIGHT_DIR, slug, BRIEF)
+    app = FastAPI()
+    app.include_router(research.router, prefix="/api")
+    with TestClient(app) as client:
+        found = client.get(f"/api/research/{slug}", params={"section": "1"})
+        assert found.status_code == 200
+        assert found.json()["content"].startswith("## Competitors")
+        for raw in ("false", "true"):
+            response = client.get(f"/api/research/{slug}", params={"section": "²", "raw": raw})
+            assert response.status_code == 404
+
+
+def test_list_and_get(directory: Path) -> None:
+    _write(directory, "pricing", BRIEF, mtime=2_000_000_000)
+    _write(directory, "untitled-brief", "no headings here", mtime=1_000_000_000)
+    index = ri.ResearchIndex(directory)
+    briefs = index.list_briefs()
+    assert [b["slug"] for b in briefs] == ["pricing", "untitled-brief"]
+    assert [b["title"] for b in briefs] == ["Pricing Research", "Untitled Brief"]
+    brief = index.get("pricing")
+    assert brief is not None and brief.find_section("competitors-1") is brief.outline[3]
+    assert index.get("missing") is None
+
+
+def test_search_ranks_with_bm25(directory: Path) -> None:
+    _write(directory, "pricing", BRIEF)
+    _write(directory, "onboarding", "# Onboarding\n\nOne mention of pricing in a long " + "filler " * 200)
+    _write(directory, "hiring", "# Hiring\n\nNothing relevant.")
+    index = ri.ResearchIndex(directory)
+    results = index.search("pricing competitors")
+    assert [r["slug"] for r in results] == ["pricing", "onboarding"]
+    assert results[0]["score"] > results[1]["score"] > 0
+    assert "pricing" in results[0]["snippet"].lower()
+    assert index.search("pricing", limit=1)[0]["slug"] == "pricing"
+    assert index.search("") == []
+    assert index.search("absent") == []
+
+
+def test_polling_picks_up_changes(directory: Path) -> None:
+    index = ri.ResearchIndex(directory, poll_interval=0)
+    _write(directory, "a", "# A\n\nalpha")
+    assert [b["slug"] for b in index.list_briefs()] == ["a"]
+    version = index.version()
+    assert index.version() == version  # nothing changed
+
+    _write(directory, "b", "# B\n\nbeta")
+    (directory / "a.md").unlink()
+    assert [b["slug"] for b in index.list_briefs()] == ["b"]
+    assert index.version() > version
+    assert index.search("alpha") == []
+    assert [r["slug"] for r in index.search("beta")] == ["b"]
+
+
+def test_current_reindexes_a_changed_file_between_polls(directory: Path) -> None:
+    path = _write(directory, "a", "# A\n", mtime=1_000_000_000)
+    index = ri.ResearchIndex(directory, poll_interval=3600)
+    assert index.get("a").outline[0]["text"] == "A"
+    _write(directory, "a", "# Renamed\n\n## Section\n", mtime=1_000_000_100)
+    assert index.get("a").outline[0]["text"] == "A"  # throttled
+    brief = index.current("a")
+    assert [h["text"] for h in brief.outline] == ["Renamed", "Section"]
+    assert brief.size == path.stat().st_size
+    assert index.get("a") is brief
+
+
+def test_first_reads_wait_for_the_cold_build(directory: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    for n in range(5):
+        _write(directory, f"brief-{n}", f"# Brief {n}\n\nshared words")
+    index = ri.ResearchIndex(directory)
+    parse = ri.ResearchIndex._parse
+    started = threading.Event()
+
+    def slow_parse(*args: object) -> object:
+        started.set()
+        time.sleep(0.02)
+        return parse(*args)
+
+    monkeypatch.setattr(ri.ResearchIndex, "_parse", staticmethod(slow_parse))
+    # The lifespan's warm-up, still scanning when the first requests arrive
+    warm = threading.Thread(target=index.refresh)
+    warm.start()
+    assert started.wait(5)
+    try:
+        assert index.version() > 0
+        assert len(index.list_briefs()) == 5
+        assert len(index.search("shared")) == 5
+    finally:
+        warm.join()
+    # Once built, a scan in progress no longer holds readers up
+    with index._scanning:
+        index._last_poll = 0.0
+        assert len(index.list_briefs()) == 5
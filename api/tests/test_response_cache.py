@@ -0,0 +1,154 @@
+"""Agent response cache: key canonicalisation, TTL/LRU bounds and stream replay."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+
+from api.services.response_cache import Event, ResponseCache, cache_key
+
+TOOLS = [{"name": "search", "description": "Search.", "input_schema": {"type": "object"}}]
+RUN = [
+    {"type": "text", "content": "Hello"},
+    {"type": "text", "content": " there"},
+    {"type": "usage", "input_tokens": 10, "cache_read_input_tokens": 5, "output_tokens": 2},
+    {"type": "done"},
+]
+
+
+def _key(messages: list[dict[str, Any]], **overrides: Any) -> str:
+    args = {"model": "m", "system": "You help.", "tools": TOOLS, "extra_context": "", **overrides}
+    return cache_key(args["model"], args["system"], args["tools"], args["extra_context"], messages)
+
+
+def test_equivalent_requests_share_a_key() -> None:
+    key = _key([{"role": "user", "content": "What  changed\n overnight?"}])
+    assert key == _key([{"role": "user", "content": "What changed overnight?  "}])
+    assert key == _key([{"role": "user", "content": [{"type": "text", "text": "What changed overnight?"}]}])
+    assert key == _key([{
+        "role": "user",
+        "content": [{"type": "text", "text": "What changed overnight?", "cache_control": {"type": "ephemeral"}}],
+    }])
+    assert key == _key([{"role": "user", "content": "What changed overnight?"}], system=" You   help. ")
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [{"model": "other"}, {"system": "You refuse."}, {"tools": []}, {"extra_context": "today is Monday"}],
+)
+def test_anything_that_shapes_the_reply_changes_the_key(overrides: dict[str, Any]) -> None:
+    messages = [{"role": "user", "content": "hi"}]
+    assert _key(messages, **overrides) != _key(messages)
+    assert _key([{"role": "user", "content": "hi!"}]) != _key(messages)
+    assert _key([{"role": "assistant", "content": "hi"}]) != _key(messages)
+
+
+async def _source(events: list[Event], delay: float = 0.0) -> AsyncIterator[Event]:
+    for event in events:
+        if delay:
+            await asyncio.sleep(delay)
+        yield event
+
+
+def _collect(cache: ResponseCache, key: str, events: list[Event], timed: bool = False) -> list[Event]:
+    async def run() -> list[Event]:
+        return [event async for event in cache.cached(key, _source(events), timed=timed)]
+
+    return asyncio.run(run())
+
+
+def test_completed_runs_replay_with_a_cached_marker() -> None:
+    cache = ResponseCache()
+    assert _collect(cache, "k", RUN) == RUN
+    replayed = _collect(cache, "k", [{"type": "error", "message": "producer should not run"}])
+    assert replayed == RUN[:-1] + [{"type": "done", "cached": True}]
+    assert cache.stats() | {"bytes": 0} == {
+        "entries": 1, "bytes": 0, "hits": 1, "misses": 1, "hit_rate": 0.5, "stores": 1,
+        "evictions": 0, "saved_input_tokens": 15, "saved_output_tokens": 2,
+    }
+
+
+@pytest.mark.parametrize(
+    "events",
+    [
+        RUN[:-1] + [{"type": "error", "message": "API error"}],
+        RUN[:-1],
+        [{"type": "tool_use", "id": "t1", "name": "search", "input": {}}, *RUN],
+    ],
+    ids=["error", "unfinished", "tools"],
+)
+def test_failed_unfinished_and_tool_runs_are_not_stored(events: list[Event]) -> None:
+    cache = ResponseCache()
+    assert _collect(cache, "k", events) == events
+    assert cache.stats()["entries"] == 0
+    assert _collect(cache, "k", RUN) == RUN
+
+
+def test_abandoned_streams_are_not_stored() -> None:
+    cache = ResponseCache()
+
+    async def run() -> None:
+        stream = cache.cached("k", _source(RUN))
+        assert await anext(stream) == RUN[0]
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert cache.stats()["entries"] == 0
+
+
+def test_timed_replay_keeps_the_original_pacing() -> None:
+    cache = ResponseCache()
+
+    async def run() -> float:
+        async for _ in cache.cached("k", _source(RUN, delay=0.05)):
+            pass
+        started = time.perf_counter()
+        async for _ in cache.cached("k", _source(RUN), timed=True):
+            pass
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) >= 0.18
+    started = time.perf_counter()
+    _collect(cache, "k", RUN)
+    assert time.perf_counter() - started < 0.1
+
+
+def test_entries_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = ResponseCache(ttl=60)
+    _collect(cache, "k", RUN)
+    assert cache.get("k") is not None
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_bounded_by_count_and_bytes() -> None:
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b"):
+        _collect(cache, key, RUN)
+    cache.get("a")  # a is now most recent
+    _collect(cache, "c", RUN)
+    assert (cache.get("b"), cache.stats()["evictions"]) == (None, 1)
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    size = cache.stats()["bytes"] // 2
+    small = ResponseCache(max_bytes=2 * size + size // 2)
+    for key in ("a", "b", "c"):
+        _collect(small, key, RUN)
+    assert small.stats()["entries"] == 2 and small.get("a") is None
+    # A run bigger than the whole budget is never stored
+    tiny = ResponseCache(max_bytes=size - 1)
+    _collect(tiny, "a", RUN)
+    assert tiny.stats()["entries"] == 0 and tiny.stats()["evictions"] == 0
+
+
+def test_disabled_cache_always_runs_the_producer() -> None:
+    cache = ResponseCache(ttl=0)
+    _collect(cache, "k", RUN)
+    assert _collect(cache, "k", RUN) == RUN
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
@@ -0,0 +1,108 @@
+"""Agent SSE framing: the fast text encoder, coalescing and sse_starlette pass-through."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sse_starlette.sse import EventSourceResponse
+
+from api.services.sse import coalesce, encode_event
+
+
+def _frames(body: str) -> list[dict[str, Any]]:
+    """Parse an SSE body into the JSON payloads of its ``data:`` frames."""
+    events = []
+    for block in body.replace("\r\n", "\n").split("\n\n"):
+        data = [line[len("data: "):] for line in block.split("\n") if line.startswith("data: ")]
+        if data:
+            events.append(json.loads("\n".join(data)))
+    return events
+
+
+async def _events(items: list[dict[str, Any]], delay: float = 0.0) -> AsyncIterator[dict[str, Any]]:
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def _collect(frames: AsyncIterator[bytes]) -> list[bytes]:
+    return [frame async for frame in frames]
+
+
+@pytest.mark.parametrize("content", ["plain", 'quote " and \\ slash', "line\nbreak\ttab", "naïve – 日本語 🎨", ""])
+def test_text_fast_path_matches_json_dumps(content: str) -> None:
+    event = {"type": "text", "content": content}
+    assert encode_event(event) == b"data: " + json.dumps(event).encode() + b"\n\n"
+
+
+def test_other_events_use_the_generic_encoder() -> None:
+    event = {"type": "tool_use", "id": "t1", "name": "read", "input": {"path": "x"}}
+    assert encode_event(event) == b"data: " + json.dumps(event).encode() + b"\n\n"
+
+
+def test_coalesce_merges_deltas_and_flushes_on_other_events() -> None:
+    items = [
+        {"type": "text", "content": "Hel"},
+        {"type": "text", "content": "lo"},
+        {"type": "tool_use", "id": "t1", "name": "x", "input": {}},
+        {"type": "text", "content": " world"},
+        {"type": "done"},
+    ]
+    frames = asyncio.run(_collect(coalesce(_events(items), flush_interval=10)))
+    assert all(isinstance(frame, bytes) for frame in frames)
+    assert [json.loads(frame[len(b"data: "):]) for frame in frames] == [
+        {"type": "text", "content": "Hello"},
+        items[2],
+        {"type": "text", "content": " world"},
+        {"type": "done"},
+    ]
+
+
+def test_coalesce_flushes_on_size() -> None:
+    items = [{"type": "text", "content": "x" * 10} for _ in range(10)]
+    frames = asyncio.run(_collect(coalesce(_events(items), flush_interval=10, flush_bytes=25)))
+    contents = [json.loads(frame[len(b"data: "):])["content"] for frame in frames]
+    assert "".join(contents) == "x" * 100
+    assert len(frames) > 1
+
+
+def test_coalesce_reraises_source_errors() -> None:
+    async def failing() -> AsyncIterator[dict[str, Any]]:
+        yield {"type": "text", "content": "partial"}
+        raise RuntimeError("upstream broke")
+
+    async def run() -> list[bytes]:
+        frames = []
+        with pytest.raises(RuntimeError, match="upstream broke"):
+            async for frame in coalesce(failing(), flush_interval=10):
+                frames.append(frame)
+        return frames
+
+    assert asyncio.run(run()) == [encode_event({"type": "text", "content": "partial"})]
+
+
+def test_pre_encoded_frames_are_not_framed_twice() -> None:
+    """sse_starlette wraps ``str`` items in ``data:`` but passes ``bytes`` through."""
+    items = [
+        {"type": "text", "content": "a\nb"},
+        {"type": "tool_result", "id": "t1", "name": "x", "result": "ok", "is_error": False},
+        {"type": "done"},
+    ]
+    app = FastAPI()
+
+    @app.get("/stream")
+    async def stream() -> EventSourceResponse:
+        return EventSourceResponse(coalesce(_events(items, delay=0.01), flush_interval=0.001))
+
+    with TestClient(app) as client:
+        response = client.get("/stream")
+    assert response.status_code == 200
+    assert "data: data:" not in response.text
+    assert _frames(response.text) == items
@@ -0,0 +1,201 @@
+"""Task queue store: concurrent appends, compaction and crash recovery."""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from api.services import task_queue as tq
+from api.services.file_reader import CLAWDBOT_DIR
+from api.services.task_queue import TaskQueueStore
+
+PER_WORKER = 40
+
+
+@pytest.fixture
+def queue_path() -> Path:
+    # Must sit under an allowed data directory
+    return Path(tempfile.mkdtemp(dir=CLAWDBOT_DIR / "data")) / "task-queue.json"
+
+
+def _append_many(path: Path, worker: int, compact_every: int, store: TaskQueueStore | None = None) -> None:
+    store = store or TaskQueueStore(path, compact_every=compact_every)
+    for i in range(PER_WORKER):
+        store.append({"description": f"{worker}-{i}", "priority": "high" if i % 2 else "low", "status": "queued"})
+
+
+def _check_complete(path: Path, workers: int) -> list[dict]:
+    tasks = TaskQueueStore(path).list_tasks()
+    assert len(tasks) == workers * PER_WORKER
+    assert len({t["id"] for t in tasks}) == len(tasks)
+    assert {t["description"] for t in tasks} == {f"{w}-{i}" for w in range(workers) for i in range(PER_WORKER)}
+    # Each writer's tasks keep their relative order
+    for w in range(workers):
+        mine = [t["description"] for t in tasks if t["description"].startswith(f"{w}-")]
+        assert mine == [f"{w}-{i}" for i in range(PER_WORKER)]
+    return tasks
+
+
+def test_concurrent_appends_from_threads(queue_path: Path) -> None:
+    shared = TaskQueueStore(queue_path, compact_every=8)
+    # Half the threads share one store, half open their own
+    threads = [
+        threading.Thread(target=_append_many, args=(queue_path, w, 8, shared if w % 2 else None))
+        for w in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    _check_complete(queue_path, 8)
+    assert shared.list_tasks() == TaskQueueStore(queue_path).list_tasks()
+
+
+def test_concurrent_appends_from_processes(queue_path: Path) -> None:
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_append_many, args=(queue_path, w, 16)) for w in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(30)
+        assert proc.exitcode == 0
+    _check_complete(queue_path, 4)
+
+
+def test_compaction_folds_the_log_into_the_snapshot(queue_path: Path) -> None:
+    store = TaskQueueStore(queue_path, compact_every=1000, compact_delay=None)
+    stored = [store.append({"description": str(i), "status": "queued"})[0] for i in range(10)]
+    assert not queue_path.exists()
+    assert len(store.log_path.read_text().splitlines()) == 10
+    before = store.version()
+
+    store.compact()
+
+    assert json.loads(queue_path.read_text()) == stored
+    assert store.log_path.read_bytes() == b""
+    assert store.list_tasks() == stored
+    assert store.version() != before
+    # A reader that tailed the old log picks up the swap
+    other = TaskQueueStore(queue_path)
+    assert other.list_tasks() == stored
+    new, length = store.append({"description": "after", "status": "queued"})
+    assert length == 11
+    assert other.list_tasks() == [*stored, new]
+
+
+def test_appends_compact_geometrically(queue_path: Path) -> None:
+    store = TaskQueueStore(queue_path, compact_every=4, compact_delay=None)
+    for i in range(4):
+        store.append({"description": str(i)})
+    # The fourth append reached compact_every and folded the log
+    assert len(json.loads(queue_path.read_text())) == 4
+    assert store.log_path.read_bytes() == b""
+    for i in range(4, 7):
+        store.append({"description": str(i)})
+    # Below max(compact_every, snapshot size): still in the log
+    assert len(json.loads(queue_path.read_text())) == 4
+    assert [t["description"] for t in store.list_tasks()] == [str(i) for i in range(7)]
+
+
+def test_interrupted_compaction_does_not_duplicate(queue_path: Path) -> None:
+    store = TaskQueueStore(queue_path, compact_every=1000, compact_delay=None)
+    stored = [store.append({"description": str(i)})[0] for i in range(5)]
+    # Crash after the snapshot was replaced but before the log was reset
+    queue_path.write_text(json.dumps(stored))
+    assert TaskQueueStore(queue_path).list_tasks() == stored
+    assert store.list_tasks() == stored
+
+
+def test_query_filters_by_index_with_cursor(queue_path: Path) -> None:
+    store = TaskQueueStore(queue_path, compact_every=6)
+    for i in range(12):
+        store.append({"description": str(i), "priority": "high" if i % 3 == 0 else "low", "status": "queued"})
+    page = store.query(priority="high", limit=2)
+    assert [t["description"] for t in page.tasks] == ["0", "3"]
+    rest = store.query(priority="high", cursor=page.next_cursor)
+    assert [t["description"] for t in rest.tasks] == ["6", "9"]
+    assert rest.next_cursor is None
+    assert page.version == store.version()
+
+
+def test_snapshot_catches_up_shortly_after_an_append(queue_path: Path) -> None:
+    store = TaskQueueStore(queue_path, compact_every=1000, compact_delay=0.05)
+    first, _ = store.append({"description": "first"})
+    second, _ = store.append({"description": "second"})
+    deadline = time.monotonic() + 5
+    while not queue_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Outside readers of the plain JSON file see both without more appends
+    assert json.loads(queue_path.read_text()) == [first, second]
+    assert store.log_path.read_bytes() == b""
+
+
+def test_flush_compacts_pending_tasks(queue_path: Path) -> None:
+    store = TaskQueueStore(queue_path, compact_every=1000, compact_delay=60)
+    record, _ = store.append({"description": "only"})
+    store.flush()
+    assert json.loads(queue_path.read_text()) == [record]
+    assert store._timer is None
+
+
+def _external_update(path: Path, status: str) -> None:
+    """What ClawdBot does to mark tasks, following the documented lock protocol."""
+    fd = os.open(path.with_name(f"{path.name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        tasks = json.loads(path.read_text())
+        for task in tasks:
+            task["status"] = status
+        tmp = path.with_name(f".{path.name}.ext")
+        tmp.write_text(json.dumps(tasks))
+        os.replace(tmp, path)
+    finally:
+        os.close(fd)
+
+
+def test_external_writer_between_append_and_compaction(queue_path: Path) -> None:
+    store = TaskQueueStore(queue_path, compact_every=1000, compact_delay=None)
+    done = store.append({"description": "old", "status": "queued"})[0]
+    store.compact()
+    new = store.append({"description": "new", "status": "queued"})[0]
+
+    _external_update(queue_path, "done")
+    # The store notices the replaced snapshot and keeps the pending task
+    assert [t["status"] for t in store.list_tasks()] == ["done", "queued"]
+
+    store.compact()
+    assert json.loads(queue_path.read_text()) == [{**done, "status": "done"}, new]
+    assert store.query(status="done").tasks == [{**done, "status": "done"}]
+
+
+def test_compaction_retries_when_an_unlocked_writer_races_it(
+    queue_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = TaskQueueStore(queue_path, compact_every=1000, compact_delay=None)
+    done = store.append({"description": "old", "status": "queued"})[0]
+    store.compact()
+    new = store.append({"description": "new", "status": "queued"})[0]
+
+    write_json = tq.write_json
+    raced = []
+
+    def racing_write(path: Path, data, if_unchanged=None) -> bool:
+        if not raced:
+            # Lands after compaction read the snapshot, before it swaps its copy in
+            raced.append(True)
+            tasks = json.loads(queue_path.read_text())
+            tasks[0]["status"] = "done"
+            queue_path.write_text(json.dumps(tasks))
+        return write_json(path, data, if_unchanged=if_unchanged)
+
+    monkeypatch.setattr(tq, "write_json", racing_write)
+    store.compact()
+    assert json.loads(queue_path.read_text()) == [{**done, "status": "done"}, new]
@@ -0,0 +1,102 @@
+"""Taste engine: feature-hash embeddings, decayed preferences and Gumbel-top-k sampling."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from api.services import taste_engine as te
+from api.services.taste_engine import TasteEngine, embed
+
+ARCHETYPES = {
+    "The Architect": "swiss typography, minimal grids, monochrome, high contrast",
+    "The Curator": "serif dominance, antique palettes, cream backgrounds, editorial focus",
+    "The Signal": "monospace, data-dense, dark background, neon accents",
+    "The Glass": "backdrop blur, soft gradients, translucent layers, pastel tones",
+    "The Brutalist": "brutalist blocks, bold sans-serif, high contrast, raw grids",
+}
+
+
+@pytest.fixture(scope="module")
+def engine() -> TasteEngine:
+    return TasteEngine(ARCHETYPES, per_archetype=8)
+
+
+def test_embeddings_are_deterministic_unit_vectors() -> None:
+    vector = embed("swiss typography, minimal grids")
+    assert np.array_equal(vector, embed("Swiss Typography,  minimal grids"))
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+    assert not embed("").any()
+    # Shared descriptors land closer than unrelated ones
+    near = embed("swiss typography, minimal grids, monochrome") @ embed("swiss typography, monochrome, serif")
+    far = embed("swiss typography, minimal grids, monochrome") @ embed("soft gradients, pastel tones, blur")
+    assert near > far
+
+
+def test_candidate_pool_layout(engine: TasteEngine) -> None:
+    assert engine.candidates.shape == (len(ARCHETYPES) * 8, te.DIM)
+    assert np.allclose(np.linalg.norm(engine.candidates, axis=1), 1.0)
+    assert list(engine.owner[:9]) == [0] * 8 + [1]
+    # Jittered copies stay closest to their own archetype
+    nearest = (engine.candidates @ engine.vectors.T).argmax(axis=1)
+    assert np.mean(nearest == engine.owner) > 0.9
+
+
+def test_incremental_updates_match_the_decayed_history(engine: TasteEngine) -> None:
+    history = ["The Signal", "The Glass", "The Signal", "Unknown", "The Architect"]
+    preference = engine.zero()
+    for style in history:
+        preference = engine.update(preference, style)
+    assert np.allclose(preference, engine.from_history(history))
+    expected = te.DECAY**3 * engine.vectors[2] + te.DECAY**2 * engine.vectors[3]
+    expected += te.DECAY * engine.vectors[2] + engine.vectors[0]
+    assert np.allclose(preference, expected)
+    assert np.array_equal(engine.update([], "Unknown"), engine.zero())
+    assert not engine.from_history([]).any()
+
+
+def test_scores_follow_the_preference(engine: TasteEngine) -> None:
+    assert not engine.scores([]).any()
+    assert not engine.scores(engine.zero()).any()
+    scores = engine.scores(engine.update([], "The Curator"))
+    per_archetype = scores.reshape(len(ARCHETYPES), 8).mean(axis=1)
+    assert per_archetype.argmax() == engine.index["The Curator"]
+    assert scores.max() <= 1.0 + 1e-9
+
+
+def test_sample_returns_distinct_archetypes_best_first(engine: TasteEngine) -> None:
+    preference = engine.update([], "The Glass")
+    picks = engine.sample(preference, 4, chaos=0.3, rng=np.random.default_rng(1))
+    assert len(picks) == 4
+    assert len({p.archetype for p in picks}) == 4
+    for pick in picks:
+        assert engine.names[engine.owner[pick.candidate]] == pick.archetype
+        assert pick.score == pytest.approx(engine.scores(preference)[pick.candidate])
+    # Seeded draws repeat; asking for more than there are archetypes caps k
+    again = engine.sample(preference, 4, chaos=0.3, rng=np.random.default_rng(1))
+    assert [p.candidate for p in again] == [p.candidate for p in picks]
+    assert len(engine.sample(preference, 50, chaos=0.3)) == len(ARCHETYPES)
+
+
+def test_low_chaos_favours_the_preference(engine: TasteEngine) -> None:
+    preference = engine.from_history(["The Signal"] * 3)
+    rng = np.random.default_rng(7)
+    firsts = [engine.sample(preference, 4, chaos=0.0, rng=rng)[0].archetype for _ in range(200)]
+    assert firsts.count("The Signal") == 200
+
+
+def test_first_pick_follows_the_softmax(engine: TasteEngine) -> None:
+    # Gumbel-max over all candidates picks archetype a with probability
+    # sum(exp(s_i / T) for i in a) / sum(exp(s_j / T))
+    preference = engine.from_history(["The Architect", "The Brutalist"])
+    chaos = 0.4
+    temperature = te.MIN_TEMPERATURE + chaos * (te.MAX_TEMPERATURE - te.MIN_TEMPERATURE)
+    weights = np.exp(engine.scores(preference) / temperature)
+    expected = weights.reshape(len(ARCHETYPES), 8).sum(axis=1) / weights.sum()
+
+    rng = np.random.default_rng(3)
+    draws = 6000
+    counts = np.zeros(len(ARCHETYPES))
+    for _ in range(draws):
+        counts[engine.index[engine.sample(preference, 2, chaos, rng=rng)[0].archetype]] += 1
+    assert np.allclose(counts / draws, expected, atol=0.025)
@@ -0,0 +1,126 @@
+"""Taste sessions: incremental selection updates, TTL/LRU eviction and SQLite write-through."""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from api.services import taste_sessions as ts
+from api.services.taste_sessions import TasteSession, TasteSessionStore
+
+T0 = 1_700_000_000.0
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = T0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(ts, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def _select(style: str, weight: float = 1.0) -> Callable[[TasteSession], None]:
+    return lambda session: session.select(style, weight)
+
+
+def test_select_keeps_the_top_styles_current() -> None:
+    session = TasteSession("s")
+    for style, weight in [("The Glass", 1), ("The Signal", 2), ("The Architect", 1.5), ("The Glass", 1.5)]:
+        session.select(style, weight)
+    assert session.preferred_styles == ["The Glass", "The Signal"]
+    assert session.style_weights == {"The Glass": 2.5, "The Signal": 2, "The Architect": 1.5}
+    assert session.selections == 4
+    assert session.chaos_level == pytest.approx(0.3)
+    profile = session.profile()
+    assert profile.preferred_styles == session.preferred_styles
+    assert profile.preference == session.preference and len(profile.preference) > 0
+
+
+def test_sessions_expire_after_the_ttl(clock: Clock) -> None:
+    store = TasteSessionStore(db_path=None, ttl=60)
+    store.update("a", _select("The Glass"))
+    clock.now += 59
+    assert store.update("a", lambda s: s.selections) == 1
+    # Touching a session restarts its clock
+    clock.now += 59
+    assert store.update("a", lambda s: s.selections) == 1
+    clock.now += 61
+    assert store.update("a", lambda s: s.selections) == 0
+
+
+def test_idle_sessions_are_evicted_from_the_cold_end(clock: Clock) -> None:
+    store = TasteSessionStore(db_path=None, ttl=60)
+    for n, session_id in enumerate("abc"):
+        clock.now = T0 + n * 30
+        store.create(session_id)
+    clock.now = T0 + 95
+    store.create("d")
+    assert list(store._sessions) == ["c", "d"]
+
+
+def test_store_is_lru_bounded(clock: Clock) -> None:
+    store = TasteSessionStore(db_path=None, max_sessions=2)
+    store.create("a")
+    store.create("b")
+    store.update("a", _select("The Glass"))  # a is now most recent
+    store.create("c")
+    assert list(store._sessions) == ["a", "c"]
+    assert len(store) == 2
+
+
+def test_failed_changes_are_not_saved(clock: Clock) -> None:
+    store = TasteSessionStore(db_path=None)
+
+    def reject(session: TasteSession) -> None:
+        raise KeyError("unknown option")
+
+    with pytest.raises(KeyError):
+        store.update("a", reject)
+    assert len(store) == 0
+
+
+def test_concurrent_updates_are_not_lost() -> None:
+    store = TasteSessionStore(db_path=None)
+    store.create("a")
+
+    def worker() -> None:
+        for _ in range(50):
+            store.update("a", _select("The Signal"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.update("a", lambda s: (s.selections, s.style_weights)) == (400, {"The Signal": 400})
+
+
+def test_sessions_survive_a_restart_through_sqlite(tmp_path: Path, clock: Clock) -> None:
+    db = tmp_path / "taste.db"
+    store = TasteSessionStore(db_path=db, ttl=60)
+    store.create("a", user_id="manny")
+    store.update("a", _select("The Architect"))
+    store.create("old")
+    store.close()
+
+    restarted = TasteSessionStore(db_path=db, ttl=60)
+    session = restarted.update("a", lambda s: s)
+    assert (session.user_id, session.preferred_styles, session.selections) == ("manny", ["The Architect"], 1)
+
+    # Expired rows are neither loaded nor kept
+    clock.now += 61
+    assert restarted.update("old", lambda s: s.selections) == 0
+    rows = restarted._db.execute("SELECT session_id, updated FROM taste_sessions").fetchall()
+    assert rows == [("old", clock.now)]
+    restarted.close()
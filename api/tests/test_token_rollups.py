@@ -0,0 +1,168 @@
+"""Token rollups: hourly/daily buckets, bad log lines and the /tokens/summary range handling."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routers import tokens
+from api.services.file_reader import OPS_DIR
+from api.services.token_rollups import METRICS, TokenRollups
+
+DAY = 86400
+# 2024-01-01T00:00:00Z
+T0 = 1_704_067_200
+
+
+@pytest.fixture
+def rollups() -> TokenRollups:
+    # Must sit under an allowed data directory
+    return TokenRollups(Path(tempfile.mkdtemp(dir=OPS_DIR)) / "token-events.jsonl")
+
+
+def _usage(input_tokens: int, output_tokens: int = 0, cache_read: int = 0) -> dict[str, int]:
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "cache_read_input_tokens": cache_read}
+
+
+def _fill(rollups: TokenRollups) -> None:
+    rollups.record("opus", _usage(100, 10), ts=T0 + 60)
+    rollups.record("opus", _usage(200, 20, 50), ts=T0 + 3599)
+    rollups.record("opus", _usage(300, 30), ts=T0 + 3600)
+    rollups.record("haiku", _usage(5, 1), ts=T0 + 7200)
+    rollups.record("opus", _usage(1000), ts=T0 + DAY + 5)
+
+
+def test_hourly_buckets_per_model(rollups: TokenRollups) -> None:
+    _fill(rollups)
+    summary = rollups.summary("hour", T0, T0 + DAY)
+    assert summary["from"] == T0 and summary["to"] == T0 + DAY
+    opus, haiku = summary["series"]["opus"], summary["series"]["haiku"]
+    assert opus["start"] == [T0, T0 + 3600]
+    assert opus["requests"] == [2, 1]
+    assert opus["input_tokens"] == [300, 300]
+    assert opus["cache_read_input_tokens"] == [50, 0]
+    assert haiku == {"start": [T0 + 7200], **{m: [v] for m, v in zip(METRICS, (1, 5, 1, 0, 0))}}
+    assert summary["totals"]["input_tokens"] == 605
+    assert summary["totals"]["requests"] == 4
+
+
+def test_daily_buckets_and_model_filter(rollups: TokenRollups) -> None:
+    _fill(rollups)
+    summary = rollups.summary("day", T0, T0 + 2 * DAY, model="opus")
+    assert list(summary["series"]) == ["opus"]
+    assert summary["series"]["opus"]["start"] == [T0, T0 + DAY]
+    assert summary["series"]["opus"]["input_tokens"] == [600, 1000]
+    assert summary["totals"]["requests"] == 4
+
+
+def test_range_is_bucket_aligned_and_end_exclusive(rollups: TokenRollups) -> None:
+    _fill(rollups)
+    # from is rounded down to its bucket; a bucket starting at ``to`` is excluded
+    summary = rollups.summary("hour", T0 + 1800, T0 + 3600)
+    assert summary["from"] == T0
+    assert summary["series"]["opus"]["start"] == [T0]
+    assert rollups.summary("hour", T0 + 3 * 3600, T0 + DAY)["series"] == {}
+
+
+def test_tails_the_log_incrementally(rollups: TokenRollups) -> None:
+    rollups.record("opus", _usage(1), ts=T0)
+    assert rollups.summary("day", T0, T0 + DAY)["totals"]["input_tokens"] == 1
+    # A line still being written is left for the next sync
+    with rollups.log_path.open("ab") as f:
+        f.write(b'{"ts": %d, "model": "opus", "input_tokens": 2' % T0)
+    assert rollups.summary("day", T0, T0 + DAY)["totals"]["input_tokens"] == 1
+    with rollups.log_path.open("ab") as f:
+        f.write(b"}\n")
+    assert rollups.summary("day", T0, T0 + DAY)["totals"]["input_tokens"] == 3
+    assert rollups.records == 2
+
+
+def test_truncated_log_is_rebuilt(rollups: TokenRollups) -> None:
+    _fill(rollups)
+    rollups.sync()
+    rollups.log_path.write_text(json.dumps({"ts": T0, "model": "sonnet", "input_tokens": 7}) + "\n")
+    summary = rollups.summary("day", T0, T0 + 2 * DAY)
+    assert list(summary["series"]) == ["sonnet"]
+    assert rollups.records == 1
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        '{"ts": 1e400, "model": "opus", "input_tokens": 1}',
+        '{"ts": Infinity, "model": "opus", "input_tokens": 1}',
+        '{"ts": NaN, "model": "opus", "input_tokens": 1}',
+        '{"ts": -5, "model": "opus", "input_tokens": 1}',
+        '{"ts": "soon", "model": "opus", "input_tokens": 1}',
+        '{"model": "opus", "input_tokens": 1}',
+        f'{{"ts": {T0}, "model": "opus", "input_tokens": 1e400}}',
+        f'{{"ts": {T0}, "model": "opus", "input_tokens": 1e30}}',
+        f'{{"ts": {T0}, "model": "opus", "output_tokens": -3}}',
+        '[1, 2, 3]',
+        "not json",
+    ],
+)
+def test_bad_lines_are_skipped(rollups: TokenRollups, line: str) -> None:
+    rollups.record("opus", _usage(1), ts=T0)
+    with rollups.log_path.open("a") as f:
+        f.write(line + "\n")
+    rollups.record("opus", _usage(2), ts=T0 + 60)
+    summary = rollups.summary("hour", T0, T0 + DAY)
+    assert summary["series"]["opus"]["start"] == [T0]
+    assert summary["totals"]["input_tokens"] == 3
+    assert summary["totals"]["requests"] == 2
+    assert rollups.records == 2
+
+
+@pytest.fixture
+def client(rollups: TokenRollups, monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    _fill(rollups)
+    monkeypatch.setattr(tokens, "token_rollups", rollups)
+    app = FastAPI()
+    app.include_router(tokens.router, prefix="/api")
+    return TestClient(app)
+
+
+def _iso(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def test_summary_endpoint_range_and_granularity(client: TestClient) -> None:
+    response = client.get("/api/tokens/summary", params={"granularity": "hour", "from": _iso(T0), "to": _iso(T0 + DAY)})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["granularity"] == "hour"
+    assert body["series"]["opus"]["start"] == [T0, T0 + 3600]
+    # Naive datetimes are UTC
+    naive = client.get("/api/tokens/summary", params={"from": "2024-01-01T00:00:00", "to": "2024-01-03T00:00:00"})
+    assert naive.json()["series"]["opus"]["input_tokens"] == [600, 1000]
+    assert naive.json()["granularity"] == "day"
+    # Offsets are honoured
+    shifted = client.get("/api/tokens/summary", params={"from": "2024-01-01T01:00:00+01:00", "to": _iso(T0 + DAY)})
+    assert shifted.json()["from"] == T0
+
+
+def test_summary_endpoint_defaults_to_a_recent_window(client: TestClient, rollups: TokenRollups) -> None:
+    rollups.record("opus", _usage(42))
+    body = client.get("/api/tokens/summary", params={"granularity": "hour"}).json()
+    assert body["to"] - body["from"] <= tokens.DEFAULT_SPAN["hour"] + 3600
+    assert body["totals"]["input_tokens"] == 42
+
+
+@pytest.mark.parametrize(
+    ("params", "status"),
+    [
+        ({"from": _iso(T0 + DAY), "to": _iso(T0)}, 400),
+        ({"from": _iso(T0), "to": _iso(T0)}, 400),
+        ({"granularity": "minute"}, 422),
+        ({"from": "yesterday"}, 422),
+    ],
+)
+def test_summary_endpoint_rejects_bad_ranges(client: TestClient, params: dict[str, str], status: int) -> None:
+    assert client.get("/api/tokens/summary", params=params).status_code == status